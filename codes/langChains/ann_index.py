@@ -0,0 +1,256 @@
+"""
+Approximate nearest-neighbour vector store on FAISS.
+
+ANNVectorStore is a LangChain VectorStore, so it works with as_retriever(),
+create_retriever_tool(...) and HybridRetriever(vectorstore=...). The index kind
+is configurable:
+- "flat":  exact inner-product search (baseline, small collections)
+- "hnsw":  graph index, recall/latency knob ef_search
+- "ivfpq": inverted lists + product quantization, needs a training step
+           (from_texts/from_documents train on the data they are given),
+           recall/latency knob nprobe
+
+Vectors are L2-normalized, so inner product equals cosine similarity.
+save() writes index.faiss, config.json and a SQLite docstore; load(mmap=True)
+memory-maps the index file where FAISS supports it (IVF lists, flat codes) and
+falls back to reading it into memory otherwise.
+
+    store = ANNVectorStore.from_documents(texts, hf, kind="hnsw", ef_search=64)
+    store.save("codes/langChains/.ann/reports")
+    store = ANNVectorStore.load("codes/langChains/.ann/reports", hf, ef_search=128)
+
+    # Reuse the embeddings already stored in Chroma; rebuilt only when the collection changes
+    store = ANNVectorStore.from_chroma(docsearch, hf, kind="ivfpq", nprobe=32)
+"""
+import hashlib
+import json
+import math
+import os
+import sqlite3
+from typing import Any, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+DEFAULT_ANN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ann")
+KINDS = ("flat", "hnsw", "ivfpq")
+SEARCH_PARAMS = ("ef_search", "nprobe")
+DEFAULT_PARAMS = {
+    "hnsw_m": 32,
+    "ef_construction": 200,
+    "ef_search": 64,
+    "nlist": 1024,
+    "pq_m": 16,
+    "pq_bits": 8,
+    "nprobe": 16,
+}
+
+
+def _normalized(vectors) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(kind: str, dim: int, n_train: int = 0, **params) -> Any:
+    params = {**DEFAULT_PARAMS, **params}
+    if kind == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+        return faiss.IndexIDMap2(index)
+    if kind == "ivfpq":
+        if dim % params["pq_m"]:
+            raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dimension {dim}")
+        nlist, pq_bits = params["nlist"], params["pq_bits"]
+        if n_train:
+            # FAISS wants ~39 training points per list and per PQ centroid; shrink both for small corpora
+            nlist = max(1, min(nlist, n_train // 39))
+            pq_bits = max(1, min(pq_bits, int(math.log2(max(2, n_train // 39)))))
+        quantizer = faiss.IndexFlatIP(dim)
+        return faiss.IndexIVFPQ(quantizer, dim, nlist, params["pq_m"], pq_bits, faiss.METRIC_INNER_PRODUCT)
+    raise ValueError(f"Unknown index kind '{kind}', expected one of {KINDS}")
+
+
+def collection_fingerprint(ids: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for doc_id in sorted(ids):
+        digest.update(doc_id.encode("utf-8") + b"\x00")
+    return digest.hexdigest()
+
+
+def set_search_params(index, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> None:
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if ef_search is not None and isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    if nprobe is not None and isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = nprobe
+
+
+class SQLiteDocstore:
+    """Chunk text and metadata keyed by the integer FAISS id, kept on disk instead of in a Python dict."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        self._conn.commit()
+
+    def next_id(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM docs").fetchone()[0]
+
+    def add(self, ids: List[int], texts: List[str], metadatas: List[dict]) -> None:
+        self._conn.executemany(
+            "INSERT INTO docs (id, content, metadata) VALUES (?, ?, ?)",
+            [(i, text, json.dumps(metadata, ensure_ascii=False)) for i, text, metadata in zip(ids, texts, metadatas)],
+        )
+        self._conn.commit()
+
+    def get(self, ids: List[int]) -> List[Document]:
+        rows = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            query = f"SELECT id, content, metadata FROM docs WHERE id IN ({','.join('?' * len(chunk))})"
+            for doc_id, content, metadata in self._conn.execute(query, chunk):
+                rows[doc_id] = Document(page_content=content, metadata=json.loads(metadata))
+        return [rows[i] for i in ids if i in rows]
+
+    def copy_to(self, path: str) -> "SQLiteDocstore":
+        target = sqlite3.connect(path)
+        self._conn.backup(target)
+        target.close()
+        return SQLiteDocstore(path)
+
+
+class ANNVectorStore(VectorStore):
+    def __init__(self, embedding: Embeddings, index, docstore: SQLiteDocstore, kind: str, params: dict,
+                 fingerprint: Optional[str] = None):
+        self.embedding = embedding
+        self.index = index
+        self.docstore = docstore
+        self.kind = kind
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.fingerprint = fingerprint
+        set_search_params(self.index, self.params["ef_search"], self.params["nprobe"])
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @classmethod
+    def create(cls, embedding: Embeddings, dim: int, kind: str = "flat", **params) -> "ANNVectorStore":
+        return cls(embedding, build_index(kind, dim, **params), SQLiteDocstore(), kind, params)
+
+    def train(self, vectors) -> None:
+        """IVF-PQ only: learn the coarse centroids and PQ codebooks."""
+        if not self.index.is_trained:
+            self.index.train(_normalized(vectors))
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[str]:
+        if not self.index.is_trained:
+            raise ValueError("The IVF-PQ index is not trained yet; call train() first or use from_texts()")
+        metadatas = metadatas or [{} for _ in texts]
+        start = self.docstore.next_id()
+        ids = list(range(start, start + len(texts)))
+        self.index.add_with_ids(_normalized(vectors), np.array(ids, dtype=np.int64))
+        self.docstore.add(ids, texts, metadatas)
+        return [str(i) for i in ids]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_vectors(self.embedding.embed_documents(texts), texts, metadatas)
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        scores, ids = self.index.search(_normalized([embedding]), k)
+        hits = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+        documents = self.docstore.get([i for i, _ in hits])
+        return list(zip(documents, [s for _, s in hits]))
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   kind: str = "flat", **params: Any) -> "ANNVectorStore":
+        texts = list(texts)
+        vectors = _normalized(embedding.embed_documents(texts))
+        return cls.from_vectors(vectors, texts, embedding, metadatas, kind, **params)
+
+    @classmethod
+    def from_vectors(cls, vectors, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                     kind: str = "flat", **params: Any) -> "ANNVectorStore":
+        vectors = _normalized(vectors)
+        store = cls(embedding, build_index(kind, vectors.shape[1], n_train=len(vectors), **params), SQLiteDocstore(), kind, params)
+        store.train(vectors)
+        store.add_vectors(vectors, texts, metadatas)
+        return store
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(directory, "index.faiss"))
+        docstore_path = os.path.join(directory, "docstore.sqlite")
+        if os.path.abspath(self.docstore.path) != os.path.abspath(docstore_path):
+            if os.path.exists(docstore_path):
+                os.remove(docstore_path)
+            self.docstore = self.docstore.copy_to(docstore_path)
+        with open(os.path.join(directory, "config.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": self.kind, "params": self.params, "fingerprint": self.fingerprint}, f)
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings, mmap: bool = True, **search_params: Any) -> "ANNVectorStore":
+        """Load a saved store; ef_search / nprobe passed here override the saved values."""
+        with open(os.path.join(directory, "config.json"), encoding="utf-8") as f:
+            config = json.load(f)
+        path = os.path.join(directory, "index.faiss")
+        index = None
+        if mmap:
+            try:
+                index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                index = None
+        if index is None:
+            index = faiss.read_index(path)
+        return cls(embedding, index, SQLiteDocstore(os.path.join(directory, "docstore.sqlite")),
+                   config["kind"], {**config["params"], **search_params}, config.get("fingerprint"))
+
+    @classmethod
+    def from_chroma(cls, vectorstore, embedding: Embeddings, kind: str = "hnsw", directory: Optional[str] = None,
+                    mmap: bool = True, **params: Any) -> "ANNVectorStore":
+        """
+        Build the index from the vectors already stored in a Chroma collection (no re-embedding)
+        and persist it under directory. The next call loads it from disk unless the collection ids,
+        the kind or a build parameter changed; search knobs (ef_search, nprobe) never force a rebuild.
+        """
+        directory = directory or os.path.join(DEFAULT_ANN_DIR, f"{vectorstore._collection.name}.{kind}")
+        ids = vectorstore.get(include=[])["ids"]
+        fingerprint = collection_fingerprint(ids)
+        build_params = {key: value for key, value in {**DEFAULT_PARAMS, **params}.items() if key not in SEARCH_PARAMS}
+        config_path = os.path.join(directory, "config.json")
+        if os.path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                config = json.load(f)
+            saved_build = {key: value for key, value in config["params"].items() if key not in SEARCH_PARAMS}
+            if config.get("fingerprint") == fingerprint and config["kind"] == kind and saved_build == build_params:
+                search_params = {key: params[key] for key in SEARCH_PARAMS if key in params}
+                return cls.load(directory, embedding, mmap=mmap, **search_params)
+
+        data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        metadatas = [{**(metadata or {}), "chunk_id": doc_id} for doc_id, metadata in zip(data["ids"], data["metadatas"])]
+        store = cls.from_vectors(data["embeddings"], data["documents"], embedding, metadatas, kind, **params)
+        store.fingerprint = fingerprint
+        store.save(directory)
+        return store
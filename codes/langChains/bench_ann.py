@@ -0,0 +1,122 @@
+"""
+Recall@k versus query latency of the ANN index kinds in ann_index.py.
+
+Ground truth is exact inner-product search (flat). HNSW is swept over ef_search
+and IVF-PQ over nprobe. Data is either synthetic clustered embeddings or the
+vectors already stored in the Chroma collection written by pdf_ingest.py (a
+held-out slice of the collection is used as queries).
+
+    ~codes/langChains$ python bench_ann.py --n 200000 --dim 768
+    ~codes/langChains$ python bench_ann.py --chroma --queries 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import build_index, set_search_params
+from mmr import normalize_rows
+from pdf_ingest import DEFAULT_COLLECTION, DEFAULT_PERSIST_DIR
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    # Sentence embeddings are clustered by topic, uniform random vectors make ANN look worse than it is
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    return normalize_rows(centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32))
+
+
+def chroma_vectors(persist_directory: str, collection_name: str) -> np.ndarray:
+    from langchain_community.vectorstores import Chroma
+
+    store = Chroma(collection_name=collection_name, persist_directory=persist_directory)
+    return normalize_rows(store.get(include=["embeddings"])["embeddings"])
+
+
+def index_bytes(index) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.faiss")
+        faiss.write_index(index, path)
+        return os.path.getsize(path)
+
+
+def run_queries(index, queries: np.ndarray, k: int):
+    # One query per call, like a retriever serving a chat request
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    started = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, ids[i] = index.search(query.reshape(1, -1), k)
+    return ids, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def build(kind: str, vectors: np.ndarray, **params):
+    started = time.perf_counter()
+    index = build_index(kind, vectors.shape[1], n_train=len(vectors), **params)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+    return index, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index recall/latency benchmark")
+    parser.add_argument("--n", type=int, default=100000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--chroma", action="store_true", help="use the vectors of the pdf_ingest Chroma collection")
+    parser.add_argument("--persist-dir", default=DEFAULT_PERSIST_DIR)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.chroma:
+        data = chroma_vectors(args.persist_dir, args.collection)
+        rng = np.random.default_rng(args.seed)
+        data = data[rng.permutation(len(data))]
+        n_queries = min(args.queries, len(data) // 5)
+        queries, vectors = data[:n_queries], np.ascontiguousarray(data[n_queries:])
+    else:
+        data = synthetic(args.n + args.queries, args.dim, args.clusters, args.seed)
+        queries, vectors = data[:args.queries], np.ascontiguousarray(data[args.queries:])
+    k = min(args.k, len(vectors))
+    print(f"corpus {len(vectors)} x {vectors.shape[1]}, queries {len(queries)}, k {k}")
+
+    flat, seconds = build("flat", vectors)
+    truth, flat_ms = run_queries(flat, queries, k)
+    print(f"{'flat':<22} build {seconds:7.2f}s  size {index_bytes(flat) / 2**20:8.1f} MiB  "
+          f"recall@{k} 1.000  {flat_ms:7.3f} ms/query")
+
+    hnsw, seconds = build("hnsw", vectors)
+    print(f"{'hnsw':<22} build {seconds:7.2f}s  size {index_bytes(hnsw) / 2**20:8.1f} MiB")
+    for ef_search in (16, 32, 64, 128, 256):
+        set_search_params(hnsw, ef_search=ef_search)
+        found, ms = run_queries(hnsw, queries, k)
+        print(f"  ef_search={ef_search:<10} recall@{k} {recall(found, truth):.3f}  {ms:7.3f} ms/query  "
+              f"speedup {flat_ms / ms:5.1f}x")
+
+    ivfpq, seconds = build("ivfpq", vectors, pq_m=args.pq_m)
+    print(f"{'ivfpq':<22} build {seconds:7.2f}s  size {index_bytes(ivfpq) / 2**20:8.1f} MiB  "
+          f"(nlist {ivfpq.nlist}, train incl.)")
+    for nprobe in (1, 4, 16, 64, 128):
+        if nprobe > ivfpq.nlist:
+            break
+        set_search_params(ivfpq, nprobe=nprobe)
+        found, ms = run_queries(ivfpq, queries, k)
+        print(f"  nprobe={nprobe:<13} recall@{k} {recall(found, truth):.3f}  {ms:7.3f} ms/query  "
+              f"speedup {flat_ms / ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Cold vs warm embedding time for the bundled PDF with CachedEmbeddings.
+
+    ~codes/langChains$ python bench_embedding_cache.py
+    ~codes/langChains$ python bench_embedding_cache.py --pdf other.pdf --cache-dir /tmp/emb
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from embedding_cache import CachedEmbeddings
+from pdf_ingest import DEFAULT_MODEL_NAME, build_embeddings, load_chunks
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf")
+QUERIES = ["혁신성장 정책금융에 대해서 설명해줘", "혁신 ICT 대해 한국어로 설명", "정책금융 공급 동향"]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="embedding cache warm-up benchmark")
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--model-name", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--cache-dir", default=None, help="defaults to a fresh temporary directory")
+    args = parser.parse_args()
+
+    texts = [chunk.page_content for chunk in load_chunks(args.pdf)]
+    hf = build_embeddings(args.model_name)
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="embedding_cache_")
+
+    raw = timed(lambda: hf.embed_documents(texts))
+    cold_cache = CachedEmbeddings(hf, cache_dir=cache_dir)
+    cold = timed(lambda: cold_cache.embed_documents(texts))
+    cold_queries = timed(lambda: [cold_cache.embed_query(q) for q in QUERIES])
+
+    # A new instance only shares the files on disk, like a fresh process would
+    warm_cache = CachedEmbeddings(hf, cache_dir=cache_dir)
+    warm = timed(lambda: warm_cache.embed_documents(texts))
+    warm_queries = timed(lambda: [warm_cache.embed_query(q) for q in QUERIES])
+
+    print(f"{len(texts)} chunks from {os.path.basename(args.pdf)}, cache in {cache_dir}")
+    print(f"no cache          : {raw:.3f}s")
+    print(f"cold cache        : {cold:.3f}s (queries {cold_queries * 1000:.1f} ms)")
+    print(f"warm cache        : {warm:.3f}s (queries {warm_queries * 1000:.1f} ms)")
+    print(f"warm speedup      : {raw / max(warm, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
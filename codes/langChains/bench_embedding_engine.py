@@ -0,0 +1,72 @@
+"""
+Embedding throughput on the bundled PDF replicated N times.
+
+Compares HuggingFaceEmbeddings (one call over all chunks) with EmbeddingEngine
+in-process and with a multi-process pool. With --index the engine also streams
+the chunks into a temporary Chroma collection window by window.
+
+    ~codes/langChains$ python bench_embedding_engine.py --copies 20 --workers 4 --batch-size 64
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_core.documents import Document
+
+from embedding_engine import DEFAULT_MODEL_NAME, EmbeddingEngine, index_documents
+from pdf_ingest import build_embeddings, load_chunks, open_vectorstore
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf")
+
+
+def replicated_chunks(chunks, copies):
+    # Generator: the replicated corpus is never materialized as one list
+    for copy in range(copies):
+        for i, chunk in enumerate(chunks):
+            yield Document(page_content=chunk.page_content, metadata={**chunk.metadata, "copy": copy, "chunk": i})
+
+
+def throughput(label, count, seconds):
+    print(f"{label:<34}: {count / seconds:8.1f} chunks/s ({seconds:.2f}s for {count} chunks)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="embedding engine throughput benchmark")
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--copies", type=int, default=10, help="how many times the PDF is replicated")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=0, help="pool size, 0 = one per CPU core")
+    parser.add_argument("--window", type=int, default=1024, help="documents per vector store write")
+    parser.add_argument("--model-name", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--index", action="store_true", help="also stream into a temporary Chroma collection")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.pdf)
+    texts = [doc.page_content for doc in replicated_chunks(chunks, args.copies)]
+    print(f"{len(chunks)} chunks x {args.copies} copies = {len(texts)} chunks")
+
+    hf = build_embeddings(args.model_name)
+    started = time.perf_counter()
+    hf.embed_documents(texts)
+    throughput("HuggingFaceEmbeddings", len(texts), time.perf_counter() - started)
+
+    with EmbeddingEngine(args.model_name, batch_size=args.batch_size, workers=1) as engine:
+        started = time.perf_counter()
+        engine.encode(texts)
+        throughput(f"engine, 1 process, batch {args.batch_size}", len(texts), time.perf_counter() - started)
+
+    with EmbeddingEngine(args.model_name, batch_size=args.batch_size, workers=args.workers, min_texts_for_pool=1) as engine:
+        engine.encode(texts[: engine.workers])  # start the pool outside the timed region
+        started = time.perf_counter()
+        engine.encode(texts)
+        throughput(f"engine, {engine.workers} processes, batch {args.batch_size}", len(texts), time.perf_counter() - started)
+
+        if args.index:
+            vectorstore = open_vectorstore(tempfile.mkdtemp(prefix="bench_chroma_"), "bench", engine)
+            stats = index_documents(replicated_chunks(chunks, args.copies), vectorstore, window=args.window)
+            throughput(f"engine + Chroma, window {args.window}", stats["chunks"], stats["seconds"])
+
+
+if __name__ == "__main__":
+    main()
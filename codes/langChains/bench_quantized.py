@@ -0,0 +1,67 @@
+"""
+Memory and recall@k of int8 / float16 quantized storage against float32.
+
+By default the vectors come from the Chroma collection written by pdf_ingest.py
+(the bundled PDF corpus); a held-out slice of the chunks is used as queries and
+exact float32 search over the rest is the ground truth. --synthetic uses random
+clustered 768-d embeddings instead, e.g. to look at larger corpora.
+
+    ~codes/langChains$ python pdf_ingest.py 이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf
+    ~codes/langChains$ python bench_quantized.py --k 3
+    ~codes/langChains$ python bench_quantized.py --synthetic --n 200000 --k 10
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from bench_ann import chroma_vectors, recall, synthetic
+from pdf_ingest import DEFAULT_COLLECTION, DEFAULT_PERSIST_DIR
+from quantized_store import DTYPES, QuantizedVectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized embedding storage benchmark")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--n", type=int, default=100000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--persist-dir", default=DEFAULT_PERSIST_DIR)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.synthetic:
+        data = synthetic(args.n + args.queries, args.dim, 256, args.seed)
+    else:
+        data = chroma_vectors(args.persist_dir, args.collection)
+        data = data[rng.permutation(len(data))]
+    n_queries = min(args.queries, len(data) // 5)
+    queries, vectors = data[:n_queries], np.ascontiguousarray(data[n_queries:])
+    k = min(args.k, len(vectors))
+    exact = queries @ vectors.T
+    truth = np.argsort(-exact, axis=1)[:, :k]
+    print(f"corpus {len(vectors)} x {vectors.shape[1]}, queries {len(queries)}, k {k}")
+    print(f"{'float32':<8} resident {vectors.nbytes / 2**20:8.2f} MiB  (1.00x)  recall@{k} 1.000")
+
+    for dtype in DTYPES:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectors.build(vectors, tmp, dtype)
+            sizes = store.nbytes()
+            print(f"{dtype:<8} resident {sizes['resident'] / 2**20:8.2f} MiB  "
+                  f"({sizes['resident'] / sizes['float32_matrix']:.2f}x)  "
+                  f"float32 rows on disk {sizes['float32_on_disk'] / 2**20:.2f} MiB")
+            for rescore in (0, 2, 4, 8):
+                started = time.perf_counter()
+                _, found = store.search(queries, k, rescore)
+                ms = (time.perf_counter() - started) / len(queries) * 1000
+                label = "no rescore" if not rescore else f"rescore {rescore}k"
+                print(f"  {label:<14} recall@{k} {recall(found, truth):.3f}  {ms:7.3f} ms/query")
+            del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Recall@k and latency of retrievers over the bundled PDF.
+
+Queries are generated from the corpus itself (known-item search): a random
+span of a chunk is used as the query, and the chunk it came from is the
+relevant document. This needs no labels and rewards retrievers that find
+exact terms as well as paraphrase-level matches.
+
+    ~codes/langChains$ python bench_retrieval.py --queries 100 --k 3
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from hybrid_retriever import BM25Index, HybridRetriever, doc_key
+from pdf_ingest import DEFAULT_PERSIST_DIR, ingest, open_vectorstore
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf")
+BENCH_COLLECTION = "bench_retrieval"
+
+
+def known_item_queries(ids, documents, count, span, seed):
+    rng = random.Random(seed)
+    candidates = [(doc_id, text) for doc_id, text in zip(ids, documents) if len(text) > span * 2]
+    queries = []
+    for doc_id, text in rng.sample(candidates, min(count, len(candidates))):
+        start = rng.randrange(0, len(text) - span)
+        queries.append((text[start:start + span], doc_id))
+    return queries
+
+
+def evaluate(name, retrieve, queries, k):
+    hits, latencies = 0, []
+    for query, relevant in queries:
+        started = time.perf_counter()
+        documents = retrieve(query)[:k]
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += any(doc_key(doc) == relevant for doc in documents)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(f"{name:<28} recall@{k}: {hits / len(queries):.3f}  p50 {statistics.median(latencies):7.1f} ms  p95 {p95:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="retrieval recall/latency benchmark")
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--span", type=int, default=30, help="characters per generated query")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ingest([args.pdf], collection_name=BENCH_COLLECTION, parse_workers=1)
+    docsearch = open_vectorstore(DEFAULT_PERSIST_DIR, BENCH_COLLECTION)
+    data = docsearch.get(include=["documents"])
+    queries = known_item_queries(data["ids"], data["documents"], args.queries, args.span, args.seed)
+    print(f"{len(data['ids'])} chunks, {len(queries)} known-item queries of {args.span} characters")
+
+    mmr = docsearch.as_retriever(search_type="mmr", search_kwargs={"k": args.k, "fetch_k": args.fetch_k})
+    evaluate(f"dense MMR (fetch_k={args.fetch_k})", mmr.invoke, queries, args.k)
+
+    sparse = BM25Index(os.path.join(DEFAULT_PERSIST_DIR, f"{BENCH_COLLECTION}.bm25.sqlite"))
+    sparse.sync_from_chroma(docsearch)
+    evaluate("BM25 only", lambda q: [doc for doc, _ in sparse.search(q, args.k)], queries, args.k)
+
+    hybrid = HybridRetriever(sparse=sparse, vectorstore=docsearch, k=args.k, fetch_k=args.fetch_k)
+    evaluate(f"hybrid RRF (fetch_k={args.fetch_k})", hybrid.invoke, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
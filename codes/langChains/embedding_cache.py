@@ -0,0 +1,166 @@
+"""
+Disk-backed embedding cache.
+
+CachedEmbeddings wraps any LangChain Embeddings object (HuggingFaceEmbeddings,
+OpenAIEmbeddings, ...) and can be passed wherever an Embeddings is expected,
+e.g. Chroma(embedding_function=...) or FAISS.from_documents(docs, ...).
+
+Layout per model and namespace ("document" / "query"):
+
+    <cache_dir>/<model key>/<namespace>/meta.json     {"model": ..., "dim": 768}
+    <cache_dir>/<model key>/<namespace>/vectors.f32   float32 rows, memory-mapped
+    <cache_dir>/<model key>/<namespace>/index.bin     (16-byte sha256 prefix, uint64 row) records
+
+Both files are append-only. Writers append under an exclusive file lock, vector
+first and index record second, so a reader never sees an index record whose
+vector is missing. Readers re-map the files when the index has grown.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "embeddings")
+# Raw 16-byte keys ("S16" would strip trailing NUL bytes)
+INDEX_DTYPE = np.dtype([("key", "V16"), ("row", "<u8")])
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()[:16]
+
+
+def model_key(embeddings: Embeddings, model_name: Optional[str] = None) -> str:
+    """Directory name for a model; encode settings (e.g. normalization) change the vectors, so they are part of it."""
+    name = model_name or getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or type(embeddings).__name__
+    settings = getattr(embeddings, "encode_kwargs", None)
+    if settings:
+        name += "-" + hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:8]
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class EmbeddingStore:
+    """Append-only float32 vector file plus compact key index for one namespace."""
+
+    def __init__(self, directory: str, model: str):
+        self.directory = directory
+        self.model = model
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._index_path = os.path.join(directory, "index.bin")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock_path = os.path.join(directory, ".lock")
+        self._thread_lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._index_bytes = 0
+        self._matrix: Optional[np.ndarray] = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._rows)
+
+    def _refresh(self) -> None:
+        # Pick up records appended by other processes since the last read
+        size = os.path.getsize(self._index_path) if os.path.exists(self._index_path) else 0
+        size -= size % INDEX_DTYPE.itemsize
+        if size == self._index_bytes:
+            return
+        if self.dim is None:
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        records = np.fromfile(self._index_path, dtype=INDEX_DTYPE, count=size // INDEX_DTYPE.itemsize)
+        self._rows = {bytes(key): int(row) for key, row in zip(records["key"], records["row"])}
+        self._index_bytes = size
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        with self._thread_lock:
+            self._refresh()
+            return [
+                np.array(self._matrix[self._rows[key]]) if key in self._rows else None
+                for key in keys
+            ]
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._thread_lock, open(self._lock_path, "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self.dim is None and os.path.exists(self._meta_path):
+                    with open(self._meta_path, encoding="utf-8") as f:
+                        self.dim = json.load(f)["dim"]
+                if self.dim is None:
+                    self.dim = int(vectors.shape[1])
+                    with open(self._meta_path, "w", encoding="utf-8") as f:
+                        json.dump({"model": self.model, "dim": self.dim}, f)
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(f"Expected {self.dim}-d vectors for {self.model}, got {vectors.shape[1]}-d")
+                self._refresh()
+                fresh = {}
+                for key, vector in zip(keys, vectors):
+                    if key not in self._rows and key not in fresh:
+                        fresh[key] = vector
+                if not fresh:
+                    return
+                first_row = os.path.getsize(self._vectors_path) // (4 * self.dim) if os.path.exists(self._vectors_path) else 0
+                with open(self._vectors_path, "ab") as f:
+                    np.stack(list(fresh.values())).astype(np.float32).tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                records = np.empty(len(fresh), dtype=INDEX_DTYPE)
+                records["key"] = np.frombuffer(b"".join(fresh.keys()), dtype="V16")
+                records["row"] = np.arange(first_row, first_row + len(fresh), dtype=np.uint64)
+                with open(self._index_path, "ab") as f:
+                    records.tofile(f)
+                self._refresh()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, cache_dir: str = DEFAULT_CACHE_DIR, model_name: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model = model_key(embeddings, model_name)
+        self.documents = EmbeddingStore(os.path.join(cache_dir, self.model, "document"), self.model)
+        self.queries = EmbeddingStore(os.path.join(cache_dir, self.model, "query"), self.model)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _embed(self, store: EmbeddingStore, texts: List[str], compute) -> List[List[float]]:
+        keys = [text_key(text) for text in texts]
+        cached = store.get_many(keys)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+        if missing:
+            # Embed each distinct missing text once, in a single call
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            computed = np.asarray(compute(unique), dtype=np.float32)
+            store.put_many([text_key(text) for text in unique], computed)
+            by_text = dict(zip(unique, computed))
+            for i in missing:
+                cached[i] = by_text[texts[i]]
+        return [vector.tolist() for vector in cached]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(self.documents, list(texts), self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(self.queries, [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
@@ -0,0 +1,151 @@
+"""
+Batched, multi-process sentence-transformers embedding engine for CPU hosts.
+
+EmbeddingEngine implements LangChain's Embeddings interface, so it can replace
+HuggingFaceEmbeddings in Chroma/FAISS or be wrapped by CachedEmbeddings.
+- texts are sorted by length and cut into dynamic batches (at most batch_size
+  texts and max_batch_chars characters), so short chunks are not padded to
+  the length of long ones
+- with workers > 1, large inputs are spread over a sentence-transformers
+  multi-process pool
+- index_documents() streams documents into a vector store window by window,
+  so peak memory depends on the window size, not on the corpus size
+
+    engine = EmbeddingEngine("jhgan/ko-sbert-nli", batch_size=64, workers=4)
+    stats = index_documents(chunks_iter, vectorstore, window=1024)
+    print(stats["chunks_per_second"])
+"""
+import itertools
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_MODEL_NAME = "jhgan/ko-sbert-nli"
+
+
+def length_sorted_batches(texts: List[str], batch_size: int, max_batch_chars: Optional[int] = None) -> List[List[int]]:
+    """Group text indices by similar length; a batch closes at batch_size texts or max_batch_chars characters."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches, batch, chars = [], [], 0
+    for i in order:
+        if batch and (len(batch) >= batch_size or (max_batch_chars and chars + len(texts[i]) > max_batch_chars)):
+            batches.append(batch)
+            batch, chars = [], 0
+        batch.append(i)
+        chars += len(texts[i])
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingEngine(Embeddings):
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        batch_size: int = 32,
+        workers: int = 1,
+        max_batch_chars: Optional[int] = 32_000,
+        normalize_embeddings: bool = True,
+        min_texts_for_pool: int = 256,
+    ):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.max_batch_chars = max_batch_chars
+        self.normalize_embeddings = normalize_embeddings
+        # Starting worker processes costs seconds; small inputs stay in-process
+        self.min_texts_for_pool = min_texts_for_pool
+        self.encode_kwargs = {"normalize_embeddings": normalize_embeddings}
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self._pool = None
+        self.stats = {"texts": 0, "seconds": 0.0}
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def __enter__(self) -> "EmbeddingEngine":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Return a float32 matrix of embeddings in the order of texts."""
+        started = time.perf_counter()
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if self.workers > 1 and len(texts) >= self.min_texts_for_pool:
+            vectors = self._encode_pool(texts)
+        else:
+            vectors = self._encode_local(texts)
+        self.stats["texts"] += len(texts)
+        self.stats["seconds"] += time.perf_counter() - started
+        return vectors
+
+    def _encode_local(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        for batch in length_sorted_batches(texts, self.batch_size, self.max_batch_chars):
+            vectors[batch] = self.model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                normalize_embeddings=self.normalize_embeddings,
+                convert_to_numpy=True,
+            )
+        return vectors
+
+    def _encode_pool(self, texts: List[str]) -> np.ndarray:
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(["cpu"] * self.workers)
+        # Sorted input keeps each worker's chunk length-homogeneous
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        chunk_size = max(self.batch_size, -(-len(texts) // (self.workers * 4)))
+        sorted_vectors = self.model.encode_multi_process(
+            [texts[i] for i in order],
+            self._pool,
+            batch_size=self.batch_size,
+            chunk_size=chunk_size,
+            normalize_embeddings=self.normalize_embeddings,
+        )
+        vectors = np.empty_like(sorted_vectors, dtype=np.float32)
+        vectors[order] = sorted_vectors
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode_local([text])[0].tolist()
+
+    def chunks_per_second(self) -> float:
+        return self.stats["texts"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+
+
+def index_documents(documents: Iterable[Document], vectorstore, window: int = 1024, ids: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Add documents to a vector store window by window. The store embeds each window
+    through its embedding function (e.g. an EmbeddingEngine), so only one window of
+    documents and vectors is held in memory at a time.
+    """
+    started = time.perf_counter()
+    documents = iter(documents)
+    ids = iter(ids) if ids is not None else None
+    total = 0
+    while True:
+        batch = list(itertools.islice(documents, window))
+        if not batch:
+            break
+        if ids is not None:
+            vectorstore.add_documents(batch, ids=list(itertools.islice(ids, len(batch))))
+        else:
+            vectorstore.add_documents(batch)
+        total += len(batch)
+    seconds = time.perf_counter() - started
+    return {"chunks": total, "seconds": round(seconds, 3), "chunks_per_second": round(total / seconds, 1) if seconds else 0.0}
@@ -0,0 +1,348 @@
+"""
+Few-shot example library and persistent example index for the SQL agent.
+
+ExampleLibrary keeps verified NL -> SQL pairs in SQLite. Pairs are deduplicated
+on a normalized question (case and whitespace), can be bulk-imported from JSONL,
+and every example counts how often it was put into a prompt.
+
+FewShotStore embeds the library questions into an ANNVectorStore (ann_index.py)
+and saves it with a manifest:
+
+    <directory>/library.sqlite  examples and usage counters
+    <directory>/manifest.json   {"embeddings": model id, "kind": ..., "examples_hash": ...,
+                                 "questions": [question hashes], "example_ids": [library ids]}
+    <directory>/vectors.npy     question embeddings, rows aligned with "questions"
+    <directory>/index/          ANNVectorStore.save() output
+
+Process start does no embedding work at all: the index is opened lazily on the
+first retrieval. If the library changed, only questions that are new since the
+last build are embedded; the vectors of the others are reused. Questions that
+are near-duplicates of an earlier example (cosine >= near_duplicate) are left out
+of the index. A changed embedding model rebuilds everything.
+
+select() takes the fetch_k nearest examples, orders them with MMR (mmr.py) so
+that similar examples do not crowd the prompt, and adds them while they fit
+into the token budget.
+
+The embedding model is pluggable. Any sentence-transformers model name runs
+locally (no network once downloaded); "openai" / "openai:<model>" uses
+OpenAIEmbeddings.
+
+    ~codes/langChains$ python few_shot_store.py import harvested.jsonl   # {"question": ..., "sql": ...} per line
+    ~codes/langChains$ python few_shot_store.py build --embeddings openai
+    ~codes/langChains$ python few_shot_store.py stats
+
+    retriever = LazyFewShotRetriever(store=FewShotStore(library), token_budget=600)
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from ann_index import ANNVectorStore
+from embedding_cache import CachedEmbeddings, model_key
+from mmr import mmr_select, normalize_rows
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "few_shot_sql")
+DEFAULT_EMBEDDINGS = os.getenv("FEW_SHOT_EMBEDDINGS", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+METADATA_KEY = "sql_query"
+EXAMPLE_TEMPLATE = "Question: {page_content}\nSQL: {sql_query}"
+
+FEW_SHOTS = {
+  "List all artists.": "SELECT * FROM artists;"
+  ,"Find all albums for the artist 'AC/DC'.": "SELECT albums.Title FROM albums JOIN artists ON albums.ArtistId = artists.ArtistId WHERE artists.Name = 'AC/DC'"
+  ,"List all tracks in the 'Rock' genre.": "SELECT tracks.Name FROM tracks JOIN genres ON tracks.GenreId = genres.GenreId WHERE genres.Name = 'Rock'"
+  ,"Find the total duration of all tracks.": "SELECT SUM(Mi |liseconds) FROM tracks;"
+  ,"List all customers from Canada.": "SELECT * FROM customers WHERE Country = 'Canada' ; "
+  ,"How many tracks are there in the album with ID ?": "SELECT COUNT(*) FROM tracks WHERE AlbumId = 5; "
+  ,"Find the total number of invoices.": "SELECT COUNT(*) FROM invoices; "
+  ,"List all tracks that are longer than 5 minutes.": "SELECT * FROM tracks WHERE Mi | liseconds > 300000;"
+  ,"Who are the top 5 customers by total purchase?": "SELECT c.FirstName, c.LastName, SUM(i.Total) as TotalPurchase FROM customers c JOIN invoices i ON c.CustomerId = i.CustomerId GROUP BY c.CustomerId ORDER BY TotalPurchase DESC "
+  ,"Which albums are from the year 2000?": "SELECT * FROM albums WHERE strft ime('%Y', ReleaseDate) = '2000' ;"
+  ,"How many employees are there": 'SELECT COUNT (*) FROM "employee"' ,
+}
+
+
+def build_embeddings(spec: str = DEFAULT_EMBEDDINGS) -> Embeddings:
+    if spec == "openai" or spec.startswith("openai:"):
+        from langchain_openai import OpenAIEmbeddings
+
+        model = spec.partition(":")[2] or "text-embedding-ada-002"
+        return CachedEmbeddings(OpenAIEmbeddings(model=model), model_name=model)
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return CachedEmbeddings(HuggingFaceEmbeddings(model_name=spec, encode_kwargs={"normalize_embeddings": True}))
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?.! ")
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(question.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # 대략 4글자 = 1토큰으로 추정
+    return max(1, len(text) // 4)
+
+
+class ExampleLibrary:
+    def __init__(self, path: str = os.path.join(DEFAULT_STORE_DIR, "library.sqlite")):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS examples (
+                id INTEGER PRIMARY KEY,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                question_key TEXT NOT NULL UNIQUE,
+                source TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                uses INTEGER NOT NULL DEFAULT 0,
+                last_used_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM examples").fetchone()[0]
+
+    def add(self, pairs: Iterable[Tuple[str, str]], source: str = "manual") -> Dict:
+        """Insert (question, sql) pairs; a question already in the library (after normalization) is skipped."""
+        added = duplicates = 0
+        now = time.time()
+        with self._lock:
+            for question, sql in pairs:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO examples (question, sql, question_key, source, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (question.strip(), sql.strip(), question_hash(normalize_question(question)), source, now),
+                )
+                if cursor.rowcount:
+                    added += 1
+                else:
+                    duplicates += 1
+            self._conn.commit()
+        return {"added": added, "duplicates": duplicates}
+
+    def import_jsonl(self, path: str, source: Optional[str] = None) -> Dict:
+        """One {"question": ..., "sql": ...} object per line; lines without both fields are counted as invalid."""
+        pairs, invalid = [], 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    pairs.append((record["question"], record["sql"]))
+                except (ValueError, KeyError, TypeError):
+                    invalid += 1
+        return {**self.add(pairs, source or os.path.basename(path)), "invalid": invalid}
+
+    def examples(self) -> List[Tuple[int, str, str]]:
+        return self._conn.execute("SELECT id, question, sql FROM examples ORDER BY id").fetchall()
+
+    def record_use(self, ids: List[int]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE examples SET uses = uses + 1, last_used_at = ? WHERE id = ?", [(time.time(), i) for i in ids]
+            )
+            self._conn.commit()
+
+    def stats(self, top: int = 10) -> Dict:
+        total, used = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(uses > 0), 0) FROM examples").fetchone()
+        rows = self._conn.execute(
+            "SELECT id, question, uses FROM examples WHERE uses > 0 ORDER BY uses DESC, id LIMIT ?", (top,)
+        ).fetchall()
+        return {"examples": total, "never_used": total - used,
+                "top": [{"id": i, "question": q, "uses": uses} for i, q, uses in rows]}
+
+    def hash(self) -> str:
+        digest = hashlib.sha256()
+        for example_id, question, sql in self.examples():
+            digest.update(f"{example_id}\x00{question}\x00{sql}\x00".encode("utf-8"))
+        return digest.hexdigest()
+
+
+def near_duplicate_mask(vectors: np.ndarray, threshold: float) -> np.ndarray:
+    """True for rows whose cosine similarity to an earlier kept row is >= threshold."""
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    duplicate = np.zeros(len(vectors), dtype=bool)
+    for i, row in enumerate(vectors):
+        row = row.reshape(1, -1)
+        if index.ntotal and index.search(row, 1)[0][0, 0] >= threshold:
+            duplicate[i] = True
+        else:
+            index.add(row)
+    return duplicate
+
+
+class FewShotStore:
+    def __init__(
+        self,
+        library: Union[ExampleLibrary, Dict[str, str]],
+        directory: str = DEFAULT_STORE_DIR,
+        embeddings: Union[str, Embeddings] = DEFAULT_EMBEDDINGS,
+        kind: str = "flat",
+        near_duplicate: float = 0.98,
+    ):
+        if isinstance(library, dict):
+            pairs, library = library.items(), ExampleLibrary(os.path.join(directory, "library.sqlite"))
+            library.add(pairs, source="builtin")
+        self.library = library
+        self.directory = directory
+        self.kind = kind
+        self.near_duplicate = near_duplicate
+        self._spec = embeddings if isinstance(embeddings, str) else None
+        self._embeddings = None if isinstance(embeddings, str) else embeddings
+        self.embeddings_id = self._spec or model_key(embeddings)
+        self._store: Optional[ANNVectorStore] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._rows: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            self._embeddings = build_embeddings(self._spec)
+        return self._embeddings
+
+    def _manifest(self) -> Optional[Dict]:
+        path = os.path.join(self.directory, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _examples_hash(self) -> str:
+        return hashlib.sha256(f"{self.library.hash()}\x00{self.near_duplicate}".encode()).hexdigest()
+
+    def build(self) -> Dict:
+        """Bring the saved index in line with the library; returns counters."""
+        manifest = self._manifest()
+        if (manifest and manifest["embeddings"] == self.embeddings_id and manifest.get("kind") == self.kind
+                and manifest["examples_hash"] == self._examples_hash()):
+            n = len(manifest["questions"])
+            return {"examples": n, "embedded": 0, "reused": n, "near_duplicates": 0, "rebuilt": False}
+
+        cached = {}
+        if manifest and manifest["embeddings"] == self.embeddings_id:
+            vectors = np.load(os.path.join(self.directory, "vectors.npy"))
+            cached = dict(zip(manifest["questions"], vectors))
+        examples = self.library.examples()
+        hashes = [question_hash(question) for _, question, _ in examples]
+        missing = list({key: question for (_, question, _), key in zip(examples, hashes) if key not in cached}.items())
+        if missing:
+            vectors = self.embeddings.embed_documents([question for _, question in missing])
+            cached.update(zip([key for key, _ in missing], np.asarray(vectors, dtype=np.float32)))
+        vectors = normalize_rows(np.stack([cached[key] for key in hashes]))
+
+        duplicate = near_duplicate_mask(vectors, self.near_duplicate)
+        kept = [i for i in range(len(examples)) if not duplicate[i]]
+        examples = [examples[i] for i in kept]
+        hashes = [hashes[i] for i in kept]
+        vectors = np.ascontiguousarray(vectors[kept])
+        store = ANNVectorStore.from_vectors(
+            vectors,
+            [question for _, question, _ in examples],
+            self._embeddings,
+            [{METADATA_KEY: sql, "example_id": example_id} for example_id, _, sql in examples],
+            self.kind,
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        store.save(os.path.join(self.directory, "index"))
+        np.save(os.path.join(self.directory, "vectors.npy"), vectors)
+        tmp_path = os.path.join(self.directory, "manifest.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"embeddings": self.embeddings_id, "kind": self.kind, "examples_hash": self._examples_hash(),
+                       "questions": hashes, "example_ids": [example_id for example_id, _, _ in examples]}, f)
+        os.replace(tmp_path, os.path.join(self.directory, "manifest.json"))
+        return {"examples": len(examples), "embedded": len(missing), "reused": len(examples) - len(missing),
+                "near_duplicates": int(duplicate.sum()), "rebuilt": True}
+
+    def vectorstore(self) -> ANNVectorStore:
+        """Build (if needed) and open the index on first use."""
+        with self._lock:
+            if self._store is None:
+                self.build()
+                self._store = ANNVectorStore.load(os.path.join(self.directory, "index"), self.embeddings)
+                self._vectors = np.load(os.path.join(self.directory, "vectors.npy"))
+                self._rows = {example_id: row for row, example_id in enumerate(self._manifest()["example_ids"])}
+            return self._store
+
+    def select(self, question: str, token_budget: int = 600, max_examples: int = 8, fetch_k: int = 40,
+               lambda_mult: float = 0.5) -> List[Document]:
+        """MMR-ordered examples close to the question, added while their formatted text fits the token budget."""
+        store = self.vectorstore()
+        query = normalize_rows([self.embeddings.embed_query(question)])[0]
+        candidates = [doc for doc, _ in store.similarity_search_with_score_by_vector(query.tolist(), fetch_k)]
+        if not candidates:
+            return []
+        matrix = self._vectors[[self._rows[doc.metadata["example_id"]] for doc in candidates]]
+        selected, used = [], 0
+        for i in mmr_select(query, matrix, len(candidates), lambda_mult):
+            doc = candidates[i]
+            tokens = estimate_tokens(EXAMPLE_TEMPLATE.format(page_content=doc.page_content, **doc.metadata))
+            if used + tokens > token_budget:
+                continue
+            selected.append(doc)
+            used += tokens
+            if len(selected) == max_examples:
+                break
+        self.library.record_use([doc.metadata["example_id"] for doc in selected])
+        return selected
+
+
+class LazyFewShotRetriever(BaseRetriever):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    store: FewShotStore
+    token_budget: int = 600
+    max_examples: int = 8
+    fetch_k: int = 40
+    lambda_mult: float = 0.5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.store.select(query, self.token_budget, self.max_examples, self.fetch_k, self.lambda_mult)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the SQL few-shot example library")
+    parser.add_argument("command", choices=["import", "build", "stats"])
+    parser.add_argument("paths", nargs="*", help="JSONL files for import")
+    parser.add_argument("--embeddings", default=DEFAULT_EMBEDDINGS, help='sentence-transformers model name or "openai[:model]"')
+    parser.add_argument("--directory", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--kind", default="flat", help="ANN index kind: flat, hnsw or ivfpq")
+    args = parser.parse_args()
+
+    library = ExampleLibrary(os.path.join(args.directory, "library.sqlite"))
+    library.add(FEW_SHOTS.items(), source="builtin")
+    if args.command == "import":
+        for path in args.paths:
+            print(path, json.dumps(library.import_jsonl(path)))
+    if args.command in ("import", "build"):
+        print(json.dumps(FewShotStore(library, args.directory, args.embeddings, args.kind).build()))
+    if args.command == "stats":
+        print(json.dumps(library.stats(), ensure_ascii=False, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Hybrid sparse + dense retrieval with reciprocal rank fusion (RRF).
+
+- BM25Index: persistent inverted index in SQLite. Korean text is tokenized into
+  character bigrams per word (plus the whole word), so exact terms such as
+  "정책금융" match without a morphological analyzer.
+- HybridRetriever: a LangChain retriever that takes the top fetch_k results from
+  BM25 and from the dense vector store, fuses the two rankings with
+  score = sum(1 / (rrf_k + rank)) and returns the top k documents.
+
+    sparse = BM25Index()
+    sparse.sync_from_chroma(docsearch)          # incremental, keyed by Chroma ids
+    retriever = HybridRetriever(sparse=sparse, vectorstore=docsearch, k=3)
+    retriever.invoke("혁신성장 정책금융에 대해서 설명해줘")
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "bm25.sqlite")
+WORD_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+
+
+def tokenize(text: str, n: int = 2) -> List[str]:
+    tokens = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > n and not word.isascii():
+            tokens.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return tokens
+
+
+def doc_key(document: Document) -> str:
+    return document.metadata.get("chunk_id") or hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                id TEXT PRIMARY KEY,
+                length INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+            """
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def ids(self) -> set:
+        return {row[0] for row in self._conn.execute("SELECT id FROM docs")}
+
+    def add(self, documents: Sequence[Document], ids: Optional[Sequence[str]] = None) -> None:
+        ids = list(ids) if ids is not None else [doc_key(doc) for doc in documents]
+        with self._lock:
+            for doc_id, document in zip(ids, documents):
+                counts = Counter(tokenize(document.page_content))
+                self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO docs (id, length, content, metadata) VALUES (?, ?, ?, ?)",
+                    (doc_id, sum(counts.values()), document.page_content, json.dumps(document.metadata, ensure_ascii=False)),
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in counts.items()],
+                )
+            self._conn.commit()
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM postings WHERE doc_id = ?", [(doc_id,) for doc_id in ids])
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._conn.commit()
+
+    def sync_from_chroma(self, vectorstore) -> Dict:
+        """Mirror a Chroma collection: index ids that are new there, drop ids that are gone."""
+        data = vectorstore.get(include=["documents", "metadatas"])
+        wanted = dict(zip(data["ids"], zip(data["documents"], data["metadatas"])))
+        existing = self.ids()
+        stale = list(existing - set(wanted))
+        fresh = [doc_id for doc_id in wanted if doc_id not in existing]
+        if stale:
+            self.delete(stale)
+        if fresh:
+            self.add(
+                [Document(page_content=wanted[doc_id][0], metadata=wanted[doc_id][1] or {}) for doc_id in fresh],
+                ids=fresh,
+            )
+        return {"added": len(fresh), "removed": len(stale)}
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        terms = Counter(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            n_docs, total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            if not n_docs:
+                return []
+            avg_length = total_length / n_docs
+            scores: Dict[str, float] = {}
+            for term, query_tf in terms.items():
+                postings = self._conn.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + query_tf * idf * tf * (self.k1 + 1) / norm
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            results = []
+            for doc_id, score in top:
+                content, metadata = self._conn.execute(
+                    "SELECT content, metadata FROM docs WHERE id = ?", (doc_id,)
+                ).fetchone()
+                metadata = json.loads(metadata)
+                metadata.setdefault("chunk_id", doc_id)
+                results.append((Document(page_content=content, metadata=metadata), score))
+            return results
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = doc_key(document)
+            documents.setdefault(key, document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ordered = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    sparse: BM25Index
+    vectorstore: object
+    k: int = 3
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        sparse = [doc for doc, _ in self.sparse.search(query, self.fetch_k)]
+        dense = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        return reciprocal_rank_fusion([sparse, dense], self.k, self.rrf_k)
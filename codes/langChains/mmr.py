@@ -0,0 +1,103 @@
+"""
+Vectorized maximal marginal relevance (MMR) re-ranking.
+
+Candidates are a contiguous float32 matrix of L2-normalized embeddings, so
+cosine similarity is a dot product. Query similarities for all candidates (and
+all queries of a batch) come from one matmul. During the greedy selection each
+candidate keeps its max similarity to the already selected items, and every
+step only adds one matrix-vector product instead of recomputing the n x n
+similarity matrix.
+
+    order = mmr_select(query_vector, candidates, k=3, lambda_mult=0.5)
+    orders = mmr_select_batch(query_matrix, candidates, k=3)
+
+MMRRetriever keeps the whole collection as one normalized matrix, takes the
+fetch_k nearest chunks with a matmul and re-ranks them with mmr_select.
+"""
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select_batch(queries: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> np.ndarray:
+    """
+    queries: (m, d) normalized, candidates: (n, d) normalized, shared by all queries.
+    Returns an (m, min(k, n)) array of candidate indices in selection order.
+    """
+    queries = np.atleast_2d(queries)
+    n = candidates.shape[0]
+    k = min(k, n)
+    m = queries.shape[0]
+    relevance = queries @ candidates.T  # (m, n), the only full matmul
+    max_similarity = np.full((m, n), -np.inf, dtype=np.float32)
+    selected = np.empty((m, k), dtype=np.int64)
+    available = np.ones((m, n), dtype=bool)
+    rows = np.arange(m)
+    for step in range(k):
+        if step == 0:
+            scores = relevance.copy()
+        else:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        picked = np.argmax(scores, axis=1)
+        selected[:, step] = picked
+        available[rows, picked] = False
+        # Similarity of every candidate to the item just picked by each query: (m, n)
+        max_similarity = np.maximum(max_similarity, candidates[picked] @ candidates.T)
+    return selected
+
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    return mmr_select_batch(np.asarray(query, dtype=np.float32).reshape(1, -1), candidates, k, lambda_mult)[0].tolist()
+
+
+class MMRRetriever(BaseRetriever):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    embeddings: Embeddings
+    matrix: np.ndarray
+    documents: List[Document]
+    k: int = 3
+    fetch_k: int = 100
+    lambda_mult: float = 0.5
+
+    @classmethod
+    def from_chroma(cls, vectorstore, embeddings: Embeddings, **kwargs) -> "MMRRetriever":
+        """Load every embedding of a Chroma collection once into one normalized float32 matrix."""
+        data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=text, metadata={**(metadata or {}), "chunk_id": doc_id})
+            for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        ]
+        return cls(embeddings=embeddings, matrix=normalize_rows(data["embeddings"]), documents=documents, **kwargs)
+
+    def _candidates(self, query_vectors: np.ndarray) -> np.ndarray:
+        # Nearest fetch_k chunks per query; MMR does not need them sorted
+        scores = query_vectors @ self.matrix.T
+        fetch_k = min(self.fetch_k, len(self.documents))
+        return np.argpartition(-scores, fetch_k - 1, axis=1)[:, :fetch_k]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.batch_relevant_documents([query])[0]
+
+    def batch_relevant_documents(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        """Re-rank several queries at once; each query gets its own fetch_k candidates."""
+        k = k or self.k
+        query_vectors = normalize_rows([self.embeddings.embed_query(query) for query in queries])
+        results = []
+        for query_vector, candidate_ids in zip(query_vectors, self._candidates(query_vectors)):
+            order = mmr_select(query_vector, self.matrix[candidate_ids], k, self.lambda_mult)
+            results.append([self.documents[candidate_ids[i]] for i in order])
+        return results
@@ -0,0 +1,239 @@
+"""
+Incremental PDF ingestion into a persistent Chroma collection.
+
+Every source file and every chunk is identified by a sha256 hash. A manifest
+next to the Chroma files remembers which chunks came from which file version:
+- unchanged files are skipped without being parsed
+- changed files are re-split, and only chunks whose hash is new get embedded
+- chunks that disappeared from a changed file, or belong to a deleted file,
+  are removed from the collection
+
+Re-running on an unchanged corpus makes no embedding calls and does not even
+load the embedding model.
+
+    ~codes/langChains$ python pdf_ingest.py 이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf
+    ~codes/langChains$ python pdf_ingest.py ./reports --persist-dir ./.chroma --collection reports
+
+    from pdf_ingest import ingest, open_vectorstore
+    stats = ingest(["reports/"], prune=True)   # prune: drop files no longer under reports/
+    docsearch = open_vectorstore()
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from embedding_engine import EmbeddingEngine, index_documents
+from pdf_stream import iter_chunks, iter_file_chunks
+
+DEFAULT_PERSIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chroma")
+DEFAULT_COLLECTION = "pdf_chunks"
+DEFAULT_MODEL_NAME = "jhgan/ko-sbert-nli"
+MANIFEST_NAME = "ingest_manifest.json"
+
+
+def build_embeddings(model_name: str = DEFAULT_MODEL_NAME):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name, model_kwargs={}, encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(source: str, chunks: List[Document]) -> List[str]:
+    """Content-based ids; repeated identical chunks in one file get an occurrence suffix."""
+    ids, seen = [], {}
+    for chunk in chunks:
+        base = hashlib.sha256(f"{source}\x00{chunk.page_content}".encode("utf-8")).hexdigest()
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return ids
+
+
+def resolve_sources(sources: Iterable[str]) -> List[str]:
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, names in os.walk(source):
+                files.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+        else:
+            files.append(source)
+    return sorted({os.path.abspath(path) for path in files})
+
+
+def load_chunks(path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Document]:
+    return list(iter_chunks([path], chunk_size, chunk_overlap, workers=1))
+
+
+class IngestManifest:
+    """{absolute path: {"sha256": file hash, "chunk_ids": [...]}} stored as JSON next to the collection."""
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        self.path = os.path.join(persist_directory, f"{collection_name}.{MANIFEST_NAME}")
+        self.files: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.files = json.load(f)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.files, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def open_vectorstore(
+    persist_directory: str = DEFAULT_PERSIST_DIR,
+    collection_name: str = DEFAULT_COLLECTION,
+    embeddings=None,
+) -> Chroma:
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings if embeddings is not None else build_embeddings(),
+        persist_directory=persist_directory,
+    )
+
+
+def ingest(
+    sources: Iterable[str],
+    persist_directory: str = DEFAULT_PERSIST_DIR,
+    collection_name: str = DEFAULT_COLLECTION,
+    embeddings_factory: Callable = build_embeddings,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    prune: bool = False,
+    add_window: int = 1024,
+    parse_workers: Optional[int] = 1,
+) -> Dict:
+    """
+    Bring the given files/directories up to date in the collection and return counters.
+    With prune=True, files in the manifest that are not among sources are removed; leave
+    it off when several callers ingest into the same collection.
+    Changed files are parsed page-parallel on parse_workers processes (None: one per core;
+    on spawn platforms such as Windows and macOS the caller then needs a __main__ guard).
+    """
+    started = time.perf_counter()
+    manifest = IngestManifest(persist_directory, collection_name)
+    files = resolve_sources(sources)
+    stats = {"files_unchanged": 0, "files_updated": 0, "files_removed": 0,
+             "chunks_added": 0, "chunks_removed": 0, "seconds": 0.0}
+    vectorstore: Optional[Chroma] = None
+
+    def store() -> Chroma:
+        # The embedding model is only loaded once there is something to change
+        nonlocal vectorstore
+        if vectorstore is None:
+            vectorstore = open_vectorstore(persist_directory, collection_name, embeddings_factory())
+        return vectorstore
+
+    changed = {}
+    for path in files:
+        sha256 = file_sha256(path)
+        entry = manifest.files.get(path)
+        if entry is not None and entry["sha256"] == sha256:
+            stats["files_unchanged"] += 1
+        else:
+            changed[path] = sha256
+
+    def apply(path: str, chunks: List[Document]) -> None:
+        sha256 = changed[path]
+        entry = manifest.files.get(path)
+        ids = chunk_ids(path, chunks)
+        old_ids = set(entry["chunk_ids"]) if entry else set()
+        new_docs, new_ids = [], []
+        for chunk_id, chunk in zip(ids, chunks):
+            if chunk_id in old_ids:
+                continue
+            chunk.metadata.update({"source": path, "file_sha256": sha256, "chunk_id": chunk_id})
+            new_docs.append(chunk)
+            new_ids.append(chunk_id)
+        stale_ids = list(old_ids - set(ids))
+
+        if stale_ids:
+            store().delete(ids=stale_ids)
+        if new_docs:
+            index_documents(new_docs, store(), window=add_window, ids=new_ids)
+        manifest.files[path] = {"sha256": sha256, "chunk_ids": ids}
+        manifest.save()
+        stats["files_updated"] += 1
+        stats["chunks_added"] += len(new_ids)
+        stats["chunks_removed"] += len(stale_ids)
+
+    # Files are parsed in parallel but applied one at a time, in order
+    parsed = set()
+    for path, chunks in iter_file_chunks(list(changed), chunk_size, chunk_overlap, workers=parse_workers):
+        apply(path, chunks)
+        parsed.add(path)
+    for path in changed:
+        if path not in parsed:
+            # No extractable text
+            apply(path, [])
+
+    if prune:
+        for path in sorted(set(manifest.files) - set(files)):
+            stale_ids = manifest.files.pop(path)["chunk_ids"]
+            if stale_ids:
+                store().delete(ids=stale_ids)
+            manifest.save()
+            stats["files_removed"] += 1
+            stats["chunks_removed"] += len(stale_ids)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest PDF files into a persistent Chroma collection")
+    parser.add_argument("sources", nargs="+", help="PDF files or directories containing PDF files")
+    parser.add_argument("--persist-dir", default=DEFAULT_PERSIST_DIR)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--model-name", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--no-prune", action="store_true", help="keep chunks of files not listed in sources")
+    parser.add_argument("--batch-size", type=int, default=32, help="texts per embedding batch")
+    parser.add_argument("--workers", type=int, default=1, help="embedding processes (0 = one per CPU core)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="PDF parsing processes (0 = one per CPU core)")
+    args = parser.parse_args()
+
+    engines = []
+
+    def embeddings_factory():
+        engines.append(EmbeddingEngine(args.model_name, batch_size=args.batch_size, workers=args.workers))
+        return engines[-1]
+
+    try:
+        stats = ingest(
+            args.sources,
+            persist_directory=args.persist_dir,
+            collection_name=args.collection,
+            embeddings_factory=embeddings_factory,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            prune=not args.no_prune,
+            parse_workers=args.parse_workers or None,
+        )
+    finally:
+        for engine in engines:
+            engine.close()
+    if engines:
+        stats["embed_chunks_per_second"] = round(engines[0].chunks_per_second(), 1)
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
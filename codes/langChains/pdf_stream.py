@@ -0,0 +1,114 @@
+"""
+Streaming, page-parallel PDF loading and splitting.
+
+Pages are extracted with pypdf in a process pool (page ranges of several files
+are in flight at once) and come back in document order. The recursive splitter
+runs per page; the last chunk_overlap characters of a page are carried into the
+next page, so chunks still overlap across page boundaries. Everything is a
+generator, and only max_inflight page ranges are held at a time, so memory stays
+flat no matter how many PDFs are processed.
+
+    for batch in batched(iter_chunks(["reports/a.pdf", "reports/b.pdf"], workers=4), 512):
+        vectorstore.add_documents(batch)
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+PAGES_PER_TASK = 8
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(start, stop)]
+
+
+def _page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def _tasks(paths: Iterable[str], pages_per_task: int) -> Iterator[Tuple[str, int, int]]:
+    # Page ranges (path, start, stop); page counts are read lazily, one file at a time
+    for path in paths:
+        count = _page_count(path)
+        for start in range(0, count, pages_per_task):
+            yield path, start, min(start + pages_per_task, count)
+
+
+def iter_pages(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    pages_per_task: int = PAGES_PER_TASK,
+    max_inflight: Optional[int] = None,
+) -> Iterator[Tuple[str, int, str]]:
+    """Yield (path, page number, text) in document order while later pages are parsed in parallel."""
+    workers = workers or os.cpu_count() or 1
+    tasks = _tasks(paths, pages_per_task)
+    if workers == 1:
+        for path, start, stop in tasks:
+            for number, text in _extract_pages(path, start, stop):
+                yield path, number, text
+        return
+
+    max_inflight = max_inflight or workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path, start, stop in itertools.islice(tasks, max_inflight):
+            pending.append((path, pool.submit(_extract_pages, path, start, stop)))
+        while pending:
+            path, future = pending.popleft()
+            for next_path, start, stop in itertools.islice(tasks, 1):
+                pending.append((next_path, pool.submit(_extract_pages, next_path, start, stop)))
+            for number, text in future.result():
+                yield path, number, text
+
+
+def iter_chunks(
+    paths: Iterable[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    workers: Optional[int] = None,
+) -> Iterator[Document]:
+    """Split pages as they arrive, carrying chunk_overlap characters across page boundaries."""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    current_path, carry = None, ""
+    for path, number, text in iter_pages(paths, workers=workers):
+        if path != current_path:
+            current_path, carry = path, ""
+        if not text.strip():
+            continue
+        chunks = text_splitter.split_text(f"{carry} {text}" if carry else text)
+        for chunk in chunks:
+            yield Document(page_content=chunk, metadata={"source": path, "page": number})
+        carry = chunks[-1][-chunk_overlap:] if chunks and chunk_overlap else ""
+
+
+def iter_file_chunks(
+    paths: Iterable[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[str, List[Document]]]:
+    """Like iter_chunks, but grouped per file: yields (path, chunks of that file)."""
+    for path, chunks in itertools.groupby(
+        iter_chunks(paths, chunk_size, chunk_overlap, workers), key=lambda doc: doc.metadata["source"]
+    ):
+        yield path, list(chunks)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,254 @@
+"""
+Compact embedding storage: int8 / float16 codes with float32 re-scoring.
+
+Each field is its own flat file in the store directory, so every file can be
+memory-mapped on its own and the search only touches the fields it needs:
+
+    <directory>/meta.json        {"dtype": "int8", "n": ..., "dim": ..., "fingerprint": ...}
+    <directory>/codes.bin        (n, dim) int8 or float16, scanned for every query
+    <directory>/scale.f32        (dim,) per-dimension step        (int8 only)
+    <directory>/offset.f32       (dim,) per-dimension minimum     (int8 only)
+    <directory>/vectors.f32      (n, dim) float32 originals, only the rows of
+                                 re-scored candidates are read (optional)
+    <directory>/docstore.sqlite  chunk text and metadata (ann_index.SQLiteDocstore)
+
+int8 codes use per-dimension min/max scaling: x ~= offset + scale * (code + 128),
+so a query's approximate scores are one int8 -> float32 matmul plus a bias. The
+top k * rescore candidates are then scored exactly against vectors.f32, which
+restores float32 ranking while resident memory is ~1/4 (int8) or ~1/2 (float16)
+of a float32 matrix.
+
+    store = QuantizedVectorStore.from_chroma(docsearch, hf, dtype="int8")
+    store.similarity_search("혁신성장 정책금융", k=3)
+"""
+import json
+import os
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from ann_index import SQLiteDocstore, collection_fingerprint
+from mmr import normalize_rows
+
+DEFAULT_QUANTIZED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ann")
+DTYPES = {"int8": np.int8, "float16": np.float16}
+BLOCK_ROWS = 65536
+
+
+def quantize_int8(vectors: np.ndarray, scale: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint((vectors - offset) / scale) - 128, -128, 127).astype(np.int8)
+
+
+def int8_params(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    offset = vectors.min(axis=0).astype(np.float32)
+    scale = ((vectors.max(axis=0) - offset) / 255).astype(np.float32)
+    scale[scale == 0] = 1.0
+    return scale, offset
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class QuantizedVectors:
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.dtype = self.meta["dtype"]
+        self.dim = self.meta["dim"]
+        self._open()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _memmap(self, name: str, dtype, shape):
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+
+    def _open(self) -> None:
+        n = self.meta["n"]
+        self.codes = self._memmap("codes.bin", DTYPES[self.dtype], (n, self.dim))
+        self.vectors = self._memmap("vectors.f32", np.float32, (n, self.dim)) if self.meta["float32"] else None
+        if self.dtype == "int8":
+            self.scale = np.fromfile(self._path("scale.f32"), dtype=np.float32)
+            self.offset = np.fromfile(self._path("offset.f32"), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.meta["n"]
+
+    @classmethod
+    def build(cls, vectors, directory: str, dtype: str = "int8", keep_float32: bool = True,
+              fingerprint: Optional[str] = None) -> "QuantizedVectors":
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}', expected one of {tuple(DTYPES)}")
+        vectors = normalize_rows(vectors)
+        os.makedirs(directory, exist_ok=True)
+        for name in ("codes.bin", "vectors.f32"):
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        if dtype == "int8":
+            scale, offset = int8_params(vectors)
+            scale.tofile(os.path.join(directory, "scale.f32"))
+            offset.tofile(os.path.join(directory, "offset.f32"))
+        # No fingerprint until the data is complete: an interrupted build must never look reusable
+        meta = {"dtype": dtype, "n": 0, "dim": int(vectors.shape[1]), "float32": keep_float32, "fingerprint": None}
+        _write_json_atomic(os.path.join(directory, "meta.json"), meta)
+        store = cls(directory)
+        store.append(vectors)
+        if fingerprint is not None:
+            store.set_fingerprint(fingerprint)
+        return store
+
+    def set_fingerprint(self, fingerprint: Optional[str]) -> None:
+        """Mark the directory as a complete copy of the source identified by fingerprint."""
+        self.meta["fingerprint"] = fingerprint
+        _write_json_atomic(self._path("meta.json"), self.meta)
+
+    def append(self, vectors) -> None:
+        """Append rows with the existing int8 scales (values outside the built range are clipped)."""
+        vectors = normalize_rows(vectors)
+        originals = open(self._path("vectors.f32"), "ab") if self.meta["float32"] else None
+        with open(self._path("codes.bin"), "ab") as codes:
+            for start in range(0, len(vectors), BLOCK_ROWS):
+                block = vectors[start:start + BLOCK_ROWS]
+                if self.dtype == "int8":
+                    quantize_int8(block, self.scale, self.offset).tofile(codes)
+                else:
+                    block.astype(np.float16).tofile(codes)
+                if originals is not None:
+                    block.tofile(originals)
+        if originals is not None:
+            originals.close()
+        self.meta["n"] += len(vectors)
+        _write_json_atomic(self._path("meta.json"), self.meta)
+        self._open()
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """(m, n) inner products against the dequantized codes, computed block by block."""
+        queries = np.atleast_2d(queries).astype(np.float32)
+        if self.dtype == "int8":
+            # q . (offset + scale * (code + 128)) = (q * scale) . code + q . offset + 128 * sum(q * scale)
+            scaled = queries * self.scale
+            bias = queries @ self.offset + 128 * scaled.sum(axis=1)
+        else:
+            scaled, bias = queries, 0.0
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = np.asarray(self.codes[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = scaled @ block.T
+        return scores + np.asarray(bias, dtype=np.float32).reshape(-1, 1)
+
+    def search(self, queries, k: int, rescore: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (scores, ids) per query. The k * rescore best approximate candidates are
+        re-scored with the float32 originals; rescore=0 returns the approximate ranking.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        k = min(k, len(self))
+        if not k:
+            return np.empty((len(queries), 0), np.float32), np.empty((len(queries), 0), np.int64)
+        approximate = self.approximate_scores(queries)
+        rescoring = bool(rescore) and self.vectors is not None
+        n_candidates = min(len(self), k * rescore) if rescoring else k
+        candidates = np.argpartition(-approximate, n_candidates - 1, axis=1)[:, :n_candidates]
+        if rescoring:
+            # Only the candidate rows of vectors.f32 are paged in; sorted ids read the file front to back
+            candidates = np.sort(candidates, axis=1)
+            scores = np.einsum("md,mcd->mc", queries, self.vectors[candidates])
+        else:
+            scores = np.take_along_axis(approximate, candidates, axis=1)
+        order = np.argsort(-scores, axis=1)[:, :k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(candidates, order, axis=1)
+
+    def nbytes(self) -> dict:
+        resident = self.codes.nbytes + (self.scale.nbytes + self.offset.nbytes if self.dtype == "int8" else 0)
+        return {"resident": int(resident), "float32_matrix": len(self) * self.dim * 4,
+                "float32_on_disk": int(self.vectors.nbytes) if self.vectors is not None else 0}
+
+
+class QuantizedVectorStore(VectorStore):
+    def __init__(self, embedding: Embeddings, vectors: QuantizedVectors, docstore: SQLiteDocstore, rescore: int = 4):
+        self.embedding = embedding
+        self.vectors = vectors
+        self.docstore = docstore
+        self.rescore = rescore
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        ids = list(range(len(self.vectors), len(self.vectors) + len(texts)))
+        self.vectors.append(self.embedding.embed_documents(texts))
+        self.docstore.add(ids, texts, metadatas or [{} for _ in texts])
+        return [str(i) for i in ids]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        scores, ids = self.vectors.search([embedding], k, self.rescore)
+        documents = self.docstore.get([int(i) for i in ids[0]])
+        return list(zip(documents, scores[0].tolist()))
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   dtype: str = "int8", directory: Optional[str] = None, **kwargs: Any) -> "QuantizedVectorStore":
+        texts = list(texts)
+        directory = directory or os.path.join(DEFAULT_QUANTIZED_DIR, f"texts.{dtype}")
+        vectors = QuantizedVectors.build(embedding.embed_documents(texts), directory, dtype)
+        docstore = cls._fresh_docstore(directory)
+        docstore.add(list(range(len(texts))), texts, metadatas or [{} for _ in texts])
+        return cls(embedding, vectors, docstore, **kwargs)
+
+    @staticmethod
+    def _fresh_docstore(directory: str) -> SQLiteDocstore:
+        path = os.path.join(directory, "docstore.sqlite")
+        if os.path.exists(path):
+            os.remove(path)
+        return SQLiteDocstore(path)
+
+    @classmethod
+    def from_chroma(cls, vectorstore, embedding: Embeddings, dtype: str = "int8", directory: Optional[str] = None,
+                    keep_float32: bool = True, rescore: int = 4) -> "QuantizedVectorStore":
+        """Quantize the vectors stored in a Chroma collection; reused from disk until the collection ids or dtype change."""
+        directory = directory or os.path.join(DEFAULT_QUANTIZED_DIR, f"{vectorstore._collection.name}.{dtype}")
+        fingerprint = collection_fingerprint(vectorstore.get(include=[])["ids"])
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if (meta.get("fingerprint") == fingerprint and meta.get("dtype") == dtype
+                    and meta.get("float32") == keep_float32):
+                return cls(embedding, QuantizedVectors(directory),
+                           SQLiteDocstore(os.path.join(directory, "docstore.sqlite")), rescore)
+
+        data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        vectors = QuantizedVectors.build(data["embeddings"], directory, dtype, keep_float32)
+        docstore = cls._fresh_docstore(directory)
+        docstore.add(
+            list(range(len(data["ids"]))),
+            data["documents"],
+            [{**(metadata or {}), "chunk_id": doc_id} for doc_id, metadata in zip(data["ids"], data["metadatas"])],
+        )
+        # Written last: only a directory with all vectors and documents is reused
+        vectors.set_fingerprint(fingerprint)
+        return cls(embedding, vectors, docstore, rescore)
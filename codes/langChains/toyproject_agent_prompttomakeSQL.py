@@ -47,38 +47,29 @@ from langchain.utilities import SQLDatabase  # 또는 langchain_community.utilit
 llm = ChatOpenAI (model_name="gpt-4-1106-preview", temperature=0)
 toolkit = SQLDatabaseToolkit (db=db, llm=llm)
 
-few_shots = {
-  "List all artists.": "SELECT * FROM artists;"
-  ,"Find all albums for the artist 'AC/DC'.": "SELECT albums.Title FROM albums JOIN artists ON albums.ArtistId = artists.ArtistId WHERE artists.Name = 'AC/DC'"
-  ,"List all tracks in the 'Rock' genre.": "SELECT tracks.Name FROM tracks JOIN genres ON tracks.GenreId = genres.GenreId WHERE genres.Name = 'Rock'"
-  ,"Find the total duration of all tracks.": "SELECT SUM(Mi |liseconds) FROM tracks;"
-  ,"List all customers from Canada.": "SELECT * FROM customers WHERE Country = 'Canada' ; "
-  ,"How many tracks are there in the album with ID ?": "SELECT COUNT(*) FROM tracks WHERE AlbumId = 5; "
-  ,"Find the total number of invoices.": "SELECT COUNT(*) FROM invoices; "
-  ,"List all tracks that are longer than 5 minutes.": "SELECT * FROM tracks WHERE Mi | liseconds > 300000;"
-  ,"Who are the top 5 customers by total purchase?": "SELECT c.FirstName, c.LastName, SUM(i.Total) as TotalPurchase FROM customers c JOIN invoices i ON c.CustomerId = i.CustomerId GROUP BY c.CustomerId ORDER BY TotalPurchase DESC "
-  ,"Which albums are from the year 2000?": "SELECT * FROM albums WHERE strft ime('%Y', ReleaseDate) = '2000' ;"
-  ,"How many employees are there": 'SELECT COUNT (*) FROM "employee"' ,
-}
-
-from langchain_openai import OpenAIEmbeddings
-from langchain.schema import Document
-from langchain_community.vectorstores import FAISS
-embeddings = OpenAIEmbeddings ( )
-few_shot_docs = [
-  Document (page_content=question, metadata={"sal _query": few_shots[question] })
-  for question in few_shots.keys()
-]
-vector_db = FAISS. from_documents(few_shot_docs, embeddings)
-retriever = vector_db.as_retriever ()
+# few-shot 예제는 라이브러리(codes/langChains/.cache/few_shot_sql/library.sqlite)에 저장하고
+# 인덱스는 첫 검색 때 불러옴 (시작 시 임베딩 호출 없음, 예제가 바뀌면 새 질문만 임베딩)
+# 운영 로그에서 모은 예제 추가: python few_shot_store.py import harvested.jsonl
+# FEW_SHOT_EMBEDDINGS=openai 이면 OpenAIEmbeddings, 기본은 로컬 sentence-transformers 모델
+# 예제가 많아지면 ANN_INDEX=hnsw 또는 ivfpq 로 근사 검색 인덱스 사용 (기본: flat, 정확 검색)
+from few_shot_store import EXAMPLE_TEMPLATE, FEW_SHOTS, ExampleLibrary, FewShotStore, LazyFewShotRetriever
+few_shots = FEW_SHOTS
+example_library = ExampleLibrary()
+example_library.add(few_shots.items(), source="builtin")
+few_shot_store = FewShotStore(example_library, kind=os.getenv("ANN_INDEX", "flat"))
+# 비슷한 예제끼리 프롬프트를 채우지 않도록 MMR 순서로, 토큰 예산 안에서만 선택
+retriever = LazyFewShotRetriever(store=few_shot_store, token_budget=600)
 
 from langchain.agents.agent_toolkits import create_retriever_tool
+from langchain_core.prompts import PromptTemplate
 tool_description = """
 이 도구는 유사한 예시를 이해하여 사용자 질문에 적용하는 데 도움이 됩니다.
 이 도구에 입력하는 내용은 사용자 질문이어야 합니다.
 """
+# 질문만이 아니라 예제 SQL까지 에이전트에게 전달
 retriever_tool = create_retriever_tool (
-    retriever, name="sql_get_similar_examples" , description=tool_description
+    retriever, name="sql_get_similar_examples" , description=tool_description,
+    document_prompt=PromptTemplate.from_template(EXAMPLE_TEMPLATE),
 )
 custom_tool_list = [retriever_tool]
 
@@ -99,33 +90,61 @@ agent = create_sql_agent(
     suffix=custom_suffix,
 )
 
+# 실행마다 콜백을 새로 만들어 이번 질문의 메시지와 LLM/도구 호출 시간만 기록
+# (Streamlit 앱의 agent_trace.py 와 같은 방식, 이 예제 안에서만 쓰는 간단한 버전)
+import time
+from collections import deque
 from langchain.callbacks.base import BaseCallbackHandler
 
 class MessageCaptureCallback(BaseCallbackHandler):
-    def __init__(self):
-        self.messages = []
-    
+    def __init__(self, max_messages=256):
+        self.messages = deque(maxlen=max_messages)
+        self.timings = deque(maxlen=max_messages)
+        self._started = {}
+
+    def _start(self, run_id, name):
+        self._started[run_id] = (name, time.perf_counter())
+
+    def _end(self, run_id):
+        if run_id in self._started:
+            name, started = self._started.pop(run_id)
+            self.timings.append({"name": name, "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name", "tool"))
+
     def on_agent_action(self, action, **kwargs):
         self.messages.append({"agent_action": str(action)})
-    
-    def on_tool_end(self, output, **kwargs):
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
         self.messages.append({"tool_output": output})
-    
+
     def on_chain_end(self, outputs, **kwargs):
         self.messages.append({"chain_output": str(outputs)})
 
-
+question = "How many employees do we have?"
 message_callback = MessageCaptureCallback()
 
 # 콜백 핸들러를 사용하여 agent 실행
-result = agent.run("How many employees do we have?", callbacks=[message_callback])
+result = agent.run(question, callbacks=[message_callback])
+messages = list(message_callback.messages)
 
 # 수집된 모든 메시지 출력
 from pprint import pprint
 
 # 모든 메시지 확인
 print("\n==== 수집된 모든 메시지 ====\n")
-for i, msg in enumerate(message_callback.messages):
+for i, msg in enumerate(messages):
     print(f"메시지 {i+1} : {msg.keys()}):")
     # pprint(msg, width=100, depth=2)
     print("-" * 50)
@@ -133,10 +152,15 @@ for i, msg in enumerate(message_callback.messages):
 # 결과와 메시지를 변수에 저장
 agent_execution_data = {
     "final_result": result,
-    "all_messages": message_callback.messages
+    "all_messages": messages,
+    "timings": list(message_callback.timings),
 }
 
 # 특정 유형의 메시지만 필터링하기 (예: agent_action만 보기)
-agent_actions_only = [msg for msg in message_callback.messages if "agent_action" in msg.keys()]
+agent_actions_only = [msg for msg in messages if "agent_action" in msg.keys()]
 print("\n==== Agent 액션만 필터링 ====\n")
-pprint(agent_actions_only)
\ No newline at end of file
+pprint(agent_actions_only)
+
+# 구간별 지연 시간
+print("\n==== 구간별 지연 시간 ====\n")
+pprint(list(message_callback.timings))
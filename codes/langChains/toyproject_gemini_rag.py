@@ -51,17 +51,11 @@ from IPython.display import Markdown
 result= llm.invoke("네이버에 대해 보고서를 작성해줘")
 print(result.content)
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
-from langchain.document_loaders import PyPDFLoader
-
-loader = PyPDFLoader("codes/langChains/이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf")
-pages = loader.load_and_split()
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-texts = text_splitter.split_documents(pages)
-
-# texts
-print(type(texts))
+from ann_index import ANNVectorStore
+from quantized_store import QuantizedVectorStore
+from embedding_cache import CachedEmbeddings
+from hybrid_retriever import BM25Index, HybridRetriever
+from pdf_ingest import ingest, open_vectorstore
 
 from langchain_huggingface import HuggingFaceEmbeddings
 model_name = "jhgan/ko-sbert-nli"
@@ -70,14 +64,33 @@ model_kwargs = {}
 encode_kwargs = {'normalize_embeddings': True}
 
 os.environ["HF_TOKEN"] = os.getenv("HF_TOKEN")
-hf = HuggingFaceEmbeddings(
+# 같은 청크/질문은 다시 인코딩하지 않도록 디스크 임베딩 캐시로 감쌈 (codes/langChains/.cache/embeddings)
+hf = CachedEmbeddings(HuggingFaceEmbeddings(
   model_name=model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs
-)
-
-docsearch = Chroma.from_documents(texts, hf)
-
-retriever = docsearch.as_retriever(search_type="mmr", search_kwargs={'k':3,'fetch_k': 10})
-retriever.get_relevant_documents("혁신성장 정책금융에 대해서 설명해줘")
+))
+
+# PDF는 처음 한 번만 파싱/임베딩하고, 이후 실행에서는 바뀐 청크만 반영 (codes/langChains/.chroma)
+ingest_stats = ingest(["codes/langChains/이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf"], embeddings_factory=lambda: hf, parse_workers=1)
+print(ingest_stats)
+
+docsearch = open_vectorstore(embeddings=hf)
+
+# retriever = docsearch.as_retriever(search_type="mmr", search_kwargs={'k':3,'fetch_k': 10})
+# 정책금융 같은 정확한 용어도 놓치지 않도록 BM25(문자 bigram) + 벡터 검색을 RRF로 결합
+sparse_index = BM25Index()
+print(sparse_index.sync_from_chroma(docsearch))
+# ANN_INDEX=flat|hnsw|ivfpq 이면 Chroma에 저장된 임베딩으로 FAISS 인덱스를 만들어 dense 검색에 사용 (codes/langChains/.ann)
+# VECTOR_QUANTIZATION=int8|float16 이면 양자화된 벡터로 후보를 찾고 상위 후보만 float32로 재채점 (메모리 1/4~1/2)
+ann_kind = os.getenv("ANN_INDEX")
+quantization = os.getenv("VECTOR_QUANTIZATION")
+if ann_kind:
+    dense_store = ANNVectorStore.from_chroma(docsearch, hf, kind=ann_kind)
+elif quantization:
+    dense_store = QuantizedVectorStore.from_chroma(docsearch, hf, dtype=quantization)
+else:
+    dense_store = docsearch
+retriever = HybridRetriever(sparse=sparse_index, vectorstore=dense_store, k=3, fetch_k=20)
+retriever.invoke("혁신성장 정책금융에 대해서 설명해줘")
 
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.runnable import RunnableMap
@@ -91,7 +104,7 @@ prompt = ChatPromptTemplate.from_template(template)
 gemini = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature = 0)
 
 chain = RunnableMap({
-  "context": lambda x: retriever.get_relevant_documents(x['question']),
+  "context": lambda x: retriever.invoke(x['question']),
   "question": lambda x: x['question']
 }) | prompt | gemini
 
@@ -0,0 +1,57 @@
+"""
+Measure the per-query overhead of building and compiling the youtube_rag graph
+on every call versus reusing the compiled graph, and the throughput of
+run_rag_workflow_batch. The LLM and search tool are zero-latency stubs, so the
+numbers are pure graph overhead.
+
+    ~codes/langGraphs$ python bench_graph_compile.py --queries 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+import youtube_rag_graph
+from bench_parallel_graph import make_stub_llm, make_stub_search
+
+
+def main():
+    parser = argparse.ArgumentParser(description="graph construction vs reuse overhead")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    youtube_rag_graph.llm = make_stub_llm(0)
+    youtube_rag_graph.web_search_tool = make_stub_search(0)
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+
+    started = time.perf_counter()
+    for _ in queries:
+        youtube_rag_graph.build_graph()
+    build_only = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    for query in queries:
+        youtube_rag_graph.build_graph().invoke(youtube_rag_graph.initial_state(query))
+    rebuild = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    for query in queries:
+        youtube_rag_graph.run_rag_workflow(query)
+    reuse = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    youtube_rag_graph.run_rag_workflow_batch(queries, max_concurrency=args.max_concurrency)
+    batch = (time.perf_counter() - started) / len(queries)
+
+    print(f"{args.queries} queries, stub LLM and search")
+    print(f"build_graph() + compile        : {build_only * 1000:.2f} ms / query")
+    print(f"build + invoke per query       : {rebuild * 1000:.2f} ms / query")
+    print(f"invoke on compiled app         : {reuse * 1000:.2f} ms / query")
+    print(f"batch (max_concurrency={args.max_concurrency:<3})   : {batch * 1000:.2f} ms / query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare wall-clock latency of the linear youtube_rag graph with the
+fan-out/fan-in youtube_rag_parallel graph.
+
+The LLM and the Tavily search tool are replaced with stubs that sleep for a
+fixed time, so the numbers only reflect the graph topology and no API keys
+or network access are needed.
+
+    ~codes/langGraphs$ python bench_parallel_graph.py --llm-latency 0.2 --search-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# youtube_rag_graph copies these into os.environ at import time
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import youtube_rag_graph
+
+
+def make_stub_llm(latency):
+    def _invoke(messages):
+        time.sleep(latency)
+        return AIMessage(content="stub answer")
+
+    async def _ainvoke(messages):
+        await asyncio.sleep(latency)
+        return AIMessage(content="stub answer")
+
+    return RunnableLambda(_invoke, afunc=_ainvoke)
+
+
+def make_stub_search(latency):
+    def _results(query):
+        return [
+            {"url": f"https://www.youtube.com/watch?v={abs(hash(query)) % 1000}", "title": query, "content": "video"},
+            {"url": f"https://example.com/{abs(hash(query)) % 1000}", "title": query, "content": "article"},
+        ]
+
+    def _invoke(query):
+        time.sleep(latency)
+        return _results(query)
+
+    async def _ainvoke(query):
+        await asyncio.sleep(latency)
+        return _results(query)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke)
+
+
+async def _time_graph(graph, queries):
+    started = time.perf_counter()
+    for query in queries:
+        await graph.ainvoke(youtube_rag_graph.initial_state(query))
+    return (time.perf_counter() - started) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stub LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="seconds per stub search call")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    youtube_rag_graph.llm = make_stub_llm(args.llm_latency)
+    youtube_rag_graph.web_search_tool = make_stub_search(args.search_latency)
+
+    queries = [f"benchmark query {i}" for i in range(args.runs)]
+    linear = asyncio.run(_time_graph(youtube_rag_graph.app, queries))
+    parallel = asyncio.run(_time_graph(youtube_rag_graph.parallel_app, queries))
+
+    print(f"llm latency {args.llm_latency:.3f}s, search latency {args.search_latency:.3f}s, {args.runs} runs")
+    print(f"youtube_rag           : {linear:.3f}s / query")
+    print(f"youtube_rag_parallel  : {parallel:.3f}s / query")
+    print(f"speedup               : {linear / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
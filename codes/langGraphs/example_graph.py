@@ -1,4 +1,4 @@
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
 from typing import Dict, TypedDict, List
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
@@ -7,6 +7,9 @@ from langchain_openai import ChatOpenAI
 class AgentState(TypedDict):
     messages: List[str]
     next_steps: List[str]
+    summary: str
+    iterations: int
+    tokens_used: int
 
 from dotenv import load_dotenv
 import os
@@ -14,6 +17,14 @@ import os
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
+# 루프 종료 조건: think -> respond 반복 횟수와 누적 토큰 예산
+MAX_ITERATIONS = int(os.getenv("EXAMPLE_MAX_ITERATIONS") or 5)
+TOKEN_BUDGET = int(os.getenv("EXAMPLE_TOKEN_BUDGET") or 20000)
+# messages 총 길이가 이 값을 넘으면 오래된 메시지를 요약으로 압축
+SUMMARY_THRESHOLD_CHARS = int(os.getenv("EXAMPLE_SUMMARY_CHARS") or 4000)
+# 요약 후에도 그대로 유지할 최근 메시지 수
+KEEP_RECENT_MESSAGES = 2
+
 # LLM 정의
 llm = ChatOpenAI(
     model="gpt-3.5-turbo",
@@ -21,30 +32,69 @@ llm = ChatOpenAI(
 )
 
 
+def count_tokens(response, prompt: str) -> int:
+    # usage 정보가 없으면 대략 4글자 = 1토큰으로 추정
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens") or (len(prompt) + len(response.content)) // 4
+
+
+def _conversation(state: AgentState) -> str:
+    recent = "\n".join(state["messages"])
+    if state.get("summary"):
+        return f"Summary of the earlier conversation:\n{state['summary']}\n\nRecent messages:\n{recent}"
+    return recent
+
+
 # 노드 함수 정의
 def think(state: AgentState) -> AgentState:
     prompt = PromptTemplate.from_template(
         "Based on the conversation, what should be done next?\n\n{messages}"
-    )
-    response = llm.invoke(prompt.format(messages="\n".join(state["messages"])))
+    ).format(messages=_conversation(state))
+    response = llm.invoke(prompt)
     state["next_steps"] = [response.content]
+    state["tokens_used"] = state.get("tokens_used", 0) + count_tokens(response, prompt)
     return state
 
 def respond(state: AgentState) -> AgentState:
     prompt = PromptTemplate.from_template(
         "Provide a helpful response based on: {next_steps}"
-    )
-    response = llm.invoke(prompt.format(next_steps=state["next_steps"]))
+    ).format(next_steps=state["next_steps"])
+    response = llm.invoke(prompt)
     state["messages"].append(f"Assistant: {response.content}")
+    state["iterations"] = state.get("iterations", 0) + 1
+    state["tokens_used"] = state.get("tokens_used", 0) + count_tokens(response, prompt)
     return state
 
+def summarize(state: AgentState) -> AgentState:
+    # 최근 메시지를 제외한 나머지를 기존 요약과 합쳐 하나의 요약으로 압축
+    old_messages = state["messages"][:-KEEP_RECENT_MESSAGES]
+    prompt = PromptTemplate.from_template(
+        "Update the summary of the conversation with the new messages. Keep it short.\n\n"
+        "Current summary:\n{summary}\n\nNew messages:\n{messages}"
+    ).format(summary=state.get("summary") or "(none)", messages="\n".join(old_messages))
+    response = llm.invoke(prompt)
+    state["summary"] = response.content
+    state["messages"] = state["messages"][-KEEP_RECENT_MESSAGES:]
+    state["tokens_used"] = state.get("tokens_used", 0) + count_tokens(response, prompt)
+    return state
+
+def route_after_respond(state: AgentState) -> str:
+    if state.get("iterations", 0) >= MAX_ITERATIONS or state.get("tokens_used", 0) >= TOKEN_BUDGET:
+        return END
+    if sum(len(message) for message in state["messages"]) > SUMMARY_THRESHOLD_CHARS \
+            and len(state["messages"]) > KEEP_RECENT_MESSAGES:
+        return "summarize"
+    return "think"
+
 # 그래프 정의
 graph = StateGraph(AgentState)
 graph.add_node("think", think)
 graph.add_node("respond", respond)
+graph.add_node("summarize", summarize)
 graph.set_entry_point("think")
 graph.add_edge("think", "respond")
-graph.add_edge("respond", "think")
+graph.add_conditional_edges("respond", route_after_respond, ["think", "summarize", END])
+graph.add_edge("summarize", "think")
 
 # 그래프 컴파일
 app = graph.compile()
@@ -0,0 +1,359 @@
+"""
+Latency and token metrics for the youtube_rag graph nodes.
+
+Nodes are wrapped with @metrics.instrument("node_name"). While a node runs, the
+helpers in youtube_rag_graph.py report into the node's span (metrics.current()):
+
+- youtube_rag_node_seconds{node}              wall time of the whole node
+- youtube_rag_step_seconds{node, step}        one LLM call or one search call
+- youtube_rag_prompt_tokens{node}             prompt tokens per LLM call
+- youtube_rag_completion_tokens{node}         completion tokens per LLM call
+- youtube_rag_search_result_bytes{node}       JSON size of one search result list
+- youtube_rag_retries_total{node, step}       retried calls
+- youtube_rag_errors_total{node}              errors the node caught or raised
+
+Values are aggregated in-process as histograms with fixed buckets. Exporters
+are pluggable (any object with export(snapshot)); the defaults write the
+Prometheus text format (for a node_exporter textfile collector or a quick look)
+and a JSON file. Exports happen at most every export_interval seconds after a
+node finishes, on process exit and when export() is called. A node never waits
+for another node's export, and exporter errors are logged, never raised into
+the graph run.
+
+Metrics are off unless GRAPH_METRICS=on. When off, instrumented nodes only do
+one attribute check and the helpers get a shared no-op span.
+
+    GRAPH_METRICS=on GRAPH_METRICS_DIR=.cache/metrics langgraph dev
+"""
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "youtube_rag"
+DEFAULT_METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "metrics")
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    "node_seconds": ("Wall time of a graph node", SECONDS_BUCKETS),
+    "step_seconds": ("Wall time of one LLM or search call inside a node", SECONDS_BUCKETS),
+    "prompt_tokens": ("Prompt tokens per LLM call", TOKEN_BUCKETS),
+    "completion_tokens": ("Completion tokens per LLM call", TOKEN_BUCKETS),
+    "search_result_bytes": ("JSON size of one search result list", BYTES_BUCKETS),
+}
+COUNTERS = {
+    "retries_total": "Retried LLM or search calls",
+    "errors_total": "Errors caught or raised in a node",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-quantile (what histogram_quantile would bracket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return float(bound) if bound != "+Inf" else float("inf")
+        return float("inf")
+
+
+class NullSpan:
+    """Shared span used while metrics are disabled or outside an instrumented node."""
+
+    def step(self, name: str):
+        return _NULL_STEP
+
+    def llm(self, response) -> None:
+        pass
+
+    def search(self, results) -> None:
+        pass
+
+    def retry(self, step: str) -> None:
+        pass
+
+    def error(self) -> None:
+        pass
+
+
+class _NullStep:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STEP = _NullStep()
+NULL_SPAN = NullSpan()
+
+
+class _Step:
+    def __init__(self, span: "NodeSpan", name: str):
+        self.span = span
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.span.metrics.observe("step_seconds", time.perf_counter() - self.started, node=self.span.node, step=self.name)
+        return False
+
+
+class NodeSpan(NullSpan):
+    def __init__(self, metrics: "GraphMetrics", node: str):
+        self.metrics = metrics
+        self.node = node
+
+    def step(self, name: str):
+        return _Step(self, name)
+
+    def llm(self, response) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        if not usage:
+            token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+            usage = {"input_tokens": token_usage.get("prompt_tokens"), "output_tokens": token_usage.get("completion_tokens")}
+        if usage.get("input_tokens") is not None:
+            self.metrics.observe("prompt_tokens", usage["input_tokens"], node=self.node)
+        if usage.get("output_tokens") is not None:
+            self.metrics.observe("completion_tokens", usage["output_tokens"], node=self.node)
+
+    def search(self, results) -> None:
+        size = len(json.dumps(results, ensure_ascii=False, default=str).encode("utf-8"))
+        self.metrics.observe("search_result_bytes", size, node=self.node)
+
+    def retry(self, step: str) -> None:
+        self.metrics.inc("retries_total", node=self.node, step=step)
+
+    def error(self) -> None:
+        self.metrics.inc("errors_total", node=self.node)
+
+
+class PrometheusTextExporter:
+    """Writes the Prometheus text exposition format; with path=None, render() only."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+
+    @staticmethod
+    def render(snapshot: Dict) -> str:
+        lines = []
+        for name, series in snapshot["histograms"].items():
+            metric = f"{PREFIX}_{name}"
+            lines += [f"# HELP {metric} {HISTOGRAMS[name][0]}", f"# TYPE {metric} histogram"]
+            for entry in series:
+                labels = entry["labels"]
+                for bound, total in entry["buckets"]:
+                    lines.append(f"{metric}_bucket{_format_labels({**labels, 'le': bound})} {total}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {entry['sum']}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {entry['count']}")
+        for name, series in snapshot["counters"].items():
+            metric = f"{PREFIX}_{name}"
+            lines += [f"# HELP {metric} {COUNTERS[name]}", f"# TYPE {metric} counter"]
+            for entry in series:
+                lines.append(f"{metric}{_format_labels(entry['labels'])} {entry['value']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, snapshot: Dict) -> None:
+        if self.path:
+            _write_atomic(self.path, self.render(snapshot))
+
+
+class JSONFileExporter:
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, snapshot: Dict) -> None:
+        _write_atomic(self.path, json.dumps(snapshot, ensure_ascii=False, indent=1))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    # Scrapers must never read a half-written file; a unique temp file per write
+    # keeps concurrent writers from replacing each other's temp file
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class GraphMetrics:
+    def __init__(self, enabled: bool = False, exporters: Iterable = (), export_interval: float = 15.0):
+        self.enabled = enabled
+        self.exporters = list(exporters)
+        self.export_interval = export_interval
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], int] = {}
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._last_export = time.monotonic()
+        self._current: contextvars.ContextVar = contextvars.ContextVar("graph_metrics_span", default=NULL_SPAN)
+
+    @classmethod
+    def from_env(cls) -> "GraphMetrics":
+        enabled = (os.getenv("GRAPH_METRICS") or "").lower() in ("1", "on", "true")
+        directory = os.getenv("GRAPH_METRICS_DIR") or DEFAULT_METRICS_DIR
+        metrics = cls(
+            enabled=enabled,
+            exporters=[
+                PrometheusTextExporter(os.path.join(directory, f"{PREFIX}.prom")),
+                JSONFileExporter(os.path.join(directory, f"{PREFIX}.json")),
+            ],
+            export_interval=float(os.getenv("GRAPH_METRICS_INTERVAL") or 15),
+        )
+        if enabled:
+            atexit.register(metrics.export)
+        return metrics
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: int = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def current(self) -> NullSpan:
+        """Span of the instrumented node running in this context (NULL_SPAN when disabled)."""
+        if not self.enabled:
+            return NULL_SPAN
+        return self._current.get()
+
+    def instrument(self, node: str):
+        """Decorator for sync and async node functions; checks self.enabled on every call."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    token, started = self._enter(node)
+                    try:
+                        return await func(*args, **kwargs)
+                    except BaseException:
+                        self.inc("errors_total", node=node)
+                        raise
+                    finally:
+                        self._exit(node, token, started)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                token, started = self._enter(node)
+                try:
+                    return func(*args, **kwargs)
+                except BaseException:
+                    self.inc("errors_total", node=node)
+                    raise
+                finally:
+                    self._exit(node, token, started)
+            return wrapper
+        return decorator
+
+    def _enter(self, node: str):
+        return self._current.set(NodeSpan(self, node)), time.perf_counter()
+
+    def _exit(self, node: str, token, started: float) -> None:
+        self.observe("node_seconds", time.perf_counter() - started, node=node)
+        self._current.reset(token)
+        if self.exporters and time.monotonic() - self._last_export >= self.export_interval:
+            # Another node already exporting covers this one
+            self.export(blocking=False)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+            snapshot = {"histograms": {}, "counters": {}}
+            for (name, labels), histogram in sorted(histograms):
+                snapshot["histograms"].setdefault(name, []).append({
+                    "labels": dict(labels), "count": histogram.count, "sum": round(histogram.sum, 6),
+                    "p50": histogram.quantile(0.5), "p95": histogram.quantile(0.95),
+                    "buckets": histogram.cumulative(),
+                })
+            for (name, labels), value in sorted(counters):
+                snapshot["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return snapshot
+
+    def export(self, blocking: bool = True) -> None:
+        if not self._export_lock.acquire(blocking=blocking):
+            return
+        try:
+            self._last_export = time.monotonic()
+            snapshot = self.snapshot()
+            for exporter in self.exporters:
+                try:
+                    exporter.export(snapshot)
+                except Exception:
+                    logger.warning("graph metrics export failed: %r", exporter, exc_info=True)
+        finally:
+            self._export_lock.release()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
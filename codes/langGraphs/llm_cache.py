@@ -0,0 +1,247 @@
+"""
+LLM response cache for the youtube_rag agents.
+
+SemanticLLMCache implements LangChain's BaseCache, so a chat model opts in with
+ChatOpenAI(..., cache=SemanticLLMCache(...)). Lookups go through two tiers:
+- exact: sha256 of (model params, prompt), stored in SQLite
+- semantic: only the user query (the last human message of a chat prompt) is
+  embedded, and the closest stored query is reused when cosine similarity >=
+  similarity_threshold. Candidates must share the model params and everything
+  else in the prompt (system prompt, history), so a query never borrows the
+  answer of another node or template. Callers therefore send the template and
+  context as a system message and the query alone as the human message.
+  Queries longer than MAX_EMBED_CHARS are exact-only.
+
+Embeddings live in the same SQLite file; the FAISS index is rebuilt from them
+when the cache is opened. Least recently used entries are evicted once
+max_entries or max_bytes is exceeded.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_core.messages import BaseMessage, HumanMessage
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.sqlite")
+# Longer texts are whole prompts rather than queries; cutting them would drop the part that differs
+MAX_EMBED_CHARS = 8000
+
+
+def _exact_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _message_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    # Multimodal content: a list of strings and {"type": "text", "text": ...} blocks
+    return " ".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+
+
+def _semantic_input(prompt: str, llm_string: str) -> Tuple[str, Optional[str]]:
+    """(scope, text to embed) for a prompt; text is None when there is no user query to compare."""
+    try:
+        messages = loads(prompt)
+    except Exception:
+        messages = None
+    if not (isinstance(messages, list) and messages and all(isinstance(m, BaseMessage) for m in messages)):
+        # Completion models get the prompt as plain text
+        return llm_string, prompt
+    # Chat models get dumps(messages): a JSON envelope with \u escapes, so embed
+    # only the last human message and scope the match to the rest of the prompt
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            context = dumps(messages[:i] + messages[i + 1:])
+            return _exact_key(context, llm_string), _message_text(messages[i].content)
+    return llm_string, None
+
+
+def _saved_tokens(return_val: RETURN_VAL_TYPE) -> int:
+    total = 0
+    for generation in return_val:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        total += usage.get("total_tokens", 0)
+    return total
+
+
+class SemanticLLMCache(BaseCache):
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        embeddings: Optional[Embeddings] = None,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 5_000,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.path = path
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "saved_tokens": 0}
+        self._lock = threading.RLock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT UNIQUE NOT NULL,
+                llm_string TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                scope TEXT,
+                tokens INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        # Caches written before the scope column embedded whole prompts; those rows stay exact-only
+        if "scope" not in {row[1] for row in self._conn.execute("PRAGMA table_info(llm_cache)")}:
+            self._conn.execute("ALTER TABLE llm_cache ADD COLUMN scope TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+        self._indexes: Dict[str, Any] = {}
+        self._pending: Dict[str, Tuple[str, np.ndarray]] = {}
+        self._load_indexes()
+
+    @classmethod
+    def from_env(cls, embeddings: Optional[Embeddings] = None) -> Optional["SemanticLLMCache"]:
+        """Return a cache when LLM_CACHE is set to "on", "exact" or "semantic", otherwise None."""
+        mode = (os.getenv("LLM_CACHE") or "").lower()
+        if mode not in ("on", "exact", "semantic"):
+            return None
+        threshold = float(os.getenv("LLM_CACHE_THRESHOLD") or 0.95)
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH") or DEFAULT_DB_PATH,
+            embeddings=None if mode == "exact" else embeddings,
+            similarity_threshold=threshold,
+        )
+
+    # One inner-product index per scope (model params + non-query prompt), so answers
+    # never cross models, settings or prompt templates
+    def _index_for(self, scope: str, dim: int):
+        index = self._indexes.get(scope)
+        if index is None:
+            index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            self._indexes[scope] = index
+        return index
+
+    def _load_indexes(self) -> None:
+        rows = self._conn.execute(
+            "SELECT id, scope, embedding FROM llm_cache WHERE embedding IS NOT NULL AND scope IS NOT NULL"
+        ).fetchall()
+        for row_id, scope, blob in rows:
+            vector = np.frombuffer(blob, dtype=np.float32).reshape(1, -1)
+            self._index_for(scope, vector.shape[1]).add_with_ids(vector, np.array([row_id], dtype=np.int64))
+
+    def _embed(self, prompt: str, llm_string: str) -> Tuple[str, Optional[np.ndarray]]:
+        if self.embeddings is None:
+            return llm_string, None
+        scope, text = _semantic_input(prompt, llm_string)
+        if not text or len(text) > MAX_EMBED_CHARS:
+            return scope, None
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return scope, vector
+
+    def _hit(self, row_id: int, response: str, tokens: int, tier: str) -> RETURN_VAL_TYPE:
+        self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE id = ?", (time.time(), row_id))
+        self._conn.commit()
+        self.stats[tier] += 1
+        self.stats["saved_tokens"] += tokens
+        return loads(response)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = _exact_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT id, response, tokens FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                return self._hit(row[0], row[1], row[2], "exact_hits")
+
+        # Embed outside the lock; the vector is kept so update() does not embed twice
+        scope, vector = self._embed(prompt, llm_string)
+        with self._lock:
+            if vector is not None:
+                if len(self._pending) > 256:
+                    self._pending.clear()
+                self._pending[key] = (scope, vector)
+                index = self._indexes.get(scope)
+                if index is not None and index.ntotal:
+                    scores, ids = index.search(vector, 1)
+                    if ids[0][0] != -1 and scores[0][0] >= self.similarity_threshold:
+                        row = self._conn.execute(
+                            "SELECT id, response, tokens FROM llm_cache WHERE id = ?", (int(ids[0][0]),)
+                        ).fetchone()
+                        if row is not None:
+                            self._pending.pop(key, None)
+                            return self._hit(row[0], row[1], row[2], "semantic_hits")
+
+            self.stats["misses"] += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = _exact_key(prompt, llm_string)
+        response = dumps(return_val)
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        scope, vector = pending if pending is not None else self._embed(prompt, llm_string)
+        blob = vector.tobytes() if vector is not None else None
+        size = len(response) + (len(blob) if blob else 0)
+        with self._lock:
+            old = self._conn.execute("SELECT id FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._delete_ids([old[0]])
+            cursor = self._conn.execute(
+                "INSERT INTO llm_cache (key, llm_string, response, embedding, scope, tokens, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, llm_string, response, blob, scope if vector is not None else None,
+                 _saved_tokens(return_val), size, time.time()),
+            )
+            if vector is not None:
+                self._index_for(scope, vector.shape[1]).add_with_ids(
+                    vector, np.array([cursor.lastrowid], dtype=np.int64)
+                )
+            self._evict()
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._indexes.clear()
+            self._pending.clear()
+
+    def _delete_ids(self, row_ids: Sequence[int]) -> None:
+        self._conn.executemany("DELETE FROM llm_cache WHERE id = ?", [(row_id,) for row_id in row_ids])
+        remove = np.array(row_ids, dtype=np.int64)
+        for index in self._indexes.values():
+            index.remove_ids(remove)
+
+    def _evict(self) -> None:
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        stale = []
+        for row_id, size in self._conn.execute("SELECT id, size FROM llm_cache ORDER BY last_access").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append(row_id)
+            count -= 1
+            total -= size
+        self._delete_ids(stale)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
@@ -0,0 +1,132 @@
+"""
+Bounded message history for the LangGraph states.
+
+MessageHistoryPolicy is used as the reducer of the `messages` key, so nodes only
+return the messages they produced and the policy decides what is kept:
+- mode "all": keep every message
+- mode "ai_only": keep only AI responses, drop the prompts
+- mode "digest": replace prompts with a sha256 reference and a short preview
+- max_messages: keep only the last N messages
+- spill_chars: move message bodies longer than this into a PayloadStore and
+  keep a reference id in the state instead
+
+    class AgentState(TypedDict):
+        messages: Annotated[List, MessageHistoryPolicy.from_env()]
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+MODES = ("all", "ai_only", "digest")
+DEFAULT_PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "payloads")
+
+
+class PayloadStore:
+    """Content-addressed side store for large message bodies. Pass directory=None to keep them in memory."""
+
+    def __init__(self, directory: Optional[str] = DEFAULT_PAYLOAD_DIR):
+        self.directory = directory
+        self._memory: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def put(self, text: str) -> str:
+        payload_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if self.directory is None:
+            with self._lock:
+                self._memory[payload_id] = text
+            return payload_id
+        path = os.path.join(self.directory, f"{payload_id}.txt")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return payload_id
+
+    def get(self, payload_id: str) -> str:
+        if self.directory is None:
+            return self._memory[payload_id]
+        with open(os.path.join(self.directory, f"{payload_id}.txt"), encoding="utf-8") as f:
+            return f.read()
+
+
+def _preview(text: str, chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= chars else text[:chars] + "..."
+
+
+class MessageHistoryPolicy:
+    def __init__(
+        self,
+        mode: str = "all",
+        max_messages: Optional[int] = 20,
+        spill_chars: Optional[int] = None,
+        store: Optional[PayloadStore] = None,
+        preview_chars: int = 200,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown message history mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.max_messages = max_messages
+        self.spill_chars = spill_chars
+        self.store = store if store is not None or spill_chars is None else PayloadStore()
+        self.preview_chars = preview_chars
+
+    @classmethod
+    def from_env(cls) -> "MessageHistoryPolicy":
+        max_messages = os.getenv("MESSAGE_HISTORY_MAX")
+        spill_chars = os.getenv("MESSAGE_SPILL_CHARS")
+        return cls(
+            mode=os.getenv("MESSAGE_HISTORY_MODE") or "all",
+            max_messages=int(max_messages) if max_messages else 20,
+            spill_chars=int(spill_chars) if spill_chars else None,
+        )
+
+    def __call__(self, left: Optional[List], right) -> List:
+        """Reducer: append the new messages from a node to the retained history."""
+        if right is None:
+            right = []
+        elif not isinstance(right, list):
+            right = [right]
+        history = list(left or [])
+        for message in right:
+            message = self._retain(message)
+            if message is not None:
+                history.append(message)
+        if self.max_messages is not None and len(history) > self.max_messages:
+            history = history[-self.max_messages:]
+        return history
+
+    def _retain(self, message):
+        if not isinstance(message, BaseMessage) or not isinstance(message.content, str):
+            return message
+        if isinstance(message, AIMessage):
+            return self._spill(message)
+        if self.mode == "ai_only":
+            return None
+        if self.mode == "digest":
+            digest = hashlib.sha256(message.content.encode("utf-8")).hexdigest()
+            return message.model_copy(update={
+                "content": f"[prompt sha256:{digest[:16]}, {len(message.content)} chars] {_preview(message.content, self.preview_chars)}",
+                "additional_kwargs": {**message.additional_kwargs, "prompt_sha256": digest},
+            })
+        return self._spill(message)
+
+    def _spill(self, message: BaseMessage) -> BaseMessage:
+        if self.spill_chars is None or len(message.content) <= self.spill_chars:
+            return message
+        payload_id = self.store.put(message.content)
+        return message.model_copy(update={
+            "content": f"[payload:{payload_id} {len(message.content)} chars] {_preview(message.content, self.preview_chars)}",
+            "additional_kwargs": {**message.additional_kwargs, "payload_ref": payload_id},
+        })
+
+    def load(self, message: BaseMessage) -> str:
+        """Return the full content of a message, reading spilled payloads back from the store."""
+        payload_id = message.additional_kwargs.get("payload_ref")
+        return self.store.get(payload_id) if payload_id else message.content
@@ -0,0 +1,226 @@
+"""
+Search result cache for the Tavily web search tool.
+
+Two tiers are stacked in front of the tool:
+- MemoryLRUCache: in-process LRU, bounded by entry count and bytes
+- SQLiteCache: on-disk store shared across graph runs and processes
+
+Entries expire after a per-entry TTL. Queries are normalized (case and
+whitespace) before lookup, so "Teddy  Note" and "teddy note" share an entry.
+
+    web_search_tool = CachedSearchTool(TavilySearchResults(k=3), TieredSearchCache.from_env())
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "search_cache.sqlite")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(str(query).split()).casefold()
+
+
+class MemoryLRUCache:
+    """In-process LRU tier. Values are stored as encoded JSON so their size is known."""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: bytes, ttl: float) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (payload, time.time() + ttl)
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, key: str) -> None:
+        payload, _ = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+
+class SQLiteCache:
+    """On-disk tier. Least recently used rows are evicted once entry or byte bounds are exceeded."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, max_entries: int = 10_000, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(payload, expires_at) of a live entry, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0], row[1]
+
+    def set(self, key: str, payload: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, payload, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now + ttl, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM search_cache ORDER BY last_access").fetchall()
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM search_cache WHERE key = ?", stale)
+
+
+class TieredSearchCache:
+    """Memory tier in front of an optional disk tier, with hit/miss counters."""
+
+    def __init__(self, memory: Optional[MemoryLRUCache] = None, disk: Optional[SQLiteCache] = None,
+                 ttl: float = DEFAULT_TTL_SECONDS):
+        self.memory = memory if memory is not None else MemoryLRUCache()
+        self.disk = disk
+        self.ttl = ttl
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TieredSearchCache":
+        # SEARCH_CACHE_PATH=off keeps the cache in memory only
+        path = os.getenv("SEARCH_CACHE_PATH") or DEFAULT_DB_PATH
+        ttl = float(os.getenv("SEARCH_CACHE_TTL") or DEFAULT_TTL_SECONDS)
+        disk = None if path.lower() == "off" else SQLiteCache(path)
+        return cls(disk=disk, ttl=ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self.memory.get(key)
+        tier = "memory_hits"
+        if payload is None and self.disk is not None:
+            entry = self.disk.get(key)
+            tier = "disk_hits"
+            if entry is not None:
+                # Promote to the memory tier with the disk entry's remaining lifetime,
+                # so the memory copy never outlives it
+                payload, expires_at = entry
+                self.memory.set(key, payload, expires_at - time.time())
+        with self._stats_lock:
+            self.stats[tier if payload is not None else "misses"] += 1
+        return None if payload is None else json.loads(payload)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self.memory.set(key, payload, ttl)
+        if self.disk is not None:
+            self.disk.set(key, payload, ttl)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+class CachedSearchTool(Runnable):
+    """Drop-in wrapper for a search tool: invoke/ainvoke/batch consult the cache first."""
+
+    def __init__(self, tool: Runnable, cache: TieredSearchCache, namespace: Optional[str] = None):
+        self.tool = tool
+        self.cache = cache
+        # Different tool settings (e.g. result count) must not share entries
+        self.namespace = namespace or f"{getattr(tool, 'name', type(tool).__name__)}:{getattr(tool, 'max_results', '')}"
+
+    def _key(self, query: str) -> str:
+        return f"{self.namespace}|{normalize_query(query)}"
+
+    def invoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs) -> List[Dict]:
+        key = self._key(input)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        results = self.tool.invoke(input, config, **kwargs)
+        self._store(key, results)
+        return results
+
+    async def ainvoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs) -> List[Dict]:
+        key = self._key(input)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        results = await self.tool.ainvoke(input, config, **kwargs)
+        self._store(key, results)
+        return results
+
+    def _store(self, key: str, results: Any) -> None:
+        # Tavily returns an error string instead of raising; only cache real result lists
+        if isinstance(results, list):
+            self.cache.set(key, results)
@@ -0,0 +1,68 @@
+"""
+Print the youtube_rag answer token by token, with node progress on stderr.
+
+    ~codes/langGraphs$ python stream_rag_answer.py "테디노트는 누구인가요?"
+    ~codes/langGraphs$ python stream_rag_answer.py --fake "any query"     # no API keys needed
+    ~codes/langGraphs$ python stream_rag_answer.py --parallel "any query"  # youtube_rag_parallel graph
+
+With --fake the LLM is a streaming fake chat model and the search tool a stub.
+tests/test_stream_rag_answer.py checks that the chunks reassemble the answer in order.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+# youtube_rag_graph copies these into os.environ at import time
+if "--fake" in sys.argv:
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import youtube_rag_graph
+
+FAKE_ANSWER = "# 답변\n\n첫 번째 문장입니다. Second sentence with a URL https://example.com ."
+
+
+async def stream(query, graph):
+    started = time.perf_counter()
+    first_token = None
+    chunks = []
+    async for kind, payload in youtube_rag_graph.astream_rag_answer(query, graph=graph):
+        if kind == "progress":
+            print(f"[{time.perf_counter() - started:6.2f}s] {payload}", file=sys.stderr)
+        else:
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            chunks.append(payload)
+            print(payload, end="", flush=True)
+    print()
+    total = time.perf_counter() - started
+    if first_token is not None:
+        print(f"first token after {first_token:.2f}s, done after {total:.2f}s, {len(chunks)} chunks", file=sys.stderr)
+    return "".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the youtube_rag answer")
+    parser.add_argument("query")
+    parser.add_argument("--fake", action="store_true", help="use a fake streaming LLM and stub search")
+    parser.add_argument("--parallel", action="store_true", help="stream the youtube_rag_parallel graph")
+    args = parser.parse_args()
+
+    if args.fake:
+        from bench_parallel_graph import make_stub_search
+
+        youtube_rag_graph.llm = GenericFakeChatModel(messages=itertools.cycle([AIMessage(content=FAKE_ANSWER)]))
+        youtube_rag_graph.web_search_tool = make_stub_search(0.05)
+
+    graph = youtube_rag_graph.parallel_app if args.parallel else youtube_rag_graph.app
+    asyncio.run(stream(args.query, graph))
+
+
+if __name__ == "__main__":
+    main()
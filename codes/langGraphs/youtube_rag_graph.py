@@ -1,5 +1,6 @@
 import os
-from typing import Dict, List, TypedDict
+import asyncio
+from typing import Annotated, Dict, List, TypedDict
 import json
 import logging
 
@@ -7,7 +8,8 @@ import logging
 from langchain_openai import ChatOpenAI
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain.tools import tool
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 
 # Vector store imports
 from langchain_community.vectorstores import FAISS
@@ -16,7 +18,13 @@ from langchain_text_splitters import CharacterTextSplitter
 from langchain_core.documents import Document
 
 # LangGraph imports
-from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
+from langgraph.graph import StateGraph, START, END
+
+from graph_metrics import GraphMetrics
+from llm_cache import SemanticLLMCache
+from message_history import MessageHistoryPolicy
+from search_cache import CachedSearchTool, TieredSearchCache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -31,11 +39,66 @@ load_dotenv()
 os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
 os.environ['TAVILY_API_KEY'] = os.getenv('TAVILY_API_KEY')
 
-# Create web search tool
-web_search_tool = TavilySearchResults(k=3)
+# Create web search tool. Results are cached (memory LRU + SQLite, with TTL)
+# so repeated queries across graph runs skip the Tavily round-trip.
+web_search_tool = CachedSearchTool(TavilySearchResults(k=3), TieredSearchCache.from_env())
+
+# Maximum number of follow-up searches the researcher plans in addition to the raw query
+MAX_PLANNED_SEARCHES = 2
+
+# Per-node wall time, tokens, search result sizes and retries (GRAPH_METRICS=on,
+# see graph_metrics.py). Disabled by default; then the helpers below cost one check.
+metrics = GraphMetrics.from_env()
+
+# Tavily returns an error string instead of raising; retry such calls this many times
+SEARCH_RETRIES = int(os.getenv("SEARCH_RETRIES") or 1)
+
+def search(query: str) -> List[Dict]:
+    span = metrics.current()
+    for attempt in range(SEARCH_RETRIES + 1):
+        with span.step("search"):
+            results = web_search_tool.invoke(query)
+        if isinstance(results, list) or attempt == SEARCH_RETRIES:
+            break
+        span.retry("search")
+    span.search(results)
+    return results
+
+async def asearch(query: str) -> List[Dict]:
+    span = metrics.current()
+    for attempt in range(SEARCH_RETRIES + 1):
+        with span.step("search"):
+            results = await web_search_tool.ainvoke(query)
+        if isinstance(results, list) or attempt == SEARCH_RETRIES:
+            break
+        span.retry("search")
+    span.search(results)
+    return results
+
+def format_search_results(search_results: List[Dict]) -> str:
+    return "\n\n".join([
+        f"Source: {result['url']}\nTitle: {result['title']}\nContent: {result['content']}"
+        for result in search_results
+    ])
+
+def _format_youtube_results(query: str, search_results: List[Dict]) -> str:
+    # Filter results that are likely about YouTube videos
+    youtube_results = [
+        result for result in search_results 
+        if "youtube" in result["url"].lower() or "video" in result["content"].lower()
+    ]
+    
+    if youtube_results:
+        return "\n\n".join([
+            f"Video Information:\nTitle: {result.get('title', 'Unknown title')}\nURL: {result['url']}\nContent: {result['content']}"
+            for result in youtube_results
+        ])
+    else:
+        return f"No YouTube video information found for '{query}'. Using web search results instead:\n\n" + format_search_results(search_results[:2])
 
 # Define a more robust version of the YouTube retriever
 @tool
+@metrics.instrument("youtube_search_and_retrieve")
 def youtube_search_and_retrieve(query: str) -> str:
     """
     Search for YouTube videos and retrieve information about them without transcripts.
@@ -44,113 +107,107 @@ def youtube_search_and_retrieve(query: str) -> str:
     try:
         # Use web search to find information about YouTube videos
         search_query = f"{query} YouTube video information"
-        search_results = web_search_tool.invoke(search_query)
-        
-        # Filter results that are likely about YouTube videos
-        youtube_results = [
-            result for result in search_results 
-            if "youtube" in result["url"].lower() or "video" in result["content"].lower()
-        ]
-        
-        if youtube_results:
-            return "\n\n".join([
-                f"Video Information:\nTitle: {result.get('title', 'Unknown title')}\nURL: {result['url']}\nContent: {result['content']}"
-                for result in youtube_results
-            ])
-        else:
-            return f"No YouTube video information found for '{query}'. Using web search results instead:\n\n" + "\n\n".join([
-                f"Source: {result['url']}\nTitle: {result['title']}\nContent: {result['content']}"
-                for result in search_results[:2]
-            ])
+        search_results = search(search_query)
+        return _format_youtube_results(query, search_results)
     except Exception as e:
         logger.error(f"Error in YouTube search and retrieve: {e}")
+        metrics.current().error()
+        return f"Unable to retrieve YouTube information due to an error. Using web search as fallback for '{query}'."
+
+@metrics.instrument("youtube_search_and_retrieve")
+async def ayoutube_search_and_retrieve(query: str) -> str:
+    """Async counterpart of youtube_search_and_retrieve used by the async graph nodes."""
+    try:
+        search_query = f"{query} YouTube video information"
+        search_results = await asearch(search_query)
+        return _format_youtube_results(query, search_results)
+    except Exception as e:
+        logger.error(f"Error in YouTube search and retrieve: {e}")
+        metrics.current().error()
         return f"Unable to retrieve YouTube information due to an error. Using web search as fallback for '{query}'."
 
 # Define state schema
+# Message history retention is configured through MESSAGE_HISTORY_* env vars
+# (see message_history.py); nodes only return the messages they produced.
+message_history = MessageHistoryPolicy.from_env()
+
 class AgentState(TypedDict):
     query: str
     video_analysis: str
     research_results: str
     final_answer: str
-    messages: List
+    messages: Annotated[List, message_history]
     next: str
 
-# Create LLM
-llm = ChatOpenAI(model="gpt-4o-mini")
+def merge_search_results(left: List[Dict], right: List[Dict]) -> List[Dict]:
+    """Reducer for parallel branches: concatenate search results, keeping the first hit per URL."""
+    return _merge_search_results([left or [], right or []])
 
-# Define the Video Analysis Agent
-def video_analyzer(state: AgentState) -> AgentState:
-    query = state["query"]
-    
-    try:
-        # Create prompt for video analyzer
-        prompt = f"""You are a Video Analyzer agent.
-        Your role is to analyze content about: "{query}"
+# State schema for the fan-out/fan-in graph. Both retrieval branches write to
+# it concurrently, so every key they share needs a reducer.
+class ParallelAgentState(TypedDict):
+    query: str
+    video_analysis: str
+    search_results: Annotated[List[Dict], merge_search_results]
+    research_results: str
+    final_answer: str
+    messages: Annotated[List, message_history]
+
+# Create LLM. Set LLM_CACHE=exact|semantic to reuse stored answers for repeated
+# or near-duplicate prompts; llm_cache.stats reports hits and saved tokens.
+llm_cache = SemanticLLMCache.from_env(embeddings=OpenAIEmbeddings())
+llm = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache)
+
+def invoke_llm(messages: List) -> AIMessage:
+    span = metrics.current()
+    with span.step("llm"):
+        response = llm.invoke(messages)
+    span.llm(response)
+    return response
+
+async def ainvoke_llm(messages: List) -> AIMessage:
+    span = metrics.current()
+    with span.step("llm"):
+        response = await llm.ainvoke(messages)
+    span.llm(response)
+    return response
+
+# Each node sends its template and context as the system message and only the
+# user's query as the human message, so the semantic LLM cache compares queries
+# within the same node template and context
+def _node_messages(system_prompt: str, query: str) -> List:
+    return [SystemMessage(content=system_prompt), HumanMessage(content=query)]
+
+def _video_analyzer_messages(query: str, video_content: str) -> List:
+    prompt = f"""You are a Video Analyzer agent.
+        Your role is to analyze content about the user's query.
         Identify main topics, key points, and areas needing further research.
         This is crucial for answering the user's query.
         
         Here is the content from relevant sources:
         """
-        
-        # Get video information using the fallback tool
-        video_content = youtube_search_and_retrieve(query)
-        
-        # Add video content to prompt
-        prompt += f"\n{video_content}\n\n"
-        prompt += """Based on this information, please provide:
+    prompt += f"\n{video_content}\n\n"
+    prompt += """Based on this information, please provide:
         1. Main topics covered
         2. Key points for each topic
         3. Questions that need further research to fully answer the user's query
         
         Format your response in a clear, structured manner."""
-        
-        # Pass to LLM for analysis
-        messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages)
-        
-        # Update state
-        state["video_analysis"] = response.content
-        state["messages"] = state.get("messages", []) + messages + [response]
-    except Exception as e:
-        logger.error(f"Error in video analyzer: {e}")
-        state["video_analysis"] = f"Error analyzing video content. Proceeding with web research for: {query}"
-    
-    # Always proceed to the next step even if there was an error
-    state["next"] = "researcher"
-    return state
+    return _node_messages(prompt, query)
 
-# Define the Web Researcher Agent
-def researcher(state: AgentState) -> AgentState:
-    query = state["query"]
-    video_analysis = state["video_analysis"]
-    
-    try:
-        # Create prompt for researcher
-        prompt = f"""You are a Web Researcher agent.
+def _researcher_messages(query: str, video_analysis: str) -> List:
+    return _node_messages(f"""You are a Web Researcher agent.
         Your role is to conduct web searches to find information on topics identified from the previous analysis.
-        User's query: "{query}"
         
         Here is the previous analysis:
         {video_analysis}
         
         Based on this analysis and the user's query, find additional information that would help provide a comprehensive answer.
-        """
-        
-        # Pass to LLM to decide what to search for
-        messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages)
-        
-        # Let's search based on the original query
-        search_results = web_search_tool.invoke(query)
-        
-        # Format search results
-        formatted_results = "\n\n".join([
-            f"Source: {result['url']}\nTitle: {result['title']}\nContent: {result['content']}"
-            for result in search_results
-        ])
-        
-        # Create prompt for synthesizing results
-        synthesis_prompt = f"""Based on the web search results below, prepare a comprehensive research report that addresses the user's query: "{query}"
+        Reply with up to {MAX_PLANNED_SEARCHES} web search queries, one per line, without numbering or any other text.
+        """, query)
+
+def _synthesis_messages(query: str, video_analysis: str, formatted_results: str) -> List:
+    return _node_messages(f"""Based on the web search results below, prepare a comprehensive research report that addresses the user's query.
         
         Here is the previous analysis that identified knowledge gaps:
         {video_analysis}
@@ -158,36 +215,12 @@ def researcher(state: AgentState) -> AgentState:
         Web search results:
         {formatted_results}
         
-        Please synthesize this information into a well-structured research report. Include relevant URLs as references."""
-        
-        # Get synthesis from LLM
-        synthesis_messages = [HumanMessage(content=synthesis_prompt)]
-        synthesis_response = llm.invoke(synthesis_messages)
-        
-        # Update state
-        state["research_results"] = synthesis_response.content
-        state["messages"] = state.get("messages", []) + messages + [response] + synthesis_messages + [synthesis_response]
-    except Exception as e:
-        logger.error(f"Error in researcher: {e}")
-        state["research_results"] = f"Error conducting research. Using available information to generate an answer for: {query}"
-    
-    # Always proceed to the next step
-    state["next"] = "rag_agent"
-    return state
+        Please synthesize this information into a well-structured research report. Include relevant URLs as references.""", query)
 
-# Define the RAG Agent
-def rag_agent(state: AgentState) -> AgentState:
-    query = state["query"]
-    video_analysis = state["video_analysis"]
-    research_results = state["research_results"]
-    
-    try:
-        # Create prompt for RAG agent
-        prompt = f"""You are a RAG Agent.
+def _rag_messages(query: str, video_analysis: str, research_results: str) -> List:
+    return _node_messages(f"""You are a RAG Agent.
         Your role is to answer the user's query based on all available information.
         
-        User's query: "{query}"
-        
         Here is the content analysis:
         {video_analysis}
         
@@ -200,38 +233,228 @@ def rag_agent(state: AgentState) -> AgentState:
         
         If you notice the information is incomplete or there were errors in the analysis or research phases,
         please acknowledge this and provide the best possible answer with the available information.
+        """, query)
+
+def _rag_error_answer(query: str) -> str:
+    return f"""
+        # Response to query: {query}
+        
+        I apologize, but I encountered technical difficulties while processing your request.
+        Please try again later or refine your query for better results.
         """
+
+def parse_planned_searches(plan: str, query: str) -> List[str]:
+    """Turn the researcher's plan into distinct search queries, excluding the raw user query."""
+    planned = []
+    for line in plan.splitlines():
+        line = line.strip().lstrip("-*0123456789.) ").strip().strip('"')
+        if line and line.lower() != query.lower() and line not in planned:
+            planned.append(line)
+    return planned[:MAX_PLANNED_SEARCHES]
+
+def _merge_search_results(result_lists: List[List[Dict]]) -> List[Dict]:
+    # Several searches often return the same page; keep the first occurrence per URL
+    merged, seen = [], set()
+    for results in result_lists:
+        if isinstance(results, Exception):
+            logger.error(f"Error in web search: {results}")
+            continue
+        for result in results:
+            if result["url"] not in seen:
+                seen.add(result["url"])
+                merged.append(result)
+    return merged
+
+def emit_progress(node: str, stage: str, **details) -> None:
+    """Report node progress to stream_mode="custom" consumers; a no-op outside a graph run."""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"node": node, "stage": stage, **details})
+
+# Define the Video Analysis Agent
+@metrics.instrument("video_analyzer")
+def video_analyzer(state: AgentState) -> Dict:
+    query = state["query"]
+    update = {}
+    
+    try:
+        # Get video information using the fallback tool
+        emit_progress("video_analyzer", "searching")
+        video_content = youtube_search_and_retrieve(query)
+        
+        # Pass to LLM for analysis
+        messages = _video_analyzer_messages(query, video_content)
+        emit_progress("video_analyzer", "analyzing")
+        response = invoke_llm(messages)
         
+        # Return only the keys this node changed; messages are appended by the reducer
+        update["video_analysis"] = response.content
+        update["messages"] = messages + [response]
+    except Exception as e:
+        logger.error(f"Error in video analyzer: {e}")
+        metrics.current().error()
+        update["video_analysis"] = f"Error analyzing video content. Proceeding with web research for: {query}"
+    
+    # Always proceed to the next step even if there was an error
+    update["next"] = "researcher"
+    return update
+
+@metrics.instrument("video_analyzer")
+async def avideo_analyzer(state: AgentState) -> Dict:
+    query = state["query"]
+    update = {}
+    
+    try:
+        emit_progress("video_analyzer", "searching")
+        video_content = await ayoutube_search_and_retrieve(query)
+        messages = _video_analyzer_messages(query, video_content)
+        emit_progress("video_analyzer", "analyzing")
+        response = await ainvoke_llm(messages)
+        
+        update["video_analysis"] = response.content
+        update["messages"] = messages + [response]
+    except Exception as e:
+        logger.error(f"Error in video analyzer: {e}")
+        metrics.current().error()
+        update["video_analysis"] = f"Error analyzing video content. Proceeding with web research for: {query}"
+    
+    update["next"] = "researcher"
+    return update
+
+# Define the Web Researcher Agent
+@metrics.instrument("researcher")
+def researcher(state: AgentState) -> Dict:
+    query = state["query"]
+    update = {}
+    video_analysis = state["video_analysis"]
+    
+    try:
+        # Pass to LLM to decide what to search for
+        messages = _researcher_messages(query, video_analysis)
+        emit_progress("researcher", "planning")
+        response = invoke_llm(messages)
+        
+        # Search the original query plus the follow-up searches the LLM planned;
+        # batch() runs the searches on a thread pool instead of one after another
+        search_queries = [query] + parse_planned_searches(response.content, query)
+        emit_progress("researcher", "searching", searches=len(search_queries))
+        search_results = _merge_search_results(RunnableLambda(search).batch(search_queries, return_exceptions=True))
+        
+        # Get synthesis from LLM
+        synthesis_messages = _synthesis_messages(query, video_analysis, format_search_results(search_results))
+        emit_progress("researcher", "synthesizing")
+        synthesis_response = invoke_llm(synthesis_messages)
+        
+        # Update state
+        update["research_results"] = synthesis_response.content
+        update["messages"] = messages + [response] + synthesis_messages + [synthesis_response]
+    except Exception as e:
+        logger.error(f"Error in researcher: {e}")
+        metrics.current().error()
+        update["research_results"] = f"Error conducting research. Using available information to generate an answer for: {query}"
+    
+    # Always proceed to the next step
+    update["next"] = "rag_agent"
+    return update
+
+@metrics.instrument("researcher")
+async def aresearcher(state: AgentState) -> Dict:
+    query = state["query"]
+    update = {}
+    video_analysis = state["video_analysis"]
+    
+    try:
+        # The raw query search does not depend on the plan, so run it while the LLM is planning
+        messages = _researcher_messages(query, video_analysis)
+        emit_progress("researcher", "planning")
+        raw_search = asyncio.ensure_future(asearch(query))
+        try:
+            response = await ainvoke_llm(messages)
+        except BaseException:
+            raw_search.cancel()
+            raise
+        
+        # Fan the planned follow-up searches out in parallel; like batch(return_exceptions=True)
+        # in the sync path, a failed search (raw or planned) is skipped instead of failing the step
+        planned = parse_planned_searches(response.content, query)
+        emit_progress("researcher", "searching", searches=len(planned) + 1)
+        search_results = _merge_search_results(await asyncio.gather(
+            raw_search, *[asearch(q) for q in planned], return_exceptions=True
+        ))
+        
+        synthesis_messages = _synthesis_messages(query, video_analysis, format_search_results(search_results))
+        emit_progress("researcher", "synthesizing")
+        synthesis_response = await ainvoke_llm(synthesis_messages)
+        
+        update["research_results"] = synthesis_response.content
+        update["messages"] = messages + [response] + synthesis_messages + [synthesis_response]
+    except Exception as e:
+        logger.error(f"Error in researcher: {e}")
+        metrics.current().error()
+        update["research_results"] = f"Error conducting research. Using available information to generate an answer for: {query}"
+    
+    update["next"] = "rag_agent"
+    return update
+
+# Define the RAG Agent
+@metrics.instrument("rag_agent")
+def rag_agent(state: AgentState) -> Dict:
+    query = state["query"]
+    update = {}
+    video_analysis = state["video_analysis"]
+    research_results = state["research_results"]
+    
+    try:
         # Get final answer from LLM
-        messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages)
+        messages = _rag_messages(query, video_analysis, research_results)
+        emit_progress("rag_agent", "generating")
+        response = invoke_llm(messages)
         
         # Update state
-        state["final_answer"] = response.content
-        state["messages"] = state.get("messages", []) + messages + [response]
+        update["final_answer"] = response.content
+        update["messages"] = messages + [response]
     except Exception as e:
         logger.error(f"Error in RAG agent: {e}")
+        metrics.current().error()
         # Create a basic response if there's an error
-        state["final_answer"] = f"""
-        # Response to query: {query}
-        
-        I apologize, but I encountered technical difficulties while processing your request.
-        Please try again later or refine your query for better results.
-        """
+        update["final_answer"] = _rag_error_answer(query)
     
     # Always mark as done
-    state["next"] = END
-    return state
+    update["next"] = END
+    return update
+
+@metrics.instrument("rag_agent")
+async def arag_agent(state: AgentState) -> Dict:
+    query = state["query"]
+    update = {}
+    
+    try:
+        messages = _rag_messages(query, state["video_analysis"], state["research_results"])
+        emit_progress("rag_agent", "generating")
+        response = await ainvoke_llm(messages)
+        
+        update["final_answer"] = response.content
+        update["messages"] = messages + [response]
+    except Exception as e:
+        logger.error(f"Error in RAG agent: {e}")
+        metrics.current().error()
+        update["final_answer"] = _rag_error_answer(query)
+    
+    update["next"] = END
+    return update
 
 # Build the graph
 def build_graph():
     # Create a new graph
     workflow = StateGraph(AgentState)
     
-    # Add nodes
-    workflow.add_node("video_analyzer", video_analyzer)
-    workflow.add_node("researcher", researcher)
-    workflow.add_node("rag_agent", rag_agent)
+    # Add nodes; each node has a sync and an async implementation so the
+    # compiled graph works with both app.invoke and app.ainvoke
+    workflow.add_node("video_analyzer", RunnableLambda(video_analyzer, afunc=avideo_analyzer))
+    workflow.add_node("researcher", RunnableLambda(researcher, afunc=aresearcher))
+    workflow.add_node("rag_agent", RunnableLambda(rag_agent, afunc=arag_agent))
     
     # Add edges directly
     workflow.add_edge("video_analyzer", "researcher")
@@ -244,13 +467,124 @@ def build_graph():
     # Compile the graph
     return workflow.compile()
 
-# Function to run the workflow
-def run_rag_workflow(query):
-    # Build the graph
-    graph = build_graph()
+# Parallel-branch nodes. Each returns only the keys it owns so LangGraph can
+# merge the concurrent updates through the ParallelAgentState reducers.
+def _youtube_search_results(search_results: List[Dict]) -> List[Dict]:
+    return [result for result in search_results if "youtube" in result["url"].lower()]
+
+@metrics.instrument("video_branch")
+def video_branch(state: ParallelAgentState) -> Dict:
+    query = state["query"]
+    try:
+        emit_progress("video_branch", "searching")
+        search_results = search(f"{query} YouTube video information")
+        video_content = _format_youtube_results(query, search_results)
+        messages = _video_analyzer_messages(query, video_content)
+        emit_progress("video_branch", "analyzing")
+        response = invoke_llm(messages)
+        return {
+            "video_analysis": response.content,
+            "search_results": _youtube_search_results(search_results),
+            "messages": messages + [response],
+        }
+    except Exception as e:
+        logger.error(f"Error in video branch: {e}")
+        metrics.current().error()
+        return {"video_analysis": f"Error analyzing video content. Proceeding with web research for: {query}"}
+
+@metrics.instrument("video_branch")
+async def avideo_branch(state: ParallelAgentState) -> Dict:
+    query = state["query"]
+    try:
+        emit_progress("video_branch", "searching")
+        search_results = await asearch(f"{query} YouTube video information")
+        video_content = _format_youtube_results(query, search_results)
+        messages = _video_analyzer_messages(query, video_content)
+        emit_progress("video_branch", "analyzing")
+        response = await ainvoke_llm(messages)
+        return {
+            "video_analysis": response.content,
+            "search_results": _youtube_search_results(search_results),
+            "messages": messages + [response],
+        }
+    except Exception as e:
+        logger.error(f"Error in video branch: {e}")
+        metrics.current().error()
+        return {"video_analysis": f"Error analyzing video content. Proceeding with web research for: {query}"}
+
+@metrics.instrument("web_branch")
+def web_branch(state: ParallelAgentState) -> Dict:
+    try:
+        emit_progress("web_branch", "searching")
+        return {"search_results": search(state["query"])}
+    except Exception as e:
+        logger.error(f"Error in web branch: {e}")
+        metrics.current().error()
+        return {"search_results": []}
+
+@metrics.instrument("web_branch")
+async def aweb_branch(state: ParallelAgentState) -> Dict:
+    try:
+        emit_progress("web_branch", "searching")
+        return {"search_results": await asearch(state["query"])}
+    except Exception as e:
+        logger.error(f"Error in web branch: {e}")
+        metrics.current().error()
+        return {"search_results": []}
+
+def _parallel_research_results(state: ParallelAgentState) -> str:
+    if state.get("search_results"):
+        return format_search_results(state["search_results"])
+    return f"Error conducting research. Using available information to generate an answer for: {state['query']}"
+
+@metrics.instrument("rag_agent")
+def parallel_rag_agent(state: ParallelAgentState) -> Dict:
+    query = state["query"]
+    research_results = _parallel_research_results(state)
+    try:
+        messages = _rag_messages(query, state.get("video_analysis", ""), research_results)
+        emit_progress("rag_agent", "generating")
+        response = invoke_llm(messages)
+        return {"research_results": research_results, "final_answer": response.content, "messages": messages + [response]}
+    except Exception as e:
+        logger.error(f"Error in RAG agent: {e}")
+        metrics.current().error()
+        return {"research_results": research_results, "final_answer": _rag_error_answer(query)}
+
+@metrics.instrument("rag_agent")
+async def aparallel_rag_agent(state: ParallelAgentState) -> Dict:
+    query = state["query"]
+    research_results = _parallel_research_results(state)
+    try:
+        messages = _rag_messages(query, state.get("video_analysis", ""), research_results)
+        emit_progress("rag_agent", "generating")
+        response = await ainvoke_llm(messages)
+        return {"research_results": research_results, "final_answer": response.content, "messages": messages + [response]}
+    except Exception as e:
+        logger.error(f"Error in RAG agent: {e}")
+        metrics.current().error()
+        return {"research_results": research_results, "final_answer": _rag_error_answer(query)}
+
+# Build the fan-out/fan-in graph: the YouTube lookup and the raw web search start
+# together, and rag_agent runs once both have finished. The researcher's planning
+# and synthesis calls are dropped, so latency is the slowest branch plus one answer.
+def build_parallel_graph():
+    workflow = StateGraph(ParallelAgentState)
     
-    # Set initial state
-    state = {
+    workflow.add_node("video_branch", RunnableLambda(video_branch, afunc=avideo_branch))
+    workflow.add_node("web_branch", RunnableLambda(web_branch, afunc=aweb_branch))
+    workflow.add_node("rag_agent", RunnableLambda(parallel_rag_agent, afunc=aparallel_rag_agent))
+    
+    # Fan out from the entry point, fan in before rag_agent
+    workflow.add_edge(START, "video_branch")
+    workflow.add_edge(START, "web_branch")
+    workflow.add_edge(["video_branch", "web_branch"], "rag_agent")
+    workflow.add_edge("rag_agent", END)
+    
+    return workflow.compile()
+
+def initial_state(query: str) -> AgentState:
+    return {
         "query": query,
         "video_analysis": "",
         "research_results": "",
@@ -258,23 +592,91 @@ def run_rag_workflow(query):
         "messages": [],
         "next": "video_analyzer"
     }
-    
+
+def _workflow_error_result(query: str, error: BaseException = None) -> Dict:
+    # Return a basic fallback response if the workflow fails completely
+    result = {
+        "query": query,
+        "final_answer": f"I apologize, but I encountered an error while processing your query about '{query}'. Please try again later."
+    }
+    if error is not None:
+        result["error"] = {"type": type(error).__name__, "message": str(error)}
+    return result
+
+# Function to run the workflow
+def run_rag_workflow(query):
     try:
-        # Run the graph
-        result = graph.invoke(state)
+        # Run the graph compiled once at import time
+        result = app.invoke(initial_state(query))
         return result
     except Exception as e:
         logger.error(f"Error running workflow: {e}")
-        # Return a basic fallback response if the workflow fails completely
-        return {
-            "query": query,
-            "final_answer": f"I apologize, but I encountered an error while processing your query about '{query}'. Please try again later."
-        }
+        return _workflow_error_result(query, e)
+
+async def arun_rag_workflow(query):
+    """Run the workflow on the current event loop so many queries can be interleaved."""
+    try:
+        return await app.ainvoke(initial_state(query))
+    except Exception as e:
+        logger.error(f"Error running workflow: {e}")
+        return _workflow_error_result(query, e)
+
+def _batch_results(queries: List[str], outputs: List) -> List[Dict]:
+    results = []
+    for query, output in zip(queries, outputs):
+        if isinstance(output, Exception):
+            logger.error(f"Error running workflow for '{query}': {output}")
+            output = _workflow_error_result(query, output)
+        results.append(output)
+    return results
+
+def run_rag_workflow_batch(queries: List[str], max_concurrency: int = 4, graph=None) -> List[Dict]:
+    """
+    Run many queries through the compiled graph, at most max_concurrency at a time.
+    Results keep the order of queries; a failed query comes back as a result with
+    an "error" entry instead of failing the whole batch.
+    """
+    graph = graph if graph is not None else app
+    outputs = graph.batch(
+        [initial_state(query) for query in queries],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+    return _batch_results(queries, outputs)
+
+async def arun_rag_workflow_batch(queries: List[str], max_concurrency: int = 4, graph=None) -> List[Dict]:
+    """Async counterpart of run_rag_workflow_batch."""
+    graph = graph if graph is not None else app
+    outputs = await graph.abatch(
+        [initial_state(query) for query in queries],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+    return _batch_results(queries, outputs)
+
+async def astream_rag_answer(query, graph=None):
+    """
+    Run the workflow and yield ("progress", event) for node progress and
+    ("token", text) for each chunk of the final answer as rag_agent generates it.
+    Chat models stream automatically when the graph is consumed with
+    stream_mode="messages" (or through app.astream_events).
+    """
+    graph = graph if graph is not None else app
+    async for mode, chunk in graph.astream(initial_state(query), stream_mode=["custom", "messages"]):
+        if mode == "custom":
+            yield "progress", chunk
+            continue
+        message, metadata = chunk
+        if metadata.get("langgraph_node") == "rag_agent" and isinstance(message, AIMessageChunk) and message.content:
+            yield "token", message.content
 
 app = build_graph()
+parallel_app = build_parallel_graph()
 # Example usage
 if __name__ == "__main__":
     # query = "테디노트는 누구인가요?"
     # result = run_rag_workflow(query)
     # print(result["final_answer"])
+    # result = asyncio.run(arun_rag_workflow(query))
+    # results = run_rag_workflow_batch([query, "LangGraph란 무엇인가요?"], max_concurrency=2)
     pass
\ No newline at end of file
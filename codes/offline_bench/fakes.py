@@ -0,0 +1,233 @@
+"""
+Deterministic, network-free stand-ins for the external services the examples use.
+
+- FakeChatModel: LangChain chat model with a fixed time to first token and a
+  token rate, usage metadata, streaming and scripted or rule-based replies
+- FixtureSearch: Tavily replacement that answers from fixtures/search_results.json
+  (known queries) or from templates filled in with the query
+- HashEmbeddings: feature-hashing embedder (words and character trigrams), so
+  texts that share terms get similar vectors, identically on every machine
+- ReactSQLResponder: a ReAct policy for the Chinook SQL agent that only looks at
+  schema it has not seen yet, so turns per question depend on the agent input
+
+    llm = FakeChatModel(responses=["answer"], latency=0.2, tokens_per_second=50)
+    search = FixtureSearch.from_file(SEARCH_FIXTURES, latency=0.1)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic import PrivateAttr
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SEARCH_FIXTURES = os.path.join(FIXTURES_DIR, "search_results.json")
+SQL_FIXTURES = os.path.join(FIXTURES_DIR, "sql_questions.json")
+
+WORD_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _stable_hash(text: str) -> int:
+    # Python's hash() is salted per process; results must match across runs
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class FakeChatModel(BaseChatModel):
+    responses: List[str] = ["fake answer"]
+    responder: Optional[Callable[[List[BaseMessage]], str]] = None
+    latency: float = 0.0            # seconds before the first token
+    tokens_per_second: float = 0.0  # 0: the whole reply arrives at once
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-offline-chat"
+
+    def _reply(self, messages: List[BaseMessage], stop: Optional[List[str]]) -> str:
+        with self._lock:
+            index = self._calls
+            self._calls += 1
+        text = self.responder(messages) if self.responder is not None else self.responses[index % len(self.responses)]
+        for token in stop or []:
+            if token in text:
+                text = text[:text.index(token)]
+        return text
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        completion_tokens = estimate_tokens(text)
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def _seconds_per_piece(self, pieces: List[str]) -> List[float]:
+        if not self.tokens_per_second:
+            return [0.0] * len(pieces)
+        return [estimate_tokens(piece) / self.tokens_per_second for piece in pieces]
+
+    @staticmethod
+    def _pieces(text: str) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", text) or [""]
+
+    def _result(self, messages: List[BaseMessage], text: str) -> ChatResult:
+        usage = self._usage(messages, text)
+        message = AIMessage(content=text, usage_metadata=usage,
+                            response_metadata={"token_usage": {"prompt_tokens": usage["input_tokens"],
+                                                               "completion_tokens": usage["output_tokens"]}})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._reply(messages, stop)
+        time.sleep(self.latency + sum(self._seconds_per_piece(self._pieces(text))))
+        return self._result(messages, text)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._reply(messages, stop)
+        await asyncio.sleep(self.latency + sum(self._seconds_per_piece(self._pieces(text))))
+        return self._result(messages, text)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        text = self._reply(messages, stop)
+        pieces = self._pieces(text)
+        time.sleep(self.latency)
+        for piece, seconds in zip(pieces, self._seconds_per_piece(pieces)):
+            time.sleep(seconds)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._reply(messages, stop)
+        pieces = self._pieces(text)
+        await asyncio.sleep(self.latency)
+        for piece, seconds in zip(pieces, self._seconds_per_piece(pieces)):
+            await asyncio.sleep(seconds)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+
+class FixtureSearch(Runnable):
+    """Stands in for TavilySearchResults: a list of {url, title, content} per query."""
+
+    def __init__(self, fixtures: Dict, latency: float = 0.0):
+        self.queries = {" ".join(query.split()).casefold(): results for query, results in fixtures.get("queries", {}).items()}
+        self.templates = fixtures.get("default", [])
+        self.filler_words = fixtures.get("filler_words", 0)
+        self.latency = latency
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path: str = SEARCH_FIXTURES, latency: float = 0.0) -> "FixtureSearch":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), latency)
+
+    def results(self, query: str) -> List[Dict]:
+        self.calls += 1
+        known = self.queries.get(" ".join(str(query).split()).casefold())
+        if known is not None:
+            return [dict(result) for result in known]
+        seed = _stable_hash(query)
+        filler = " ".join(f"term{(seed >> (i % 48)) % 997}" for i in range(self.filler_words))
+        values = {"query": query, "id": f"{seed % 10**8:08d}", "filler": filler}
+        return [{key: value.format(**values) for key, value in template.items()} for template in self.templates]
+
+    def invoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs) -> List[Dict]:
+        time.sleep(self.latency)
+        return self.results(input)
+
+    async def ainvoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs) -> List[Dict]:
+        await asyncio.sleep(self.latency)
+        return self.results(input)
+
+
+class HashEmbeddings(Embeddings):
+    def __init__(self, dim: int = 384, seconds_per_text: float = 0.0):
+        self.dim = dim
+        # Optional simulated model cost, to see how ingestion scales with embedding time
+        self.seconds_per_text = seconds_per_text
+        self.model_name = f"hash-embeddings-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in WORD_PATTERN.findall(text.lower()):
+            features.append(word)
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            value = _stable_hash(feature)
+            vector[value % self.dim] += 1.0 if (value >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _mentions_table(prompt: str, table: str) -> bool:
+    return re.search(rf'CREATE TABLE\s+["\[`]?{re.escape(table)}["\]`]?\s*\(', prompt, re.IGNORECASE) is not None
+
+
+class ReactSQLResponder:
+    """
+    Plays the LLM of a zero-shot ReAct SQL agent for the fixture questions.
+    It lists the tables only when it has no schema at all, asks sql_db_schema for
+    the tables of the question it has not seen yet (in the input or an
+    observation), runs the fixture SQL once and answers with its result.
+    """
+
+    def __init__(self, cases: List[Dict]):
+        self.cases = cases
+
+    @classmethod
+    def from_file(cls, path: str = SQL_FIXTURES) -> "ReactSQLResponder":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __call__(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content)
+        case = next((case for case in self.cases if case["question"] in prompt), None)
+        if case is None:
+            return "Thought: I do not know this question.\nFinal Answer: I don't know."
+        scratchpad = prompt[prompt.rindex(case["question"]) + len(case["question"]):]
+        if "Action: sql_db_query" in scratchpad:
+            observation = scratchpad.rsplit("Observation:", 1)[-1].split("\nThought:")[0].strip()
+            return f"Thought: I now know the final answer.\nFinal Answer: {observation}"
+        missing = [table for table in case["tables"] if not _mentions_table(prompt, table)]
+        if len(missing) == len(case["tables"]) and "Action: sql_db_list_tables" not in scratchpad and "CREATE TABLE" not in prompt:
+            return "Thought: I should look at the tables in the database.\nAction: sql_db_list_tables\nAction Input: "
+        if missing:
+            return f"Thought: I need the schema of {', '.join(missing)}.\nAction: sql_db_schema\nAction Input: {', '.join(missing)}"
+        return f"Thought: I can write the query now.\nAction: sql_db_query\nAction Input: {case['sql']}"
@@ -0,0 +1,330 @@
+"""
+Offline benchmark suite: no OpenAI, Tavily, Gemini or HuggingFace access needed.
+
+Suites (all deterministic apart from wall-clock noise):
+- graph:     youtube_rag and youtube_rag_parallel throughput with FakeChatModel and
+             FixtureSearch, per-node wall time from graph_metrics
+- ingestion: pdf_ingest of the bundled PDF into a temporary Chroma collection with
+             HashEmbeddings (cold and unchanged re-run), CachedEmbeddings cold/warm
+- retrieval: recall@k and p50/p95 latency of Chroma, BM25, hybrid RRF, ANN and
+             int8-quantized stores over known-item queries
+- sql_agent: LLM turns, tool calls and latency per question for the Chinook SQL
+             agent on chinook.db, without and with the schema context
+
+Results are printed (or written with --out) as one JSON document, so runs can be
+diffed or collected over time.
+
+    ~codes/offline_bench$ python run_offline_bench.py --out results/$(date +%Y%m%d).json
+    ~codes/offline_bench$ python run_offline_bench.py --suites graph sql_agent --llm-latency 0.2 --tokens-per-second 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODES = os.path.dirname(HERE)
+
+# 예제 모듈들은 같은 디렉토리의 모듈을 바로 import 하므로 세 디렉토리를 모두 경로에 추가
+for directory in ("langChains", "langGraphs", "streamlit_io"):
+    sys.path.append(os.path.join(CODES, directory))
+
+# Modules read these at import time; make sure nothing reaches the network or a shared cache
+os.environ["OPENAI_API_KEY"] = "offline"
+os.environ["TAVILY_API_KEY"] = "offline"
+os.environ["SEARCH_CACHE_PATH"] = "off"
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+os.environ["HF_HUB_OFFLINE"] = "1"
+os.environ.pop("LLM_CACHE", None)
+
+from fakes import SQL_FIXTURES, FakeChatModel, FixtureSearch, HashEmbeddings, ReactSQLResponder
+
+PDF_PATH = os.path.join(CODES, "langChains", "이슈리포트-2022-2호-혁신성장-정책금융-동향.pdf")
+CHINOOK_PATH = os.path.join(CODES, "streamlit_io", "chinook.db")
+GRAPH_QUERIES = ["테디노트는 누구인가요?", "LangGraph란 무엇인가요?", "What is retrieval-augmented generation?",
+                 "How do vector databases index embeddings?", "LangChain 에이전트는 어떻게 동작하나요?"]
+
+
+def latency_summary(seconds):
+    milliseconds = sorted(value * 1000 for value in seconds)
+    if not milliseconds:
+        return {"count": 0}
+    p95 = milliseconds[max(0, int(round(len(milliseconds) * 0.95)) - 1)]
+    return {"count": len(milliseconds), "p50_ms": round(statistics.median(milliseconds), 3),
+            "p95_ms": round(p95, 3), "mean_ms": round(statistics.fmean(milliseconds), 3)}
+
+
+def graph_responder(messages):
+    prompt = str(messages[-1].content)
+    if "web search queries, one per line" in prompt:
+        return "first follow-up search\nsecond follow-up search"
+    # Long enough that the token rate matters, identical for every run
+    return "## Answer\n\n" + " ".join(f"point{i}" for i in range(160))
+
+
+# ---------------------------------------------------------------- graph
+def bench_graph(args):
+    import youtube_rag_graph as graph
+
+    graph.llm = FakeChatModel(responder=graph_responder, latency=args.llm_latency, tokens_per_second=args.tokens_per_second)
+    graph.web_search_tool = FixtureSearch.from_file(latency=args.search_latency)
+    graph.metrics.enabled = True
+    graph.metrics.exporters = []
+    queries = [GRAPH_QUERIES[i % len(GRAPH_QUERIES)] for i in range(args.graph_queries)]
+
+    async def run(app):
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def one(query):
+            async with semaphore:
+                started = time.perf_counter()
+                await app.ainvoke(graph.initial_state(query))
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(query) for query in queries])
+        return time.perf_counter() - started, latencies
+
+    results = {}
+    for name, app in (("youtube_rag", graph.app), ("youtube_rag_parallel", graph.parallel_app)):
+        graph.metrics.reset()
+        llm_calls, search_calls = graph.llm.calls, graph.web_search_tool.calls
+        seconds, latencies = asyncio.run(run(app))
+        snapshot = graph.metrics.snapshot()["histograms"]
+        results[name] = {
+            "queries": len(queries),
+            "seconds": round(seconds, 3),
+            "queries_per_second": round(len(queries) / seconds, 3),
+            "latency": latency_summary(latencies),
+            "llm_calls": graph.llm.calls - llm_calls,
+            "search_calls": graph.web_search_tool.calls - search_calls,
+            "node_mean_ms": {entry["labels"]["node"]: round(entry["sum"] / entry["count"] * 1000, 3)
+                             for entry in snapshot.get("node_seconds", [])},
+            "prompt_tokens": sum(entry["sum"] for entry in snapshot.get("prompt_tokens", [])),
+            "completion_tokens": sum(entry["sum"] for entry in snapshot.get("completion_tokens", [])),
+        }
+    graph.metrics.enabled = False
+    return results
+
+
+# ---------------------------------------------------------------- ingestion / retrieval
+def bench_ingestion(args):
+    from embedding_cache import CachedEmbeddings
+    from pdf_ingest import ingest, open_vectorstore
+
+    embeddings = HashEmbeddings(args.dim, seconds_per_text=args.embed_seconds)
+    with tempfile.TemporaryDirectory() as directory:
+        persist = os.path.join(directory, "chroma")
+        cold = ingest([PDF_PATH], persist_directory=persist, collection_name="offline_bench",
+                      embeddings_factory=lambda: embeddings, parse_workers=1)
+        unchanged = ingest([PDF_PATH], persist_directory=persist, collection_name="offline_bench",
+                           embeddings_factory=lambda: embeddings, parse_workers=1)
+        texts = open_vectorstore(persist, "offline_bench", embeddings).get(include=["documents"])["documents"]
+
+        started = time.perf_counter()
+        embeddings.embed_documents(texts)
+        embed_seconds = time.perf_counter() - started
+
+        cached = CachedEmbeddings(embeddings, cache_dir=os.path.join(directory, "embeddings"))
+        timings = {}
+        for run in ("cold", "warm"):
+            started = time.perf_counter()
+            cached.embed_documents(texts)
+            timings[run] = time.perf_counter() - started
+
+    return {
+        "chunks": len(texts),
+        "ingest_cold": {**cold, "chunks_per_second": round(cold["chunks_added"] / max(cold["seconds"], 1e-9), 1)},
+        "ingest_unchanged": unchanged,
+        "embed_chunks_per_second": round(len(texts) / max(embed_seconds, 1e-9), 1),
+        "cached_embeddings_seconds": {run: round(seconds, 4) for run, seconds in timings.items()},
+        "cached_embeddings_stats": cached.stats,
+    }
+
+
+def bench_retrieval(args):
+    from bench_retrieval import known_item_queries
+    from hybrid_retriever import BM25Index, HybridRetriever, doc_key
+    from pdf_ingest import ingest, open_vectorstore
+
+    embeddings = HashEmbeddings(args.dim)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        persist = os.path.join(directory, "chroma")
+        ingest([PDF_PATH], persist_directory=persist, collection_name="offline_bench",
+               embeddings_factory=lambda: embeddings, parse_workers=1)
+        docsearch = open_vectorstore(persist, "offline_bench", embeddings)
+        data = docsearch.get(include=["documents"])
+        queries = known_item_queries(data["ids"], data["documents"], args.retrieval_queries, args.span, args.seed)
+
+        def evaluate(retrieve):
+            hits, latencies = 0, []
+            for query, relevant in queries:
+                started = time.perf_counter()
+                documents = retrieve(query)[:args.k]
+                latencies.append(time.perf_counter() - started)
+                hits += any(doc_key(doc) == relevant for doc in documents)
+            return {f"recall@{args.k}": round(hits / len(queries), 3), "latency": latency_summary(latencies)}
+
+        sparse = BM25Index(os.path.join(directory, "bm25.sqlite"))
+        sparse.sync_from_chroma(docsearch)
+        retrievers = {
+            "chroma": lambda q: docsearch.similarity_search(q, k=args.k),
+            "bm25": lambda q: [doc for doc, _ in sparse.search(q, args.k)],
+            "hybrid_rrf": HybridRetriever(sparse=sparse, vectorstore=docsearch, k=args.k, fetch_k=args.fetch_k).invoke,
+        }
+        try:
+            from ann_index import ANNVectorStore
+            from quantized_store import QuantizedVectorStore
+        except ImportError as e:
+            results["skipped"] = f"ANN/quantized stores: {e}"
+        else:
+            for kind in ("flat", "hnsw"):
+                store = ANNVectorStore.from_chroma(docsearch, embeddings, kind=kind, directory=os.path.join(directory, kind))
+                retrievers[f"ann_{kind}"] = lambda q, store=store: store.similarity_search(q, k=args.k)
+            quantized = QuantizedVectorStore.from_chroma(docsearch, embeddings, directory=os.path.join(directory, "int8"))
+            retrievers["quantized_int8"] = lambda q: quantized.similarity_search(q, k=args.k)
+
+        results.update({"chunks": len(data["ids"]), "queries": len(queries)})
+        for name, retrieve in retrievers.items():
+            results[name] = evaluate(retrieve)
+    return results
+
+
+# ---------------------------------------------------------------- SQL agent
+def bench_sql_agent(args):
+    from langchain.agents import create_sql_agent
+    from langchain.sql_database import SQLDatabase
+
+    from agent_trace import RequestTracer, latency_report
+    from guarded_sql import GuardedSQLDatabaseToolkit, SQLGuard
+    from schema_context import SchemaContext
+
+    with open(SQL_FIXTURES, encoding="utf-8") as f:
+        cases = json.load(f)
+    llm = FakeChatModel(responder=ReactSQLResponder(cases), latency=args.llm_latency, tokens_per_second=args.tokens_per_second)
+    db = SQLDatabase.from_uri(f"sqlite:///{CHINOOK_PATH}")
+    # Same guarded sql_db_query as the Streamlit apps
+    guard = SQLGuard(CHINOOK_PATH)
+    toolkit = GuardedSQLDatabaseToolkit(db=db, llm=llm, guard=guard)
+    agent_executor = create_sql_agent(llm=llm, toolkit=toolkit, verbose=False, top_k=10)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        context = SchemaContext(CHINOOK_PATH, embeddings=HashEmbeddings(args.dim), cache_dir=directory)
+        for mode in ("baseline", "schema_context"):
+            rows, spans = [], []
+            for case in cases:
+                question = case["question"]
+                agent_input = context.question_with_context(question) if mode == "schema_context" else question
+                tracer = RequestTracer(question=question)
+                error = None
+                try:
+                    agent_executor.run(agent_input, callbacks=[tracer])
+                except Exception as e:
+                    error = repr(e)
+                trace = tracer.finish().span_list()
+                spans.extend(trace)
+                rows.append({
+                    "question": question,
+                    "llm_calls": sum(span["kind"] == "llm" for span in trace),
+                    "tools": [span["name"] for span in trace if span["kind"] == "tool"],
+                    "seconds": round(trace[0]["duration_ms"] / 1000, 4),
+                    "prompt_tokens": trace[0]["prompt_tokens"],
+                    "error": error,
+                })
+            results[mode] = {
+                "llm_calls_per_question": round(statistics.fmean(row["llm_calls"] for row in rows), 3),
+                "tool_calls_per_question": round(statistics.fmean(len(row["tools"]) for row in rows), 3),
+                "prompt_tokens_per_question": round(statistics.fmean(row["prompt_tokens"] for row in rows), 1),
+                "errors": sum(bool(row["error"]) for row in rows),
+                "steps": latency_report(spans),
+                "questions": rows,
+            }
+        results["schema_context_stats"] = context.stats
+        results["sql_guard_stats"] = guard.stats
+    # Every sql_db_query call must have gone through the guard; a toolkit that silently
+    # falls back to the unguarded tool would otherwise still produce a green report
+    query_calls = sum(row["tools"].count("sql_db_query") for mode in ("baseline", "schema_context") for row in results[mode]["questions"])
+    if not guard.stats["queries"] or guard.stats["queries"] != query_calls:
+        results["error"] = f"SQLGuard handled {guard.stats['queries']} of {query_calls} sql_db_query calls"
+    return results
+
+
+SUITES = {
+    "graph": bench_graph,
+    "ingestion": bench_ingestion,
+    "retrieval": bench_retrieval,
+    "sql_agent": bench_sql_agent,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with fake LLM, search and embedding backends")
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--out", help="write the JSON result here instead of stdout")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="fake LLM output rate (0: instant)")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="fake Tavily seconds per call")
+    parser.add_argument("--graph-queries", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=384, help="HashEmbeddings dimension")
+    parser.add_argument("--embed-seconds", type=float, default=0.0, help="simulated embedding cost per text")
+    parser.add_argument("--retrieval-queries", type=int, default=50)
+    parser.add_argument("--span", type=int, default=30, help="characters per known-item query")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "suites": {},
+    }
+    failed = False
+    for name in args.suites:
+        started = time.perf_counter()
+        try:
+            result = SUITES[name](args)
+        except Exception as e:
+            result = {"error": repr(e), "traceback": traceback.format_exc()}
+        failed = failed or "error" in result
+        result["suite_seconds"] = round(time.perf_counter() - started, 3)
+        report["suites"][name] = result
+        print(f"{name}: {result['suite_seconds']}s{' (failed)' if 'error' in result else ''}", file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=1, default=str)
+    if args.out:
+        if os.path.dirname(args.out):
+            os.makedirs(os.path.dirname(args.out), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
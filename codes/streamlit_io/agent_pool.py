@@ -0,0 +1,85 @@
+"""
+Process-wide pool of SQL agent executors for the Streamlit apps.
+
+Building an executor means SQLAlchemy reflection of the database
+(SQLDatabase.from_uri), an LLM client and create_sql_agent. The pool builds each
+configuration once and hands the same executor to every session that asks for
+it. A configuration key is a tuple such as
+(model, temperature, max_new_tokens, db path, api key hash).
+
+- thread-safe: concurrent requests for a key that is not built yet wait for a
+  single build instead of building it several times
+- LRU: at most max_size executors stay alive; the least recently used one is
+  dropped when a new configuration is built
+- warm(): build a configuration ahead of the first question, e.g. the default
+  model at server start
+
+    pool = AgentPool(max_size=4)
+    executor = pool.get(("gpt-3.5-turbo-instruct", 0.0, None, "chinook.db", key_hash), lambda: build(...))
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+
+def api_key_hash(api_key: str) -> str:
+    # Executors hold the credentials they were built with; keep keys out of the pool key itself
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class AgentPool:
+    def __init__(self, max_size: int = 4):
+        self.max_size = max_size
+        self._executors: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._building: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0, "evictions": 0, "build_seconds": 0.0}
+
+    def __len__(self) -> int:
+        return len(self._executors)
+
+    def get(self, key: Hashable, build: Callable[[], object]):
+        while True:
+            with self._lock:
+                if key in self._executors:
+                    self._executors.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return self._executors[key]
+                event = self._building.get(key)
+                if event is None:
+                    event = self._building[key] = threading.Event()
+                    break
+            # Another thread is building this configuration
+            event.wait()
+
+        started = time.perf_counter()
+        try:
+            executor = build()
+        except Exception:
+            with self._lock:
+                del self._building[key]
+            event.set()
+            raise
+        with self._lock:
+            self._executors[key] = executor
+            self._executors.move_to_end(key)
+            while len(self._executors) > self.max_size:
+                self._executors.popitem(last=False)
+                self.stats["evictions"] += 1
+            self.stats["builds"] += 1
+            self.stats["build_seconds"] += time.perf_counter() - started
+            del self._building[key]
+        event.set()
+        return executor
+
+    def warm(self, key: Hashable, build: Callable[[], object]) -> threading.Thread:
+        """Build a configuration in the background so the first question does not pay for it."""
+        thread = threading.Thread(target=self.get, args=(key, build), daemon=True)
+        thread.start()
+        return thread
+
+    def keys(self):
+        with self._lock:
+            return list(self._executors)
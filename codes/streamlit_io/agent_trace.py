@@ -0,0 +1,275 @@
+"""
+Per-request tracing for the SQL agents.
+
+A RequestTracer is created for every question and passed as a callback to
+agent_executor.run(...). It records one span per LLM call, tool call and agent
+action:
+
+    {"trace_id", "span_id", "parent_id", "kind": "request" | "llm" | "tool" | "agent_action",
+     "name", "start", "end", "duration_ms", "input_bytes", "output_bytes",
+     "prompt_tokens", "completion_tokens", "error", "detail"}
+
+span_id is LangChain's run_id. parent_id is the closest traced ancestor run
+(chains are not spans of their own), or the root "request" span for top-level
+runs, so every span hangs off the request.
+
+A tracer keeps at most max_spans spans. Finished traces go into a TraceBuffer,
+a process-wide ring buffer of the last max_traces traces, which can also append
+every trace to a JSONL file (one span per line). Nothing is shared between
+requests, so traces of different users never mix and memory stays bounded.
+
+    ~codes/streamlit_io$ AGENT_TRACE_PATH=.cache/agent_traces.jsonl streamlit run app_agent_prompttomakeSQL_openAI.py
+    ~codes/streamlit_io$ python agent_trace.py .cache/agent_traces.jsonl      # p50/p95 per tool and LLM step
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+DEFAULT_MAX_SPANS = 256
+DEFAULT_MAX_TRACES = 200
+PREVIEW_CHARS = 2000
+
+
+def _size(value) -> int:
+    return len(str(value).encode("utf-8"))
+
+
+def _token_usage(response) -> Dict[str, Optional[int]]:
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    if prompt is None:
+        # Chat models report usage on the generated message
+        for generations in getattr(response, "generations", None) or []:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if metadata:
+                    prompt = (prompt or 0) + metadata.get("input_tokens", 0)
+                    completion = (completion or 0) + metadata.get("output_tokens", 0)
+    return {"prompt_tokens": prompt, "completion_tokens": completion}
+
+
+def _output_text(response) -> str:
+    return "".join(
+        getattr(generation, "text", "") for generations in getattr(response, "generations", None) or [] for generation in generations
+    )
+
+
+class RequestTracer(BaseCallbackHandler):
+    def __init__(self, question: str = "", max_spans: int = DEFAULT_MAX_SPANS):
+        self.trace_id = uuid.uuid4().hex
+        self.question = question
+        self.spans: deque = deque(maxlen=max_spans)
+        self.dropped = 0
+        self.tokens = {"prompt_tokens": 0, "completion_tokens": 0}
+        self._open: Dict[str, Dict] = {}
+        self._parents: Dict[str, Optional[str]] = {}  # run_id -> parent run_id, for every run seen
+        self._span_ids: set = set()
+        self._lock = threading.Lock()
+        self._root = self._new_span("request", "agent_run", None, _size(question))
+        self._root["detail"] = question
+
+    def _new_span(self, kind: str, name: str, parent_id: Optional[str], input_bytes: int, span_id: Optional[str] = None) -> Dict:
+        return {
+            "trace_id": self.trace_id, "span_id": span_id or uuid.uuid4().hex,
+            "parent_id": parent_id,
+            "kind": kind, "name": name, "start": time.time(), "end": None, "duration_ms": None,
+            "input_bytes": input_bytes, "output_bytes": None,
+            "prompt_tokens": None, "completion_tokens": None, "error": None, "detail": None,
+        }
+
+    def _record(self, span: Dict) -> None:
+        with self._lock:
+            if len(self.spans) == self.spans.maxlen:
+                self.dropped += 1
+            self.spans.append(span)
+
+    def _parent_span(self, parent_run_id) -> str:
+        """Closest ancestor run that is a span; the root span when there is none. Call with _lock held."""
+        run_id = str(parent_run_id) if parent_run_id else None
+        while run_id is not None and run_id not in self._span_ids:
+            run_id = self._parents.get(run_id)
+        return run_id or self._root["span_id"]
+
+    def _start(self, run_id, kind: str, name: str, parent_run_id, input_bytes: int) -> None:
+        run_id = str(run_id)
+        with self._lock:
+            self._parents[run_id] = str(parent_run_id) if parent_run_id else None
+            self._span_ids.add(run_id)
+            self._open[run_id] = self._new_span(kind, name, self._parent_span(parent_run_id), input_bytes, span_id=run_id)
+
+    def _end(self, run_id, output_bytes: Optional[int] = None, error=None, **fields) -> None:
+        with self._lock:
+            span = self._open.pop(str(run_id), None)
+        if span is None:
+            return
+        span["end"] = time.time()
+        span["duration_ms"] = round((span["end"] - span["start"]) * 1000, 2)
+        span["output_bytes"] = output_bytes
+        span["error"] = repr(error) if error is not None else None
+        span.update(fields)
+        for key in self.tokens:
+            self.tokens[key] += span.get(key) or 0
+        self._record(span)
+
+    # Chains (AgentExecutor, LLMChain) are not spans, but their runs link spans to their ancestors
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents[str(run_id)] = str(parent_run_id) if parent_run_id else None
+
+    # LLM calls
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or "llm"
+        self._start(run_id, "llm", name, parent_run_id, sum(_size(prompt) for prompt in prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or "chat_model"
+        size = sum(_size(getattr(message, "content", message)) for batch in messages for message in batch)
+        self._start(run_id, "llm", name, parent_run_id, size)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, _size(_output_text(response)), **_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # Tool calls
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or "tool", parent_run_id, _size(input_str))
+        with self._lock:
+            self._open[str(run_id)]["detail"] = str(input_str)[:PREVIEW_CHARS]
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        with self._lock:
+            span = self._open.get(str(run_id))
+            if span is not None:
+                span["output_preview"] = str(output)[:PREVIEW_CHARS]
+        self._end(run_id, _size(output))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # Agent decisions are instants; their latency is the LLM span before them
+    def on_agent_action(self, action, *, run_id=None, parent_run_id=None, **kwargs):
+        # run_id here is the agent chain's run
+        with self._lock:
+            parent_id = self._parent_span(run_id)
+        span = self._new_span("agent_action", action.tool, parent_id, _size(action.tool_input))
+        span["end"], span["duration_ms"], span["detail"] = span["start"], 0.0, str(action)[:PREVIEW_CHARS]
+        self._record(span)
+
+    def on_agent_finish(self, finish, **kwargs):
+        self._root["output_bytes"] = _size(finish.return_values)
+
+    def finish(self, error=None) -> "RequestTracer":
+        root = self._root
+        if root["end"] is None:
+            root["end"] = time.time()
+            root["duration_ms"] = round((root["end"] - root["start"]) * 1000, 2)
+            root["error"] = repr(error) if error is not None else None
+            # Totals include spans that were dropped from the bounded span list
+            root.update(self.tokens, dropped_spans=self.dropped)
+        return self
+
+    def span_list(self) -> List[Dict]:
+        with self._lock:
+            return [self._root] + list(self.spans)
+
+    def messages(self) -> List[Dict]:
+        """Agent actions and tool outputs in the shape the apps used to get from MessageCaptureCallback."""
+        messages = []
+        for span in self.span_list():
+            if span["kind"] == "agent_action":
+                messages.append({"agent_action": span["detail"]})
+            elif span["kind"] == "tool":
+                messages.append({"tool_output": span.get("output_preview")})
+        return messages
+
+
+class TraceBuffer:
+    """Ring buffer of the last max_traces traces, optionally appended to a JSONL file."""
+
+    def __init__(self, max_traces: int = DEFAULT_MAX_TRACES, export_path: Optional[str] = None):
+        self.traces: deque = deque(maxlen=max_traces)
+        self.export_path = export_path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TraceBuffer":
+        return cls(int(os.environ.get("AGENT_TRACE_MAX", DEFAULT_MAX_TRACES)), os.environ.get("AGENT_TRACE_PATH") or None)
+
+    def add(self, tracer: RequestTracer) -> None:
+        spans = tracer.finish().span_list()
+        with self._lock:
+            self.traces.append(spans)
+            if self.export_path:
+                self._append(self.export_path, [spans])
+
+    def export_jsonl(self, path: str) -> int:
+        with self._lock:
+            traces = list(self.traces)
+            self._append(path, traces)
+        return sum(len(spans) for spans in traces)
+
+    @staticmethod
+    def _append(path: str, traces: List[List[Dict]]) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for spans in traces:
+                for span in spans:
+                    f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def latency_report(spans: List[Dict]) -> List[Dict]:
+    """p50/p95 duration per (kind, name), for requests, LLM steps and tools."""
+    groups = defaultdict(list)
+    tokens = defaultdict(int)
+    for span in spans:
+        if span["kind"] == "agent_action" or span.get("duration_ms") is None:
+            continue
+        key = (span["kind"], span["name"])
+        groups[key].append(span["duration_ms"])
+        tokens[key] += (span.get("prompt_tokens") or 0) + (span.get("completion_tokens") or 0)
+    return [
+        {"kind": kind, "name": name, "count": len(values), "p50_ms": percentile(values, 50),
+         "p95_ms": percentile(values, 95), "max_ms": max(values), "tokens": tokens[(kind, name)]}
+        for (kind, name), values in sorted(groups.items())
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency report over exported agent traces")
+    parser.add_argument("paths", nargs="+", help="JSONL files written by TraceBuffer")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    spans = []
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    report = latency_report(spans)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=1))
+        return
+    print(f"{len({span['trace_id'] for span in spans})} traces, {len(spans)} spans")
+    print(f"{'kind':<8} {'name':<28} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'tokens':>8}")
+    for row in report:
+        print(f"{row['kind']:<8} {row['name'][:28]:<28} {row['count']:>6} {row['p50_ms']:>10.1f} "
+              f"{row['p95_ms']:>10.1f} {row['max_ms']:>10.1f} {row['tokens']:>8}")
+
+
+if __name__ == "__main__":
+    main()
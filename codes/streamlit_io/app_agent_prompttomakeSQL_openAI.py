@@ -3,12 +3,18 @@ import streamlit as st
 import os
 import sqlite3
 from langchain.agents import create_sql_agent
-from langchain.agents.agent_toolkits import SQLDatabaseToolkit
 from langchain.sql_database import SQLDatabase
 from langchain.llms.openai import OpenAI
+from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.agents import AgentExecutor
 import traceback
 
+from agent_pool import AgentPool, api_key_hash
+from agent_trace import RequestTracer, TraceBuffer, latency_report
+from guarded_sql import GuardedSQLDatabaseToolkit, SQLGuard
+from nl_sql_cache import NLSQLCache, SQLCaptureCallback, question_with_hint
+from schema_context import SchemaContext
+
 # Page configuration
 st.set_page_config(
     page_title="Chinook DB Natural Language Query",
@@ -18,8 +24,9 @@ st.set_page_config(
 # Initialize session state for API key
 if 'openai_api_key' not in st.session_state:
     st.session_state.openai_api_key = os.environ.get("OPENAI_API_KEY", "")
-if 'agent_executor' not in st.session_state:
-    st.session_state.agent_executor = None
+# 세션에는 에이전트 풀의 키만 저장 (실행기는 질문마다 풀에서 꺼내므로 LRU 정리가 실제로 메모리를 비움)
+if 'agent_key' not in st.session_state:
+    st.session_state.agent_key = None
 
 # App title and description
 col1, col2 = st.columns([3, 2])
@@ -85,34 +92,60 @@ with col_result:
     st.subheader("처리 결과")
     result_container = st.empty()
 
-from langchain.callbacks.base import BaseCallbackHandler
+# 질문마다 새 RequestTracer 로 LLM/도구 호출 구간(시간, 토큰, 입출력 크기)을 기록
+# 끝난 트레이스는 프로세스 공용 링 버퍼에 최근 AGENT_TRACE_MAX 개만 남기고,
+# AGENT_TRACE_PATH 가 있으면 JSONL 로도 추가 (python agent_trace.py <파일> 로 p50/p95 확인)
+@st.cache_resource
+def get_trace_buffer():
+    return TraceBuffer.from_env()
 
-class MessageCaptureCallback(BaseCallbackHandler):
-    def __init__(self):
-        self.messages = []
-    
-    def on_agent_action(self, action, **kwargs):
-        self.messages.append({"agent_action": str(action)})
-    
-    def on_tool_end(self, output, **kwargs):
-        self.messages.append({"tool_output": output})
-    
-    def on_chain_end(self, outputs, **kwargs):
-        self.messages.append({"chain_output": str(outputs)})
 
+# 스키마(DDL, 샘플 행, FK)는 프로세스당 한 번만 읽고 .cache/schema_context 에 저장
+# 질문마다 관련 테이블만 골라 입력에 넣어 sql_db_list_tables / sql_db_schema 호출을 줄임
+# API 키 원문은 cache_resource 키에 넣지 않음: key_hash 로 구분하고 _api_key(밑줄 인자)는 해시 대상에서 제외
+@st.cache_resource
+def load_schema_context(db_path, key_hash, _api_key):
+    return SchemaContext(db_path, embeddings=OpenAIEmbeddings(openai_api_key=_api_key))
 
-message_callback = MessageCaptureCallback()
+
+# 질문 -> 검증된 SQL, SQL -> 결과 2단계 캐시 (모든 세션이 .cache/nl_sql_cache.sqlite 를 공유)
+# 결과는 chinook.db 파일이 바뀌면 무효화되고, 임베딩이 비슷한 질문의 SQL은 에이전트에 힌트로 전달
+@st.cache_resource
+def load_sql_cache(db_path, key_hash, _api_key):
+    return NLSQLCache(db_path, embeddings=OpenAIEmbeddings(openai_api_key=_api_key) if _api_key else None,
+                      guard=load_sql_guard(db_path))
 
 # Function to query the database
-def query_database(query_text, agent_executor):
+def query_database(query_text, agent_executor, schema_context=None, sql_cache=None):
     try:
+        # 같은 질문을 이미 처리했다면 에이전트/LLM 없이 캐시된 SQL로 응답
+        cached = sql_cache.lookup(query_text) if sql_cache else None
+        if cached:
+            return {
+                "final_result": cached["final_result"],
+                "all_messages": [{"agent_action": f"캐시 적중 (같은 질문: {cached['matched_question']}) -> {cached['sql']}"}],
+            }
+
         # Execute the query
-        result = agent_executor.run(query_text, callbacks=[message_callback])
+        # 비슷한 질문의 SQL은 답으로 쓰지 않고 에이전트에게 참고용으로만 전달 (값만 다른 질문이 많음)
+        agent_input = schema_context.question_with_context(query_text) if schema_context else query_text
+        agent_input = question_with_hint(agent_input, sql_cache.similar(query_text) if sql_cache else None)
+        sql_capture = SQLCaptureCallback()
+        tracer = RequestTracer(question=query_text)
+        try:
+            result = agent_executor.run(agent_input, callbacks=[tracer, sql_capture])
+        except Exception as e:
+            get_trace_buffer().add(tracer.finish(error=e))
+            raise
+        get_trace_buffer().add(tracer)
+        if sql_cache:
+            sql_cache.store(query_text, sql_capture.last_sql(), result)
 
         # 결과와 메시지를 변수에 저장
         agent_execution_data = {
             "final_result": result,
-            "all_messages": message_callback.messages
+            "all_messages": tracer.messages(),
+            "trace": tracer.span_list(),
         }
         return agent_execution_data
     
@@ -121,6 +154,57 @@ def query_database(query_text, agent_executor):
         st.error(error_msg)
         return f"처리 중 오류가 발생했습니다: {str(e)}\n\n상세 오류: {traceback.format_exc()}"
 
+# DB 스키마 반영(SQLDatabase.from_uri)은 DB 파일당 한 번만
+@st.cache_resource
+def load_database(db_path):
+    return SQLDatabase.from_uri(f"sqlite:///{db_path}")
+
+
+# 에이전트가 만든 SQL은 읽기 전용 연결에서 실행: SELECT 만 허용, 실행 계획의 카티전 곱 거부,
+# LIMIT 자동 추가, SQL_TIMEOUT 초가 지나면 중단, 결과 텍스트는 잘라서 LLM 에 전달
+@st.cache_resource
+def load_sql_guard(db_path):
+    return SQLGuard(db_path, timeout=float(os.environ.get("SQL_TIMEOUT", "5")))
+
+
+def build_agent_executor(api_key, temperature, db, guard, sql_cache):
+    # Create an OpenAI LLM with the provided API key
+    llm = OpenAI(temperature=temperature, openai_api_key=api_key)
+
+    # Create a SQL agent
+    # sql_db_query 결과는 질문/결과 캐시의 2단계에 저장되어 같은 SQL은 다시 실행하지 않음
+    toolkit = GuardedSQLDatabaseToolkit(db=db, llm=llm, guard=guard, result_cache=sql_cache)
+
+    return create_sql_agent(
+        llm=llm,
+        toolkit=toolkit,
+        verbose=True,
+        top_k=10
+    )
+
+
+def agent_pool_key(api_key, temperature, db_path):
+    return ("openai", temperature, None, os.path.abspath(db_path), api_key_hash(api_key))
+
+
+# 모든 세션이 공유하는 에이전트 풀: API 키/설정/DB 경로별로 한 번만 생성,
+# 최근에 쓰지 않은 설정부터 정리 (AGENT_POOL_SIZE, 기본 4개)
+# 서버가 뜰 때 기본 설정을 미리 만들어 둠 (OPENAI_API_KEY 환경 변수가 있을 때)
+@st.cache_resource
+def get_agent_pool():
+    pool = AgentPool(max_size=int(os.environ.get("AGENT_POOL_SIZE", "4")))
+    api_key = os.environ.get("OPENAI_API_KEY", "")
+    if api_key and os.path.exists("chinook.db"):
+        db, guard = load_database("chinook.db"), load_sql_guard("chinook.db")
+        sql_cache = load_sql_cache("chinook.db", api_key_hash(api_key), api_key)
+        pool.warm(agent_pool_key(api_key, 0, "chinook.db"), lambda: build_agent_executor(api_key, 0, db, guard, sql_cache))
+    return pool
+
+
+# 서버 첫 실행 때 풀을 만들고 기본 설정을 미리 준비
+get_agent_pool()
+
+
 # Function to initialize the agent executor
 def set_query_agent_executor_database(api_key):
     try:
@@ -132,46 +216,42 @@ def set_query_agent_executor_database(api_key):
         if not os.path.exists("chinook.db"):
             return None, "chinook.db 파일을 찾을 수 없습니다! 애플리케이션과 같은 디렉토리에 chinook.db 파일이 있는지 확인하세요."
         
-        db = SQLDatabase.from_uri("sqlite:///chinook.db")
-        
-        # Create an OpenAI LLM with the provided API key
-        llm = OpenAI(temperature=0, openai_api_key=api_key)
-        
-        # Create a SQL agent
-        toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-        
-        agent_executor = create_sql_agent(
-            llm=llm,
-            toolkit=toolkit,
-            verbose=True,
-            top_k=10
+        db, guard = load_database("chinook.db"), load_sql_guard("chinook.db")
+        sql_cache = load_sql_cache("chinook.db", api_key_hash(api_key), api_key)
+        agent_executor = get_agent_pool().get(
+            agent_pool_key(api_key, 0, "chinook.db"), lambda: build_agent_executor(api_key, 0, db, guard, sql_cache)
         )
         return agent_executor, None
     except Exception as e:
         return None, f"에이전트 초기화 중 오류가 발생했습니다: {str(e)}"
 
 # Check database and initialize agent
-if st.session_state.openai_api_key and st.session_state.agent_executor is None:
+if st.session_state.openai_api_key and st.session_state.agent_key is None:
     agent_executor, error_msg = set_query_agent_executor_database(st.session_state.openai_api_key)
     if error_msg:
         st.error(error_msg)
     else:
-        st.session_state.agent_executor = agent_executor
+        st.session_state.agent_key = agent_pool_key(st.session_state.openai_api_key, 0, "chinook.db")
 
 # Process the query when button is clicked
 if query_button and user_query:
     if not st.session_state.openai_api_key:
         st.error("OpenAI API 키가 설정되지 않았습니다. 왼쪽 사이드바에서 API 키를 입력해주세요.")
-    elif st.session_state.agent_executor is None:
+    elif st.session_state.agent_key is None:
         # Try to initialize the agent again
         agent_executor, error_msg = set_query_agent_executor_database(st.session_state.openai_api_key)
         if error_msg:
             st.error(error_msg)
         else:
-            st.session_state.agent_executor = agent_executor
+            st.session_state.agent_key = agent_pool_key(st.session_state.openai_api_key, 0, "chinook.db")
             with st.spinner('질문을 처리 중입니다...'):
                 try:
-                    response = query_database(user_query, st.session_state.agent_executor)
+                    response = query_database(
+                        user_query,
+                        agent_executor,
+                        load_schema_context("chinook.db", api_key_hash(st.session_state.openai_api_key), st.session_state.openai_api_key),
+                        load_sql_cache("chinook.db", api_key_hash(st.session_state.openai_api_key), st.session_state.openai_api_key),
+                    )
 
                     final_answer = response['final_result']
                     all_messages = response['all_messages']
@@ -195,7 +275,16 @@ if query_button and user_query:
     else:
         with st.spinner('질문을 처리 중입니다...'):
             try:
-                response = query_database(user_query, st.session_state.agent_executor)
+                # 실행기는 세션에 고정하지 않고 질문마다 풀에서 꺼냄 (LRU 로 정리된 설정은 다시 생성)
+                agent_executor, error_msg = set_query_agent_executor_database(st.session_state.openai_api_key)
+                if error_msg:
+                    raise RuntimeError(error_msg)
+                response = query_database(
+                    user_query,
+                    agent_executor,
+                    load_schema_context("chinook.db", api_key_hash(st.session_state.openai_api_key), st.session_state.openai_api_key),
+                    load_sql_cache("chinook.db", api_key_hash(st.session_state.openai_api_key), st.session_state.openai_api_key),
+                )
 
                 final_answer = response['final_result']
                 all_messages = response['all_messages']
@@ -220,6 +309,19 @@ if query_button and user_query:
             except Exception as e:
                 st.error(f"처리 중 오류가 발생했습니다: {str(e)}")
 
+# 캐시 적중률 (프로세스 전체, 모든 세션 합계)
+if st.session_state.openai_api_key:
+    with st.sidebar:
+        st.subheader("질문/결과 캐시")
+        st.json(load_sql_cache("chinook.db", api_key_hash(st.session_state.openai_api_key), st.session_state.openai_api_key).hit_rates())
+        st.subheader("에이전트 풀")
+        st.json({**get_agent_pool().stats, "live": len(get_agent_pool())})
+        st.subheader("SQL 실행 가드")
+        st.json(load_sql_guard("chinook.db").stats)
+        st.subheader("최근 요청 지연 시간 (p50/p95 ms)")
+        recent_spans = [span for spans in list(get_trace_buffer().traces) for span in spans]
+        st.dataframe(latency_report(recent_spans))
+
 # Footer with cautions
 st.markdown("---")
 st.subheader("주의 사항")
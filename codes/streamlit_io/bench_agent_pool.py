@@ -0,0 +1,60 @@
+"""
+Agent construction cost: one executor per session (the old session_state
+behaviour) versus the shared AgentPool. No API calls are made; the OpenAI
+client is only constructed, so a dummy key is enough.
+
+    ~codes/streamlit_io$ python bench_agent_pool.py --sessions 20 --threads 8
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.agents import create_sql_agent
+from langchain.agents.agent_toolkits import SQLDatabaseToolkit
+from langchain.llms.openai import OpenAI
+from langchain.sql_database import SQLDatabase
+
+from agent_pool import AgentPool, api_key_hash
+
+API_KEY = os.environ.get("OPENAI_API_KEY", "sk-bench")
+
+
+def build_cold(db_path):
+    # What set_query_agent_executor_database did for every new session
+    db = SQLDatabase.from_uri(f"sqlite:///{db_path}")
+    llm = OpenAI(temperature=0, openai_api_key=API_KEY)
+    return create_sql_agent(llm=llm, toolkit=SQLDatabaseToolkit(db=db, llm=llm), verbose=False, top_k=10)
+
+
+def measure(label, sessions, threads, get):
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        executors = list(pool.map(lambda _: get(), range(sessions)))
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    distinct = len({id(executor) for executor in executors})
+    print(f"{label:<8} {sessions} sessions on {threads} threads: {seconds:7.3f}s total, "
+          f"{seconds / sessions * 1000:8.2f} ms/session, {distinct} executors built, peak {peak / 2**20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs pooled SQL agent construction")
+    parser.add_argument("--db", default="chinook.db")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    measure("cold", args.sessions, args.threads, lambda: build_cold(args.db))
+
+    agent_pool = AgentPool(max_size=4)
+    key = ("openai", 0, None, os.path.abspath(args.db), api_key_hash(API_KEY))
+    measure("pooled", args.sessions, args.threads, lambda: agent_pool.get(key, lambda: build_cold(args.db)))
+    print(f"pool stats: {agent_pool.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+LLM turns per question for the Chinook SQL agent with and without the cached
+schema context (schema_context.py). The agent is built like
+app_agent_prompttomakeSQL_openAI.py; a callback counts LLM calls and tool
+calls per question.
+
+    ~codes/streamlit_io$ export OPENAI_API_KEY=...
+    ~codes/streamlit_io$ python bench_schema_context.py
+    ~codes/streamlit_io$ python bench_schema_context.py --questions "미국 고객들의 총 구매액은 얼마인가요?"
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+from langchain.agents import create_sql_agent
+from langchain.agents.agent_toolkits import SQLDatabaseToolkit
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.embeddings.openai import OpenAIEmbeddings
+from langchain.llms.openai import OpenAI
+from langchain.sql_database import SQLDatabase
+
+from schema_context import SchemaContext
+
+SAMPLE_QUERIES = [
+    "가장 많은 음악을 구매한 고객 10명을 보여주세요",
+    "어떤 아티스트가 가장 많은 앨범을 가지고 있나요?",
+    "장르별 트랙 수와 평균 가격을 알려주세요",
+    "미국 고객들의 총 구매액은 얼마인가요?",
+    "Rock 장르의 트랙 중 가장 긴 10개 트랙은 무엇인가요?",
+]
+
+
+class TurnCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.llm_calls = 0
+        self.tools = Counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+
+    def on_agent_action(self, action, **kwargs):
+        self.tools[action.tool] += 1
+
+
+def run(agent_executor, question, agent_input):
+    counter = TurnCounter()
+    started = time.perf_counter()
+    try:
+        agent_executor.run(agent_input, callbacks=[counter])
+        error = None
+    except Exception as e:
+        error = str(e)
+    return {
+        "question": question,
+        "llm_calls": counter.llm_calls,
+        "tools": dict(counter.tools),
+        "seconds": round(time.perf_counter() - started, 2),
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare agent LLM turns with and without schema context")
+    parser.add_argument("--db", default="chinook.db")
+    parser.add_argument("--questions", nargs="*", default=SAMPLE_QUERIES)
+    args = parser.parse_args()
+
+    api_key = os.environ["OPENAI_API_KEY"]
+    llm = OpenAI(temperature=0, openai_api_key=api_key)
+    agent_executor = create_sql_agent(
+        llm=llm,
+        toolkit=SQLDatabaseToolkit(db=SQLDatabase.from_uri(f"sqlite:///{args.db}"), llm=llm),
+        verbose=False,
+        top_k=10,
+    )
+    context = SchemaContext(args.db, embeddings=OpenAIEmbeddings(openai_api_key=api_key))
+
+    results = {"baseline": [], "schema_context": []}
+    for question in args.questions:
+        results["baseline"].append(run(agent_executor, question, question))
+        results["schema_context"].append(run(agent_executor, question, context.question_with_context(question)))
+
+    for mode, rows in results.items():
+        turns = [row["llm_calls"] for row in rows]
+        print(f"{mode:<15} LLM calls/question {sum(turns) / len(turns):5.2f}  "
+              f"total seconds {sum(row['seconds'] for row in rows):7.2f}  errors {sum(bool(row['error']) for row in rows)}")
+    print(json.dumps({**results, "schema_context_stats": context.stats}, ensure_ascii=False, indent=1))
+
+
+if __name__ == "__main__":
+    main()
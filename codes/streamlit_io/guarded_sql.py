@@ -0,0 +1,244 @@
+"""
+Guarded execution of agent-written SQL against chinook.db.
+
+The agent's sql_db_query tool used to run whatever the LLM wrote with no row
+cap, no timeout and no plan check. SQLGuard runs every statement
+- on a read-only connection (mode=ro, PRAGMA query_only), SELECT/WITH only
+- after an EXPLAIN QUERY PLAN check: nested full scans whose estimated row
+  product exceeds max_scan_rows (a cross product) are rejected before running
+- with a LIMIT appended when the statement has none (max_rows + 1, to detect truncation)
+- under a wall-clock timeout enforced by SQLite's progress handler
+- with the result text capped at max_result_bytes; longer results become a
+  preview plus a note telling the agent how to narrow the query
+
+Rejections, timeouts and SQLite errors come back as "Error: ..." strings, like
+SQLDatabase.run_no_throw, so the agent sees them as an observation and retries.
+
+    guard = SQLGuard("chinook.db")
+    sql_cache = NLSQLCache("chinook.db", guard=guard)  # optional: reuse results of repeated SQL
+    toolkit = GuardedSQLDatabaseToolkit(db=db, llm=llm, guard=guard, result_cache=sql_cache)
+    agent_executor = create_sql_agent(llm=llm, toolkit=toolkit, top_k=10)
+"""
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+
+DEFAULT_MAX_ROWS = 200
+DEFAULT_MAX_RESULT_BYTES = 8_000
+DEFAULT_MAX_SCAN_ROWS = 1_000_000
+DEFAULT_TIMEOUT = 5.0
+MAX_VALUE_CHARS = 300  # same per-value truncation as SQLDatabase.run
+
+TABLE_REFERENCE = re.compile(
+    r'(?:\b(?:FROM|JOIN)\s+|,\s*)["\[`]?(\w+)["\]`]?'
+    r'(?:\s+(?:AS\s+)?(?!(?:ON|USING|WHERE|JOIN|INNER|LEFT|RIGHT|CROSS|NATURAL|GROUP|ORDER|LIMIT|UNION)\b)(\w+))?',
+    re.IGNORECASE,
+)
+TRAILING_LIMIT = re.compile(r"\bLIMIT\s+\d+(?:\s*(?:,|OFFSET)\s*\d+)?\s*$", re.IGNORECASE)
+LINE_COMMENT = re.compile(r"--[^\n]*$")
+
+
+class QueryRejected(Exception):
+    pass
+
+
+def strip_statement(sql: str) -> str:
+    sql = sql.strip()
+    # Agents often wrap the query in a markdown code fence
+    if sql.startswith("```"):
+        sql = re.sub(r"^```\w*\s*|\s*```$", "", sql)
+    return LINE_COMMENT.sub("", sql.strip()).strip().rstrip(";").strip()
+
+
+def _format_value(value) -> str:
+    text = repr(value)
+    return text if len(text) <= MAX_VALUE_CHARS else text[:MAX_VALUE_CHARS - 3] + "..."
+
+
+class SQLGuard:
+    def __init__(
+        self,
+        db_path: str,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_result_bytes: int = DEFAULT_MAX_RESULT_BYTES,
+        max_scan_rows: int = DEFAULT_MAX_SCAN_ROWS,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.max_result_bytes = max_result_bytes
+        self.max_scan_rows = max_scan_rows
+        self.timeout = timeout
+        self._row_counts: Dict[str, int] = {}
+        self._schema_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "rejected": 0, "timeouts": 0, "errors": 0, "truncated": 0, "seconds": 0.0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _table_rows(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        with self._lock:
+            if version == self._schema_version:
+                return self._row_counts
+        counts = {}
+        # sqlite_stat1 (ANALYZE) has the row count as the first number of each stat; count the rest
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                if stat:
+                    counts.setdefault(table.lower(), int(stat.split()[0]))
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+            if table.lower() not in counts:
+                counts[table.lower()] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        with self._lock:
+            self._row_counts, self._schema_version = counts, version
+        return counts
+
+    def check(self, conn: sqlite3.Connection, sql: str) -> None:
+        """Raise QueryRejected for non-SELECT statements and plans with a large cross product."""
+        if not re.match(r"^(SELECT|WITH)\b", sql, re.IGNORECASE):
+            raise QueryRejected("only SELECT statements are allowed")
+        rows = self._table_rows(conn)
+        aliases = {}
+        for table, alias in TABLE_REFERENCE.findall(sql):
+            # The pattern also hits select lists ("a, b"); only real table names count
+            table = table.lower()
+            if table in rows:
+                aliases[table] = table
+                if alias:
+                    aliases[alias.lower()] = table
+
+        # Full scans under the same parent are nested loops; their row counts multiply
+        scans: Dict[int, List[Tuple[str, int]]] = {}
+        for _, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+            match = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+            if match and not detail.startswith("SCAN CONSTANT"):
+                table = aliases.get(match.group(1).lower(), match.group(1).lower())
+                scans.setdefault(parent, []).append((table, rows.get(table, 1)))
+        for loops in scans.values():
+            if len(loops) < 2:
+                continue
+            estimate = 1
+            for _, count in loops:
+                estimate *= max(count, 1)
+            if estimate > self.max_scan_rows:
+                tables = " x ".join(f"{table} ({count} rows)" for table, count in loops)
+                raise QueryRejected(
+                    f"the plan scans {tables} as a cross product (~{estimate:,} row combinations); "
+                    "join the tables with ON conditions on their key columns"
+                )
+
+    def _limited(self, sql: str, max_rows: int) -> str:
+        if TRAILING_LIMIT.search(sql):
+            return sql
+        # On its own line, so a trailing comment cannot swallow it
+        return f"{sql}\nLIMIT {max_rows + 1}"
+
+    def _format(self, columns: List[str], rows: List[Sequence], more: bool) -> Tuple[str, bool]:
+        # more: the query has rows beyond the ones given
+        truncated = more or len(rows) > self.max_rows
+        parts, size = [], 2
+        for row in rows[:self.max_rows]:
+            text = "(" + ", ".join(_format_value(value) for value in row) + ("," if len(row) == 1 else "") + ")"
+            size += len(text.encode("utf-8")) + 2
+            if size > self.max_result_bytes and parts:
+                truncated = True
+                break
+            parts.append(text)
+        result = "[" + ", ".join(parts) + "]"
+        if truncated:
+            count = f"more than {len(rows)}" if more else str(len(rows))
+            result += (
+                f"\n\n(Result truncated: showing {len(parts)} of {count} rows, "
+                f"columns {', '.join(columns)}. Add a LIMIT, select fewer columns or aggregate if you need more.)"
+            )
+        return result, truncated
+
+    def _count(self, key: str, amount=1) -> None:
+        # Streamlit sessions share one guard, each running on its own thread
+        with self._lock:
+            self.stats[key] += amount
+
+    def execute(self, query: str, max_rows: Optional[int] = None) -> Dict:
+        """
+        Run one statement under the guard and return {"columns", "rows", "truncated"}.
+        Raises QueryRejected, or sqlite3.OperationalError("interrupted") on timeout.
+        """
+        max_rows = max_rows or self.max_rows
+        sql = strip_statement(query)
+        conn = self._connect()
+        try:
+            deadline = time.monotonic() + self.timeout
+            # Called every 10k VM instructions; a non-zero return interrupts the statement
+            conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10_000)
+            self.check(conn, sql)
+            cursor = conn.execute(self._limited(sql, max_rows))
+            columns = [column[0] for column in cursor.description or []]
+            rows = cursor.fetchmany(max_rows + 1)
+        finally:
+            conn.close()
+        return {"columns": columns, "rows": [list(row) for row in rows[:max_rows]], "truncated": len(rows) > max_rows}
+
+    def run(self, query: str, results: Optional[Callable[[str], Dict]] = None) -> str:
+        """
+        Execute one agent query and return the text the agent should observe.
+        results replaces execute, e.g. NLSQLCache.results to answer repeated SQL from its cache.
+        """
+        started = time.perf_counter()
+        self._count("queries")
+        try:
+            payload = (results or self.execute)(strip_statement(query))
+        except QueryRejected as e:
+            self._count("rejected")
+            return f"Error: query rejected: {e}."
+        except sqlite3.OperationalError as e:
+            if str(e) == "interrupted":
+                self._count("timeouts")
+                return (f"Error: query cancelled after {self.timeout:g}s. "
+                        "Use indexed join conditions, add WHERE filters or aggregate in SQL.")
+            self._count("errors")
+            return f"Error: {e}"
+        except (sqlite3.Error, sqlite3.Warning) as e:
+            self._count("errors")
+            return f"Error: {e}"
+        finally:
+            self._count("seconds", time.perf_counter() - started)
+        if not payload["rows"]:
+            return ""
+        result, truncated = self._format(payload["columns"], payload["rows"], payload["truncated"])
+        self._count("truncated", int(truncated))
+        return result
+
+
+class GuardedQuerySQLDataBaseTool(QuerySQLDatabaseTool):
+    """sql_db_query with the same name and description, executed through SQLGuard."""
+
+    guard: Any
+    result_cache: Any = None  # NLSQLCache; SQL that already ran against this database version is not re-run
+
+    def _run(self, query: str, run_manager=None) -> str:
+        return self.guard.run(query, results=self.result_cache.results if self.result_cache is not None else None)
+
+
+class GuardedSQLDatabaseToolkit(SQLDatabaseToolkit):
+    guard: Any
+    result_cache: Any = None
+
+    def get_tools(self):
+        tools = []
+        for tool in super().get_tools():
+            # The toolkit builds QuerySQLDatabaseTool; the legacy QuerySQLDataBaseTool is a subclass of it
+            if isinstance(tool, QuerySQLDatabaseTool):
+                tool = GuardedQuerySQLDataBaseTool(
+                    db=self.db, guard=self.guard, result_cache=self.result_cache, name=tool.name, description=tool.description
+                )
+            tools.append(tool)
+        return tools
@@ -0,0 +1,284 @@
+"""
+Two-level cache for the natural-language SQL apps, shared by all Streamlit sessions.
+
+Level 1 (question -> SQL): a question that the agent already answered is looked
+up by its normalized text (case, whitespace and trailing punctuation ignored).
+Only SQL that ran without error in a finished agent run is stored. A hit skips
+the agent (and the LLM) entirely.
+
+Similar questions (cosine similarity >= semantic_threshold, when an embedding
+model is given) are never answered from the cache: "미국 고객들의 총 구매액" and
+the same question about 캐나다 are nearly identical embeddings but need
+different SQL. similar() only returns the earlier question and its SQL as a
+hint for the agent, which still writes and runs its own query.
+
+Level 2 (SQL -> rows): results of a SQL text against a given version of the
+database file, executed through the shared SQLGuard (read-only, plan check,
+timeout). The version is the mtime/size of the database and its WAL file,
+so any write to chinook.db invalidates level 2. The agent's sql_db_query goes
+through level 2 as well (GuardedSQLDatabaseToolkit(result_cache=...)), so
+repeated SQL is not re-run and store() finds the rows it needs already cached. A level-1 hit whose rows are
+unchanged returns the agent's original answer; if the data changed, the fresh
+rows are shown instead.
+
+Both levels live in one SQLite file (.cache/nl_sql_cache.sqlite by default).
+Writing level 2 deletes the rows of older database versions, which can never
+hit again, and each table keeps at most max_entries rows (oldest dropped first).
+Hit rates are kept per process in NLSQLCache.stats.
+
+    cache = NLSQLCache("chinook.db", guard=SQLGuard("chinook.db"))
+    hit = cache.lookup(question)            # None or {"final_result", "sql", "columns", "rows", ...}
+    hint = cache.similar(question)          # None or {"question", "sql"}
+    capture = SQLCaptureCallback()
+    answer = agent_executor.run(question_with_hint(question, hint), callbacks=[capture])
+    cache.store(question, capture.last_sql(), answer)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.callbacks.base import BaseCallbackHandler
+
+from guarded_sql import QueryRejected, SQLGuard, strip_statement
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "nl_sql_cache.sqlite")
+MAX_CACHED_ROWS = 1000
+DEFAULT_MAX_ENTRIES = 5_000
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?.!。 ")
+
+
+def normalize_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", strip_statement(sql))
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLCaptureCallback(BaseCallbackHandler):
+    """Records sql_db_query calls of one agent run together with whether they succeeded."""
+
+    def __init__(self):
+        self.queries: List[Tuple[str, bool]] = []
+        self._pending: Optional[str] = None
+
+    def on_agent_action(self, action, **kwargs):
+        if action.tool == "sql_db_query":
+            tool_input = action.tool_input
+            self._pending = tool_input.get("query", "") if isinstance(tool_input, dict) else str(tool_input)
+
+    def on_tool_end(self, output, **kwargs):
+        if self._pending is not None:
+            self.queries.append((self._pending, not str(output).startswith("Error")))
+            self._pending = None
+
+    def last_sql(self) -> Optional[str]:
+        for sql, ok in reversed(self.queries):
+            if ok:
+                return sql
+        return None
+
+
+class NLSQLCache:
+    def __init__(self, db_path: str, path: str = DEFAULT_CACHE_PATH, embeddings=None, semantic_threshold: float = 0.95,
+                 guard: Optional[SQLGuard] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = os.path.abspath(db_path)
+        self.guard = guard or SQLGuard(db_path)
+        self.embeddings = embeddings
+        self.semantic_threshold = semantic_threshold
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS questions (
+                db TEXT NOT NULL,
+                question_key TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                final_result TEXT NOT NULL,
+                result_hash TEXT NOT NULL,
+                vector BLOB,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (db, question_key)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                db TEXT NOT NULL,
+                sql_key TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (db, sql_key)
+            );
+            """
+        )
+        self._conn.commit()
+        self.stats = {"lookups": 0, "question_hits": 0, "semantic_hints": 0, "result_hits": 0, "result_misses": 0}
+
+    def db_version(self) -> str:
+        parts = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        return "|".join(parts)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _prune(self, table: str, order: str) -> None:
+        # Caller holds the lock; drops the oldest rows beyond max_entries
+        self._conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY {order} DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def _cached_results(self, sql: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, payload FROM results WHERE db = ? AND sql_key = ?", (self.db_path, _hash(normalize_sql(sql)))
+            ).fetchone()
+        if row is not None and row[0] == self.db_version():
+            return json.loads(row[1])
+        return None
+
+    def results(self, sql: str) -> Dict:
+        """
+        Level 2: rows of sql for the current database version (executed through the guard on a miss).
+        The guarded sql_db_query tool calls this too, so the agent's own queries fill and reuse level 2.
+        """
+        version = self.db_version()
+        payload = self._cached_results(sql)
+        if payload is not None:
+            self._count("result_hits")
+            return payload
+        self._count("result_misses")
+        payload = self.guard.execute(sql, max_rows=MAX_CACHED_ROWS)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (db, sql_key, version, payload) VALUES (?, ?, ?, ?)",
+                (self.db_path, _hash(normalize_sql(sql)), version, json.dumps(payload, ensure_ascii=False, default=str)),
+            )
+            # Rows of an older version of this database can never hit again
+            self._conn.execute("DELETE FROM results WHERE db = ? AND version != ?", (self.db_path, version))
+            # INSERT OR REPLACE gives a replaced row a new rowid, so rowid order is write order
+            self._prune("results", "rowid")
+            self._conn.commit()
+        return payload
+
+    @staticmethod
+    def result_hash(payload: Dict) -> str:
+        return _hash(json.dumps([payload["columns"], payload["rows"]], ensure_ascii=False, default=str))
+
+    def similar(self, question: str) -> Optional[Dict]:
+        """Most similar cached question and its SQL, as a hint for the agent (never as the answer)."""
+        if self.embeddings is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, sql, vector FROM questions WHERE db = ? AND vector IS NOT NULL", (self.db_path,)
+            ).fetchall()
+        if not rows:
+            return None
+        query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        matrix = np.stack([np.frombuffer(vector, dtype=np.float32) for _, _, vector in rows])
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(scores))
+        if scores[best] < self.semantic_threshold:
+            return None
+        self._count("semantic_hints")
+        return {"question": rows[best][0], "sql": rows[best][1]}
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """Level 1 + 2: cached answer for the same question, or None when the agent has to run."""
+        self._count("lookups")
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT question, sql, final_result, result_hash FROM questions WHERE db = ? AND question_key = ?",
+                (self.db_path, _hash(normalize_question(question))),
+            ).fetchone()
+        if row is None:
+            return None
+        cached_question, sql, final_result, result_hash = row
+        try:
+            payload = self.results(sql)
+        except (sqlite3.Error, QueryRejected):
+            return None
+        self._count("question_hits")
+        fresh = self.result_hash(payload) == result_hash
+        return {
+            "final_result": final_result if fresh else format_rows(payload),
+            "sql": sql,
+            "matched_question": cached_question,
+            "data_changed": not fresh,
+            **payload,
+        }
+
+    def store(self, question: str, sql: Optional[str], final_result: str) -> bool:
+        """Remember the SQL of a finished agent run; runs without a successful sql_db_query are not cached."""
+        if not sql:
+            return False
+        sql = strip_statement(sql)
+        # The agent's sql_db_query just filled level 2 for this SQL; only run it when that was bypassed
+        payload = self._cached_results(sql)
+        if payload is None:
+            try:
+                payload = self.results(sql)
+            except (sqlite3.Error, QueryRejected):
+                return False
+        vector = None
+        if self.embeddings is not None:
+            vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO questions (db, question_key, question, sql, final_result, result_hash, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.db_path, _hash(normalize_question(question)), question, sql, final_result,
+                 self.result_hash(payload), vector, time.time()),
+            )
+            self._prune("questions", "created_at")
+            self._conn.commit()
+        return True
+
+    def hit_rates(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["lookups"] or 1
+        results = (stats["result_hits"] + stats["result_misses"]) or 1
+        return {
+            "question_hit_rate": round(stats["question_hits"] / lookups, 3),
+            "semantic_hint_rate": round(stats["semantic_hints"] / lookups, 3),
+            "result_hit_rate": round(stats["result_hits"] / results, 3),
+            **stats,
+        }
+
+
+def question_with_hint(question: str, hint: Optional[Dict]) -> str:
+    """Agent input with the SQL of a similar, already answered question appended."""
+    if not hint:
+        return question
+    return (
+        f"{question}\n\n"
+        f"(A similar question was answered before: \"{hint['question']}\" with the SQL `{hint['sql']}`. "
+        "Reuse it only after checking that its tables, filters and literal values fit this question.)"
+    )
+
+
+def format_rows(payload: Dict, limit: int = 20) -> str:
+    """Markdown table of the first rows, used when cached SQL is re-run on changed data."""
+    header = "| " + " | ".join(payload["columns"]) + " |"
+    divider = "| " + " | ".join("---" for _ in payload["columns"]) + " |"
+    lines = ["| " + " | ".join("" if value is None else str(value) for value in row) + " |" for row in payload["rows"][:limit]]
+    more = f"\n\n({len(payload['rows'])}{'+' if payload['truncated'] else ''} rows)" if len(payload["rows"]) > limit else ""
+    return "\n".join([header, divider] + lines) + more
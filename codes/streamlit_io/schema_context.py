@@ -0,0 +1,259 @@
+"""
+Cached schema context for the Chinook SQL agent.
+
+SQLDatabaseToolkit makes the agent discover the schema itself: one LLM turn for
+sql_db_list_tables, one or more for sql_db_schema, each followed by SQLAlchemy
+reflection. SchemaContext reflects the SQLite file once (plain sqlite3, no
+SQLAlchemy) and caches per table:
+- the CREATE TABLE statement
+- a few sample rows and the row count
+- foreign keys (the join graph)
+
+For a question, the most relevant tables are chosen by embedding similarity
+over short table/column descriptions, tables that are needed to join them are
+added from the foreign-key graph, and the rendered DDL + sample rows go straight
+into the agent input. The agent can then write the query in its first turn.
+
+The cache (.cache/schema_context/<db name>.json) is keyed by the database's
+PRAGMA schema_version, which SQLite bumps on every schema change, so an altered
+database is re-reflected on the next question.
+
+    context = SchemaContext("chinook.db", embeddings=OpenAIEmbeddings())
+    agent_executor.run(context.question_with_context("장르별 트랙 수와 평균 가격을 알려주세요"))
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "schema_context")
+SAMPLE_ROWS = 3
+
+# Short bilingual descriptions help match Korean questions to English table names
+CHINOOK_DESCRIPTIONS = {
+    "albums": "앨범 albums: album title and the artist who released it",
+    "artists": "아티스트 artists: artist or band name",
+    "customers": "고객 국가 customers: customer name, company, address, city, country, email, support employee",
+    "employees": "직원 employees: employee name, title, manager (ReportsTo), hire date, contact",
+    "genres": "장르 genres: music genre name such as Rock, Jazz",
+    "invoices": "구매 송장 invoices: customer purchases, invoice date, billing address and country, total amount 매출",
+    "invoice_items": "구매 항목 invoice_items: tracks bought on each invoice, unit price and quantity 판매량",
+    "media_types": "미디어 형식 media_types: file format of a track such as MPEG audio",
+    "playlists": "플레이리스트 playlists: playlist name",
+    "playlist_track": "플레이리스트 트랙 playlist_track: which tracks are in which playlist",
+    "tracks": "트랙 곡 음악 가격 tracks: song name, album, genre, media type, composer, length in milliseconds, size, unit price",
+}
+
+INSTRUCTIONS = (
+    "The schema of the tables relevant to this question is given below. "
+    "Use it directly and do not call sql_db_list_tables or sql_db_schema "
+    "unless a table you need is missing."
+)
+
+
+def schema_version(db_path: str) -> int:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def reflect(db_path: str, sample_rows: int = SAMPLE_ROWS) -> Dict:
+    """{"tables": {name: {"ddl", "columns", "foreign_keys", "sample_rows", "row_count"}}}"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        tables = {}
+        for name, ddl in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall():
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')]
+            foreign_keys = [
+                {"column": row[3], "table": row[2], "to": row[4]}
+                for row in conn.execute(f'PRAGMA foreign_key_list("{name}")')
+            ]
+            rows = conn.execute(f'SELECT * FROM "{name}" LIMIT {int(sample_rows)}').fetchall()
+            tables[name] = {
+                "ddl": ddl,
+                "columns": columns,
+                "foreign_keys": foreign_keys,
+                "sample_rows": [[str(value) if value is not None else None for value in row] for row in rows],
+                "row_count": conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0],
+            }
+        return {"schema_version": version, "tables": tables}
+    finally:
+        conn.close()
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _words(text: str, n: int = 2) -> set:
+    # Korean words carry particles and suffixes (장르별, 가격을), so they also match on
+    # character n-grams, as in hybrid_retriever.tokenize
+    words = set()
+    for word in re.findall(r"[0-9a-z가-힣]+", text.lower()):
+        if len(word) > 1:
+            words.add(word)
+        if len(word) > n and not word.isascii():
+            words.update(word[i:i + n] for i in range(len(word) - n + 1))
+    return words
+
+
+class SchemaContext:
+    def __init__(
+        self,
+        db_path: str,
+        embeddings=None,
+        descriptions: Optional[Dict[str, str]] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_tables: int = 4,
+    ):
+        self.db_path = os.path.abspath(db_path)
+        self.embeddings = embeddings
+        self.descriptions = CHINOOK_DESCRIPTIONS if descriptions is None else descriptions
+        self.max_tables = max_tables
+        name = os.path.splitext(os.path.basename(db_path))[0]
+        path_hash = hashlib.sha1(self.db_path.encode("utf-8")).hexdigest()[:8]
+        self.cache_path = os.path.join(cache_dir, f"{name}-{path_hash}.json")
+        self.stats = {"reflections": 0, "cache_loads": 0}
+        self._lock = threading.Lock()
+        self._schema: Optional[Dict] = None
+        self._vectors: Optional[List[List[float]]] = None
+
+    @property
+    def embeddings_id(self) -> Optional[str]:
+        if self.embeddings is None:
+            return None
+        return getattr(self.embeddings, "model_name", None) or getattr(self.embeddings, "model", None) or type(self.embeddings).__name__
+
+    def schema(self) -> Dict:
+        """Reflected schema; the cheap PRAGMA schema_version check decides whether it is still valid."""
+        version = schema_version(self.db_path)
+        with self._lock:
+            if self._schema is not None and self._schema["schema_version"] == version:
+                return self._schema
+            cached = self._read_cache()
+            if cached is not None and cached["schema_version"] == version:
+                self.stats["cache_loads"] += 1
+                self._schema = cached
+            else:
+                self.stats["reflections"] += 1
+                self._schema = {**reflect(self.db_path), "embeddings": {}}
+                self._write_cache()
+            self._vectors = None
+            return self._schema
+
+    def _read_cache(self) -> Optional[Dict]:
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def _write_cache(self) -> None:
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._schema, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def description(self, table: str) -> str:
+        info = self._schema["tables"][table]
+        text = self.descriptions.get(table, table)
+        return f"{text}. columns: {', '.join(info['columns'])}"
+
+    def _table_vectors(self) -> List[List[float]]:
+        # Table description embeddings are cached next to the schema, per embedding model
+        if self._vectors is None:
+            stored = self._schema["embeddings"].get(self.embeddings_id)
+            names = list(self._schema["tables"])
+            if stored is None or len(stored) != len(names):
+                stored = self.embeddings.embed_documents([self.description(name) for name in names])
+                with self._lock:
+                    self._schema["embeddings"][self.embeddings_id] = stored
+                    self._write_cache()
+            self._vectors = stored
+        return self._vectors
+
+    def rank_tables(self, question: str) -> List[str]:
+        schema = self.schema()
+        names = list(schema["tables"])
+        if self.embeddings is not None:
+            query = self.embeddings.embed_query(question)
+            scores = [_cosine(query, vector) for vector in self._table_vectors()]
+        else:
+            # Without embeddings: word and n-gram overlap with the description and column names
+            words = _words(question)
+            scores = [len(words & _words(self.description(name))) for name in names]
+            # Tables without any overlap would only pad the context (and pull in their join paths)
+            if any(scores):
+                scores, names = zip(*[(score, name) for score, name in zip(scores, names) if score])
+        return [name for _, name in sorted(zip(scores, names), key=lambda item: -item[0])]
+
+    def _join_path(self, start: str, goal: str) -> List[str]:
+        graph: Dict[str, set] = {name: set() for name in self._schema["tables"]}
+        for name, info in self._schema["tables"].items():
+            for fk in info["foreign_keys"]:
+                if fk["table"] in graph and fk["table"] != name:
+                    graph[name].add(fk["table"])
+                    graph[fk["table"]].add(name)
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path[::-1]
+            for neighbour in sorted(graph[node]):
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        return []
+
+    def select_tables(self, question: str) -> List[str]:
+        """Top max_tables tables plus the tables on the foreign-key paths that join them."""
+        ranked = self.rank_tables(question)
+        selected = ranked[:self.max_tables]
+        for other in selected[1:]:
+            for table in self._join_path(selected[0], other):
+                if table not in selected:
+                    selected.append(table)
+        return selected
+
+    def render(self, tables: List[str]) -> str:
+        parts = []
+        for name in tables:
+            info = self._schema["tables"][name]
+            rows = "\n".join("\t".join("NULL" if v is None else v for v in row) for row in info["sample_rows"])
+            parts.append(
+                f"{info['ddl'].strip()}\n\n/*\n{len(info['sample_rows'])} rows from {name} table "
+                f"({info['row_count']} rows in total):\n{chr(9).join(info['columns'])}\n{rows}\n*/"
+            )
+        joins = [
+            f"{name}.{fk['column']} -> {fk['table']}.{fk['to']}"
+            for name in tables for fk in self._schema["tables"][name]["foreign_keys"] if fk["table"] in tables
+        ]
+        if joins:
+            parts.append("Foreign keys:\n" + "\n".join(joins))
+        return "\n\n".join(parts)
+
+    def context_for(self, question: str) -> str:
+        return self.render(self.select_tables(question))
+
+    def question_with_context(self, question: str) -> str:
+        return f"{INSTRUCTIONS}\n\n{self.context_for(question)}\n\nQuestion: {question}"
@@ -0,0 +1,8 @@
+import os
+import sys
+
+CODES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "codes")
+
+# The examples are plain scripts that import their neighbours by module name
+for directory in ("streamlit_io", "langChains", "langGraphs", "offline_bench"):
+    sys.path.insert(0, os.path.join(CODES, directory))
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from langchain_community.agent_toolkits import create_sql_agent
+from langchain_community.utilities import SQLDatabase
+
+from agent_trace import RequestTracer
+from conftest import CODES
+from fakes import FakeChatModel, ReactSQLResponder
+from guarded_sql import GuardedSQLDatabaseToolkit, SQLGuard
+
+CHINOOK_PATH = os.path.join(CODES, "streamlit_io", "chinook.db")
+
+
+def test_every_span_resolves_to_a_parent_in_the_trace():
+    responder = ReactSQLResponder.from_file()
+    llm = FakeChatModel(responder=responder)
+    db = SQLDatabase.from_uri(f"sqlite:///{CHINOOK_PATH}")
+    toolkit = GuardedSQLDatabaseToolkit(db=db, llm=llm, guard=SQLGuard(CHINOOK_PATH))
+    agent_executor = create_sql_agent(llm=llm, toolkit=toolkit, top_k=10)
+
+    tracer = RequestTracer(question=responder.cases[0]["question"])
+    agent_executor.invoke({"input": responder.cases[0]["question"]}, config={"callbacks": [tracer]})
+    spans = tracer.finish().span_list()
+
+    root, children = spans[0], spans[1:]
+    span_ids = {span["span_id"] for span in spans}
+    assert root["parent_id"] is None
+    assert {span["kind"] for span in children} >= {"llm", "tool", "agent_action"}
+    assert all(span["parent_id"] in span_ids for span in children)
+    # Top-level LLM calls and tools of the agent loop hang directly off the request
+    assert any(span["parent_id"] == root["span_id"] and span["kind"] == "tool" for span in children)
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("faiss")
+
+from langchain.tools.retriever import create_retriever_tool
+from langchain_core.prompts import PromptTemplate
+
+from fakes import HashEmbeddings
+from few_shot_store import EXAMPLE_TEMPLATE, FEW_SHOTS, FewShotStore, LazyFewShotRetriever
+
+
+def test_select_returns_the_closest_examples(tmp_path):
+    store = FewShotStore(FEW_SHOTS, directory=str(tmp_path), embeddings=HashEmbeddings(64))
+
+    selected = store.select("List all customers from Canada", token_budget=600, max_examples=3)
+
+    assert 0 < len(selected) <= 3
+    assert selected[0].page_content == "List all customers from Canada."
+    # Every example put into the prompt is counted once
+    assert {row["question"] for row in store.library.stats()["top"]} == {doc.page_content for doc in selected}
+
+
+def test_retriever_tool_returns_examples_with_sql(tmp_path):
+    store = FewShotStore(FEW_SHOTS, directory=str(tmp_path), embeddings=HashEmbeddings(64))
+    retriever_tool = create_retriever_tool(
+        LazyFewShotRetriever(store=store, token_budget=600), name="sql_get_similar_examples",
+        description="similar examples", document_prompt=PromptTemplate.from_template(EXAMPLE_TEMPLATE),
+    )
+
+    output = retriever_tool.invoke("How many employees are there?")
+
+    assert "Question: How many employees are there" in output
+    assert 'SQL: SELECT COUNT (*) FROM "employee"' in output
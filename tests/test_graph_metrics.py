@@ -0,0 +1,38 @@
+import asyncio
+import os
+
+from graph_metrics import GraphMetrics, JSONFileExporter, PrometheusTextExporter
+
+
+class FailingExporter:
+    def export(self, snapshot):
+        raise OSError("disk full")
+
+
+def test_concurrent_nodes_export_without_races(tmp_path):
+    exporters = [PrometheusTextExporter(str(tmp_path / "m.prom")), JSONFileExporter(str(tmp_path / "m.json"))]
+    metrics = GraphMetrics(enabled=True, exporters=exporters, export_interval=0)
+
+    @metrics.instrument("node")
+    async def node(i):
+        await asyncio.sleep(0)
+        return i
+
+    async def main():
+        return await asyncio.gather(*(asyncio.to_thread(asyncio.run, node(i)) for i in range(32)))
+
+    assert asyncio.run(main()) == list(range(32))
+    metrics.export()
+    assert sorted(os.listdir(tmp_path)) == ["m.json", "m.prom"]
+    assert 'youtube_rag_node_seconds_count{node="node"} 32' in (tmp_path / "m.prom").read_text()
+
+
+def test_exporter_errors_do_not_fail_the_node(caplog):
+    metrics = GraphMetrics(enabled=True, exporters=[FailingExporter()], export_interval=0)
+
+    @metrics.instrument("node")
+    def node():
+        return "ok"
+
+    assert node() == "ok"
+    assert "graph metrics export failed" in caplog.text
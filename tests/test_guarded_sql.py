@@ -0,0 +1,66 @@
+import ast
+import os
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models.fake import FakeListLLM
+
+from conftest import CODES
+from guarded_sql import GuardedQuerySQLDataBaseTool, GuardedSQLDatabaseToolkit, SQLGuard
+
+CHINOOK_PATH = os.path.join(CODES, "streamlit_io", "chinook.db")
+
+
+@pytest.fixture
+def guard():
+    return SQLGuard(CHINOOK_PATH)
+
+
+def test_toolkit_routes_sql_db_query_through_guard(guard):
+    db = SQLDatabase.from_uri(f"sqlite:///{CHINOOK_PATH}")
+    toolkit = GuardedSQLDatabaseToolkit(db=db, llm=FakeListLLM(responses=["ok"]), guard=guard)
+    tools = {tool.name: tool for tool in toolkit.get_tools()}
+
+    assert isinstance(tools["sql_db_query"], GuardedQuerySQLDataBaseTool)
+    assert tools["sql_db_query"].invoke({"query": "SELECT COUNT(*) FROM artists"}) == "[(275,)]"
+    assert guard.stats["queries"] == 1
+
+
+def test_cross_product_is_rejected(guard):
+    result = guard.run("SELECT COUNT(*) FROM tracks t, invoice_items ii")
+    assert result.startswith("Error: query rejected")
+    assert guard.stats["rejected"] == 1
+
+
+def test_writes_are_rejected(guard):
+    assert guard.run("DELETE FROM tracks").startswith("Error: query rejected")
+    assert guard.run("SELECT 1; DROP TABLE tracks").startswith("Error:")
+
+
+def test_indexed_join_runs(guard):
+    result = guard.run("SELECT t.Name FROM tracks t JOIN invoice_items ii ON ii.TrackId = t.TrackId LIMIT 2")
+    assert len(ast.literal_eval(result)) == 2
+
+
+def test_missing_limit_is_added_and_result_truncated(guard):
+    result = guard.run("```sql\nSELECT * FROM tracks; -- all rows\n```")
+    assert "Result truncated" in result
+    assert "more than 200 rows" in result
+    assert guard.stats["truncated"] == 1
+
+
+def test_timeout_cancels_query():
+    guard = SQLGuard(CHINOOK_PATH, timeout=0.05, max_scan_rows=10**12)
+    result = guard.run("SELECT COUNT(*) FROM tracks a, tracks b, invoice_items c")
+    assert result.startswith("Error: query cancelled")
+    assert guard.stats["timeouts"] == 1
+
+
+def test_byte_cap_reports_exact_row_count():
+    guard = SQLGuard(CHINOOK_PATH, max_rows=5, max_result_bytes=60)
+    result = guard.run("SELECT Name FROM artists ORDER BY ArtistId LIMIT 5")
+    assert "of 5 rows" in result
+    assert "more than" not in result
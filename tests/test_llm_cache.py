@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration
+
+from llm_cache import SemanticLLMCache
+
+LLM_STRING = "gpt-4o-mini temperature=0"
+
+
+class RecordingEmbeddings(Embeddings):
+    """Same vector for texts that only differ in case and trailing punctuation."""
+
+    def __init__(self):
+        self.texts = []
+
+    def embed_query(self, text):
+        self.texts.append(text)
+        key = text.lower().rstrip("?!. ")
+        return [float(ord(char)) for char in key[:8].ljust(8)]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def _prompt(system, question):
+    return dumps([SystemMessage(content=system), HumanMessage(content=question)])
+
+
+def _answer(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticLLMCache(path=str(tmp_path / "llm_cache.sqlite"), embeddings=RecordingEmbeddings())
+
+
+def test_embeds_only_the_user_query(cache):
+    cache.update(_prompt("You are a researcher.", "테디노트는 누구인가요?"), LLM_STRING, _answer("a"))
+    assert cache.embeddings.texts == ["테디노트는 누구인가요?"]
+
+
+def test_semantic_hit_within_the_same_template(cache):
+    cache.update(_prompt("You are a researcher.", "Who is teddynote?"), LLM_STRING, _answer("a"))
+    hit = cache.lookup(_prompt("You are a researcher.", "who is teddynote"), LLM_STRING)
+    assert hit[0].message.content == "a"
+    assert cache.stats["semantic_hits"] == 1
+
+
+def test_no_semantic_hit_across_templates(cache):
+    cache.update(_prompt("You are a researcher.", "Who is teddynote?"), LLM_STRING, _answer("a"))
+    assert cache.lookup(_prompt("Summarize the video.", "Who is teddynote?"), LLM_STRING) is None
+
+
+def test_exact_hit_uses_the_full_prompt(cache):
+    prompt = _prompt("You are a researcher.", "Who is teddynote?")
+    cache.update(prompt, LLM_STRING, _answer("a"))
+    assert cache.lookup(prompt, LLM_STRING)[0].message.content == "a"
+    assert cache.stats["exact_hits"] == 1
+
+
+def test_long_single_message_prompt_is_exact_only(cache):
+    prompt = dumps([HumanMessage(content="Summarize: " + "x" * 9000)])
+    cache.update(prompt, LLM_STRING, _answer("a"))
+    assert cache.embeddings.texts == []
+    assert cache.lookup(prompt, LLM_STRING)[0].message.content == "a"
+
+
+@pytest.fixture
+def graph():
+    pytest.importorskip("langgraph")
+    # youtube_rag_graph copies these into os.environ at import time
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("TAVILY_API_KEY", "stub")
+    import youtube_rag_graph
+
+    return youtube_rag_graph
+
+
+def test_graph_prompts_embed_only_the_query(cache, graph):
+    cache.update(dumps(graph._video_analyzer_messages("Who is teddynote?", "video " * 3000)), LLM_STRING, _answer("a"))
+    assert cache.embeddings.texts == ["Who is teddynote?"]
+
+
+def test_graph_nodes_do_not_share_answers(cache, graph):
+    query = "Who is teddynote?"
+    cache.update(dumps(graph._video_analyzer_messages(query, "video")), LLM_STRING, _answer("analysis"))
+    cache.update(dumps(graph._researcher_messages(query, "analysis")), LLM_STRING, _answer("searches"))
+    assert cache.lookup(dumps(graph._rag_messages(query, "analysis", "research")), LLM_STRING) is None
+    hit = cache.lookup(dumps(graph._researcher_messages("who is teddynote", "analysis")), LLM_STRING)
+    assert hit[0].message.content == "searches"
@@ -0,0 +1,88 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from conftest import CODES
+from guarded_sql import SQLGuard
+from nl_sql_cache import NLSQLCache, question_with_hint
+
+CHINOOK_PATH = os.path.join(CODES, "streamlit_io", "chinook.db")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NLSQLCache(CHINOOK_PATH, path=str(tmp_path / "nl_sql_cache.sqlite"), guard=SQLGuard(CHINOOK_PATH))
+
+
+def test_exact_question_hit(cache):
+    assert cache.store("How many artists?", "SELECT COUNT(*) FROM artists", "275")
+    hit = cache.lookup("how many artists")
+    assert hit["final_result"] == "275"
+    assert hit["rows"] == [[275]]
+
+
+def test_cached_sql_runs_through_the_guard(cache):
+    assert not cache.store("Everything?", "SELECT COUNT(*) FROM tracks, invoice_items", "7846720")
+    assert cache.lookup("Everything?") is None
+
+
+class ConstantEmbeddings:
+    """Every question looks identical, like questions that differ in one literal."""
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_similar_question_is_only_a_hint(tmp_path):
+    cache = NLSQLCache(CHINOOK_PATH, path=str(tmp_path / "nl_sql_cache.sqlite"), embeddings=ConstantEmbeddings(),
+                       guard=SQLGuard(CHINOOK_PATH))
+    sql = "SELECT SUM(Total) FROM invoices WHERE BillingCountry = 'USA'"
+    assert cache.store("미국 고객들의 총 구매액", sql, "523.06")
+
+    assert cache.lookup("캐나다 고객들의 총 구매액") is None
+    assert cache.similar("캐나다 고객들의 총 구매액") == {"question": "미국 고객들의 총 구매액", "sql": sql}
+    assert sql in question_with_hint("캐나다 고객들의 총 구매액", cache.similar("캐나다 고객들의 총 구매액"))
+
+
+def test_agent_queries_fill_and_reuse_level_2(cache):
+    from langchain_community.utilities import SQLDatabase
+    from langchain_core.language_models.fake import FakeListLLM
+
+    from guarded_sql import GuardedSQLDatabaseToolkit
+
+    db = SQLDatabase.from_uri(f"sqlite:///{CHINOOK_PATH}")
+    toolkit = GuardedSQLDatabaseToolkit(db=db, llm=FakeListLLM(responses=["ok"]), guard=cache.guard, result_cache=cache)
+    query_tool = {tool.name: tool for tool in toolkit.get_tools()}["sql_db_query"]
+
+    sql = "SELECT COUNT(*) FROM albums;"
+    assert query_tool.invoke({"query": sql}) == "[(347,)]"
+    assert query_tool.invoke({"query": sql}) == "[(347,)]"
+    assert (cache.stats["result_misses"], cache.stats["result_hits"]) == (1, 1)
+
+    # store() reuses the rows the agent's query left in level 2
+    assert cache.store("How many albums?", sql, "347")
+    assert cache.stats["result_misses"] == 1
+
+
+def test_level_2_drops_old_versions_and_stays_capped(tmp_path):
+    db_path = str(tmp_path / "chinook.db")
+    shutil.copy(CHINOOK_PATH, db_path)
+    cache = NLSQLCache(db_path, path=str(tmp_path / "nl_sql_cache.sqlite"), guard=SQLGuard(db_path), max_entries=3)
+    count_rows = lambda: cache._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    for limit in range(1, 6):
+        cache.results(f"SELECT Name FROM artists LIMIT {limit}")
+    assert count_rows() == 3
+    assert cache._cached_results("SELECT Name FROM artists LIMIT 5") is not None
+    assert cache._cached_results("SELECT Name FROM artists LIMIT 1") is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE artists SET Name = 'AC/DC!' WHERE ArtistId = 1")
+    conn.commit()
+    conn.close()
+    cache.results("SELECT COUNT(*) FROM artists")
+    assert count_rows() == 1
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+import quantized_store
+from quantized_store import QuantizedVectorStore
+
+
+class FakeChroma:
+    class _collection:
+        name = "docs"
+
+    def __init__(self, n=20, dim=8):
+        rng = np.random.default_rng(0)
+        self.data = {
+            "ids": [f"id{i}" for i in range(n)],
+            "embeddings": rng.normal(size=(n, dim)).astype(np.float32).tolist(),
+            "documents": [f"document {i}" for i in range(n)],
+            "metadatas": [{"i": i} for i in range(n)],
+        }
+
+    def get(self, include):
+        return {key: value for key, value in self.data.items() if key == "ids" or key in include}
+
+
+def test_interrupted_build_is_not_reused(tmp_path, monkeypatch):
+    chroma = FakeChroma()
+    original = QuantizedVectorStore._fresh_docstore
+
+    def interrupted(directory):
+        docstore = original(directory)
+        monkeypatch.setattr(docstore, "add", lambda *args: (_ for _ in ()).throw(KeyboardInterrupt()))
+        return docstore
+
+    monkeypatch.setattr(QuantizedVectorStore, "_fresh_docstore", staticmethod(interrupted))
+    with pytest.raises(KeyboardInterrupt):
+        QuantizedVectorStore.from_chroma(chroma, embedding=None, directory=str(tmp_path))
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["fingerprint"] is None
+
+    monkeypatch.setattr(QuantizedVectorStore, "_fresh_docstore", staticmethod(original))
+    store = QuantizedVectorStore.from_chroma(chroma, embedding=None, directory=str(tmp_path))
+    assert len(store.vectors) == 20
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["fingerprint"] == quantized_store.collection_fingerprint(chroma.data["ids"])
+
+
+def test_directory_is_not_reused_for_another_dtype(tmp_path):
+    chroma = FakeChroma()
+    QuantizedVectorStore.from_chroma(chroma, embedding=None, dtype="int8", directory=str(tmp_path))
+
+    store = QuantizedVectorStore.from_chroma(chroma, embedding=None, dtype="float16", directory=str(tmp_path))
+
+    assert store.vectors.dtype == "float16"
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["dtype"] == "float16"
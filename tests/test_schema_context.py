@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from conftest import CODES
+from schema_context import SchemaContext
+
+CHINOOK_PATH = os.path.join(CODES, "streamlit_io", "chinook.db")
+
+
+@pytest.fixture
+def context(tmp_path):
+    # No embeddings, as in the HF app
+    return SchemaContext(CHINOOK_PATH, cache_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("장르별 트랙 수와 평균 가격을 알려주세요", {"genres", "tracks"}),
+    ("국가별 고객 수를 알려줘", {"customers"}),
+    ("직원별 매출 합계", {"employees", "invoices"}),
+])
+def test_korean_questions_select_their_tables(context, question, expected):
+    assert set(context.rank_tables(question)[:len(expected)]) == expected
+    assert expected <= set(context.select_tables(question))
@@ -0,0 +1,16 @@
+import time
+
+from search_cache import SQLiteCache, TieredSearchCache
+
+
+def test_disk_hit_keeps_its_remaining_ttl(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "search_cache.sqlite"))
+    disk.set("q", b'["result"]', ttl=0.2)
+    cache = TieredSearchCache(disk=disk, ttl=3600)
+
+    assert cache.get("q") == ["result"]
+    assert cache.stats["disk_hits"] == 1
+    time.sleep(0.25)
+    # The promoted memory copy expires with the disk entry instead of living another hour
+    assert cache.get("q") is None
+    assert cache.stats["misses"] == 1
@@ -0,0 +1,41 @@
+import asyncio
+import itertools
+import os
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+# youtube_rag_graph copies these into os.environ at import time
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import youtube_rag_graph
+from bench_parallel_graph import make_stub_search
+
+FAKE_ANSWER = "# 답변\n\n첫 번째 문장입니다. Second sentence with a URL https://example.com ."
+
+
+async def _collect(graph):
+    events = []
+    async for kind, payload in youtube_rag_graph.astream_rag_answer("any query", graph=graph):
+        events.append((kind, payload))
+    return events
+
+
+@pytest.mark.parametrize("graph_name", ["app", "parallel_app"])
+def test_streamed_chunks_reassemble_the_answer_in_order(monkeypatch, graph_name):
+    monkeypatch.setattr(youtube_rag_graph, "llm", GenericFakeChatModel(messages=itertools.cycle([AIMessage(content=FAKE_ANSWER)])))
+    monkeypatch.setattr(youtube_rag_graph, "web_search_tool", make_stub_search(0))
+
+    events = asyncio.run(_collect(getattr(youtube_rag_graph, graph_name)))
+    chunks = [payload for kind, payload in events if kind == "token"]
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == FAKE_ANSWER
+    # Progress events of the nodes before rag_agent arrive before the first answer token
+    first_token = next(i for i, (kind, _) in enumerate(events) if kind == "token")
+    assert any(kind == "progress" for kind, _ in events[:first_token])
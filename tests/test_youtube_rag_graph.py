@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+# youtube_rag_graph copies these into os.environ at import time
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import youtube_rag_graph
+
+QUERY = "raw query"
+
+
+def _failing_raw_search(query):
+    if query == QUERY:
+        raise RuntimeError("search backend unavailable")
+    return [{"url": f"https://example.com/{query}", "title": query, "content": "article"}]
+
+
+async def _afailing_raw_search(query):
+    return _failing_raw_search(query)
+
+
+@pytest.mark.parametrize("node", ["researcher", "aresearcher"])
+def test_failed_raw_search_keeps_the_planned_results(monkeypatch, node):
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="planned query"), AIMessage(content="synthesis")]))
+    monkeypatch.setattr(youtube_rag_graph, "llm", llm)
+    monkeypatch.setattr(youtube_rag_graph, "web_search_tool", RunnableLambda(_failing_raw_search, afunc=_afailing_raw_search))
+
+    state = {"query": QUERY, "video_analysis": "analysis"}
+    func = getattr(youtube_rag_graph, node)
+    update = asyncio.run(func(state)) if asyncio.iscoroutinefunction(func) else func(state)
+
+    assert update["research_results"] == "synthesis"
+    assert "https://example.com/planned query" in update["messages"][3].content